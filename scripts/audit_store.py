@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Verify the store against the catalog and report drift field by field.
+
+    python scripts/audit_store.py
+    python scripts/audit_store.py --generate 50000 --report-json drift.json
+    python scripts/audit_store.py --snapshot <shop>.snapshot.json.gz
+
+Checks product fields and options, variant prices, compare-at prices and
+option values, stock per SKU and custom collection membership. The store is
+read in concurrent batches of 250 products (or from a snapshot.py file or a
+mirror.py database), the catalog is indexed by handle and SKU, and every
+comparison is a dict lookup, so the audit grows linearly with the catalog.
+Exits with status 1 when anything drifted.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from catalog import CatalogIndex, generate_catalog, load_catalog, load_collections
+from inventory_writer import LEVELS_CHUNK, fetch_levels
+from locations import LocationCache
+from mirror import open_mirror
+from shopify_admin import AdminClient
+from snapshot import inventory_levels, load_snapshot, store_state
+from store_sync import PRODUCT_FIELDS, VARIANT_FIELDS, handleize, normalize
+from workers import bounded_map
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CONCURRENCY = int(os.environ.get("SHOPIFY_CONCURRENCY", "4"))
+
+# products.json takes at most 250 IDs per call
+PRODUCT_BATCH = 250
+STORE_FIELDS = "id,handle,title,body_html,vendor,product_type,tags,options,variants"
+
+
+# ── Reading the store ──
+
+def read_store(client, concurrency=CONCURRENCY):
+    """Store state as store_sync.fetch_store_state() returns it, read concurrently.
+
+    Product IDs are listed first (a light, sequential pass); full products
+    are then fetched by ID in parallel batches, and collects in parallel per
+    custom collection.
+    """
+    ids = [p["id"] for p in client.paginate("products.json", "products", {"fields": "id"})]
+
+    def fetch_products(batch):
+        r = client.get("products.json", params={"ids": ",".join(str(i) for i in batch),
+                                                 "limit": PRODUCT_BATCH, "fields": STORE_FIELDS})
+        r.raise_for_status()
+        return r.json()["products"]
+
+    batches = [ids[start:start + PRODUCT_BATCH] for start in range(0, len(ids), PRODUCT_BATCH)]
+    products = {}
+    for i, _, future in bounded_map(fetch_products, batches, concurrency):
+        products[i] = future.result()
+    custom = list(client.paginate("custom_collections.json", "custom_collections"))
+    smart = list(client.paginate("smart_collections.json", "smart_collections"))
+
+    collects = []
+    list_collects = lambda c: list(client.paginate("collects.json", "collects", {"collection_id": c["id"]}))
+    for _, _, future in bounded_map(list_collects, custom, concurrency):
+        collects.extend(future.result())
+    return {"products": [p for i in range(len(batches)) for p in products[i]],
+            "custom_collections": custom, "smart_collections": smart, "collects": collects}
+
+
+def read_levels(client, item_ids, location_ids, concurrency=CONCURRENCY):
+    """{(inventory_item_id, location_id): available}, read in parallel chunks."""
+    item_ids = list(item_ids)
+    chunks = [item_ids[start:start + LEVELS_CHUNK] for start in range(0, len(item_ids), LEVELS_CHUNK)]
+    levels = {}
+    for _, _, future in bounded_map(lambda chunk: fetch_levels(client, chunk, location_ids), chunks, concurrency):
+        levels.update(future.result())
+    return levels
+
+
+# ── Comparing ──
+
+def audit(catalog, collections, state, quantities, levels_for):
+    """Compare the catalog with the store; returns drift records.
+
+    Each record is a dict with `kind`, `subject` (a handle, SKU or collection
+    title), `field`, `expected` and `actual`. `quantities(variant)` gives a
+    catalog variant's (location_id, quantity) targets. Variants that name
+    their locations are checked per location with levels from
+    `levels_for(item_ids)`; the rest are checked against the variant's
+    inventory_quantity.
+    """
+    drift = []
+
+    def add(kind, subject, field=None, expected=None, actual=None):
+        drift.append({"kind": kind, "subject": subject, "field": field,
+                      "expected": expected, "actual": actual})
+
+    catalog = list(catalog)
+    by_handle = {p["handle"]: p for p in state["products"]}
+    by_sku = {v["sku"]: p for p in state["products"] for v in p["variants"] if v.get("sku")}
+    matched = {}  # store product ID -> catalog handle
+    per_location = []  # (sku, inventory_item_id, location_id, quantity)
+
+    for desired in catalog:
+        handle = handleize(desired["title"])
+        store = by_handle.get(handle)
+        if store is None:
+            store = next((by_sku[v["sku"]] for v in desired["variants"] if v["sku"] in by_sku), None)
+        if store is None or store["id"] in matched:
+            add("missing_product", handle)
+            continue
+        matched[store["id"]] = handle
+
+        for field in PRODUCT_FIELDS:
+            if normalize(field, desired.get(field)) != normalize(field, store.get(field)):
+                add("product_field", handle, field, desired.get(field), store.get(field))
+        desired_options = [o["name"] for o in desired["options"]]
+        store_options = [o["name"] for o in store.get("options") or []]
+        if desired_options and desired_options != store_options:
+            add("product_field", handle, "options", desired_options, store_options)
+
+        store_variants = {v.get("sku"): v for v in store["variants"]}
+        for v in desired["variants"]:
+            current = store_variants.pop(v["sku"], None)
+            if current is None:
+                add("missing_variant", v["sku"], "product", handle)
+                continue
+            for field in VARIANT_FIELDS:
+                if normalize(field, v.get(field)) != normalize(field, current.get(field)):
+                    add("variant_field", v["sku"], field, v.get(field), current.get(field))
+            if "inventory" in v:
+                per_location += [(v["sku"], current["inventory_item_id"], location_id, qty)
+                                 for location_id, qty in quantities(v)]
+            elif current.get("inventory_quantity") != v.get("inventory_quantity", 0):
+                add("stock", v["sku"], "inventory_quantity", v.get("inventory_quantity", 0),
+                    current.get("inventory_quantity"))
+        for sku in store_variants:
+            add("extra_variant", sku, "product", None, handle)
+
+    for p in state["products"]:
+        if p["id"] not in matched:
+            add("extra_product", p["handle"])
+
+    if per_location:
+        levels = levels_for({item_id for _, item_id, _, _ in per_location})
+        for sku, item_id, location_id, qty in per_location:
+            if levels.get((item_id, location_id)) != qty:
+                add("stock", sku, f"available@{location_id}", qty, levels.get((item_id, location_id)))
+
+    # Membership is compared by handle; products the catalog does not know keep their store handle
+    handle_of = {p["id"]: matched.get(p["id"], p["handle"]) for p in state["products"]}
+    store_collections = {c["title"]: c for c in state["custom_collections"]}
+    members_by_collection = {}
+    for collect in state["collects"]:
+        members_by_collection.setdefault(collect["collection_id"], set()).add(
+            handle_of.get(collect["product_id"], str(collect["product_id"])))
+    members_of = CatalogIndex(catalog).members
+    for coll in collections:
+        store = store_collections.get(coll["title"])
+        if store is None:
+            add("missing_collection", coll["title"])
+            continue
+        expected = {handleize(p["title"]) for p in members_of(coll)}
+        actual = members_by_collection.get(store["id"], set())
+        for handle in sorted(expected - actual):
+            add("missing_member", coll["title"], "product", handle, None)
+        for handle in sorted(actual - expected):
+            add("extra_member", coll["title"], "product", None, handle)
+    return drift
+
+
+def print_report(drift, checked, limit=50):
+    print("=== Drift report ===")
+    print(f"  Checked {checked['products']} products, {checked['variants']} variants and "
+          f"{checked['collections']} collections")
+    if not drift:
+        print("  No drift: the store matches the catalog.")
+        print()
+        return
+    counts = {}
+    for d in drift:
+        counts[d["kind"]] = counts.get(d["kind"], 0) + 1
+    print("  " + ", ".join(f"{n} {kind.replace('_', ' ')}" for kind, n in sorted(counts.items())))
+    for d in drift[:limit]:
+        detail = f" {d['field']}" if d["field"] else ""
+        if d["expected"] is not None or d["actual"] is not None:
+            detail += f": expected {d['expected']!r}, store has {d['actual']!r}"
+        print(f"  {d['kind']:<18} {d['subject']}{detail}")
+    if len(drift) > limit:
+        print(f"  ... and {len(drift) - limit} more (see --report-json)")
+    print()
+
+
+def verify(client, catalog, collections, locations, snapshot=None, mirror=None, concurrency=CONCURRENCY,
+           limit=50, report_json=None):
+    """Read the store, audit it against the catalog and print the report; returns the drift."""
+    location_ids = [loc["id"] for loc in locations.all()]
+    start = time.perf_counter()
+    if snapshot:
+        state, known = store_state(snapshot), inventory_levels(snapshot)
+        levels_for = lambda item_ids: known
+    elif mirror:
+        state, known = mirror.store_state(), mirror.inventory_levels()
+        levels_for = lambda item_ids: known
+    else:
+        state = read_store(client, concurrency)
+        levels_for = lambda item_ids: read_levels(client, item_ids, location_ids, concurrency)
+    catalog = list(catalog)
+    drift = audit(catalog, collections, state, locations.quantities, levels_for)
+    print(f"  Audited in {time.perf_counter() - start:.1f}s\n")
+
+    print_report(drift, {"products": len(catalog),
+                         "variants": sum(len(p["variants"]) for p in catalog),
+                         "collections": len(collections)}, limit=limit)
+    if report_json:
+        with open(report_json, "w") as f:
+            json.dump(drift, f, indent=2, default=str)
+    return drift
+
+
+def main():
+    shop_domain = os.environ.get("SHOPIFY_ADMIN_DOMAIN", "sefadevtest.myshopify.com")
+    parser = argparse.ArgumentParser(description="Compare the store with the catalog and report drift.")
+    parser.add_argument("--catalog", default=os.path.join(DATA_DIR, "products.jsonl"),
+                        help="product catalog, .jsonl or .csv (default: data/products.jsonl)")
+    parser.add_argument("--collections", default=os.path.join(DATA_DIR, "collections.json"),
+                        help="collection definitions, JSON (default: data/collections.json)")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="audit N synthetic products expanded from the catalog's templates")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed (default: 0)")
+    parser.add_argument("--variant-fanout", type=int,
+                        help="max variants per generated product (default: the template's count)")
+    parser.add_argument("--on-sale-ratio", type=float, default=0.3,
+                        help="share of generated products with a compare_at_price (default: 0.3)")
+    parser.add_argument("--out-of-stock-ratio", type=float, default=0.05,
+                        help="share of generated products with zero stock (default: 0.05)")
+    parser.add_argument("--snapshot", metavar="PATH", help="read the store from a snapshot.py file")
+    parser.add_argument("--mirror", metavar="PATH", help="refresh a mirror.py database and read the store from it")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"store reads in flight (default: SHOPIFY_CONCURRENCY or {CONCURRENCY})")
+    parser.add_argument("--limit", type=int, default=50, help="drift lines to print (default: 50)")
+    parser.add_argument("--report-json", metavar="PATH", help="write every drift record as JSON")
+    args = parser.parse_args()
+
+    client = AdminClient(shop_domain, os.environ["SHOPIFY_ADMIN_TOKEN"])
+    catalog = load_catalog(args.catalog)
+    if args.generate:
+        catalog = generate_catalog(catalog, args.generate, seed=args.seed, variant_fanout=args.variant_fanout,
+                                   on_sale_ratio=args.on_sale_ratio, out_of_stock_ratio=args.out_of_stock_ratio)
+
+    print(f"=== Auditing {shop_domain} ===")
+    locations = LocationCache(client)
+    snapshot = mirror = None
+    if args.snapshot:
+        snapshot = load_snapshot(args.snapshot)
+    elif args.mirror:
+        mirror = open_mirror(client, args.mirror, [loc["id"] for loc in locations.all()])
+    try:
+        drift = verify(client, catalog, load_collections(args.collections), locations, snapshot=snapshot,
+                       mirror=mirror, concurrency=args.concurrency, limit=args.limit, report_json=args.report_json)
+    finally:
+        if mirror:
+            mirror.close()
+    print(f"  {client.metrics.requests} API requests")
+    if drift:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pooled admin client against one-off requests calls.
+Runs both against a local stub server and reports how many TCP connections
+each approach opened for the same number of calls.
+
+    python scripts/bench_admin_client.py --calls 500
+"""
+
+import argparse
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from shopify_admin import AdminClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        payload = json.dumps({"ok": True, "echo_bytes": len(body), "products": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _reply
+    do_POST = _reply
+    do_PUT = _reply
+    do_DELETE = _reply
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(label, server, call):
+    server.connections = 0
+    start = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed:8.3f}s  connections opened: {server.connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = start_stub()
+    base_url = f"http://127.0.0.1:{server.server_port}/admin/api/bench"
+    product = {"product": {"title": "Bench", "body_html": "<p>" + "x" * 4000 + "</p>"}}
+
+    print("=" * 60)
+    print(f"  Admin client benchmark ({args.calls} GET + {args.calls} POST)")
+    print("=" * 60)
+
+    def unpooled():
+        headers = {"X-Shopify-Access-Token": "bench", "Content-Type": "application/json"}
+        for _ in range(args.calls):
+            requests.get(f"{base_url}/products.json", headers=headers).json()
+            requests.post(f"{base_url}/products.json", headers=headers, json=product).json()
+
+    def pooled():
+        client = AdminClient("bench", "bench", base_url=base_url)
+        for _ in range(args.calls):
+            client.get("products.json").json()
+            client.post("products.json", product).json()
+        client.close()
+
+    run("requests.get/post", server, unpooled)
+    run("AdminClient (pooled)", server, pooled)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
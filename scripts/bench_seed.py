@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of populate_shopify.py and fix_inventory.py against the
+local fake Admin API, at several catalog sizes.
+
+    python scripts/bench_seed.py --sizes 20,100,500
+    python scripts/bench_seed.py --save bench.json
+    python scripts/bench_seed.py --compare bench.json   # exit 1 on regression
+
+Reports wall time, request count, requests/s and 429s per run. The fake's
+bucket defaults to Shopify Plus REST limits (400, leaking 20/s) so larger
+sizes finish in reasonable time; pass --bucket-size 40 --leak-rate 2 for a
+standard store. Products are seeded with --inline-images because the
+catalog's image URLs are remote and the fake never fetches them.
+
+    python scripts/bench_seed.py --files-api
+
+seeds through the Files API instead: the catalog's images are pointed at
+placeholders the fake serves, every other product lists its images in
+reverse, and the run fails if any product's media end up out of that order.
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import subprocess
+import sys
+import tempfile
+import time
+
+from catalog import generate_catalog, load_catalog
+from fake_admin_api import FakeAdminAPI
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES = os.path.join(SCRIPTS_DIR, "data", "products.jsonl")
+
+
+def run_script(api, script, args, env, verbose=False):
+    api.reset_stats()
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, script), *args],
+        env=env, text=True,
+        stdout=None if verbose else subprocess.PIPE,
+        stderr=None if verbose else subprocess.PIPE,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        if not verbose:
+            print(proc.stdout[-2000:], proc.stderr[-2000:], sep="\n")
+        raise SystemExit(f"{script} {' '.join(args)} exited with {proc.returncode}")
+    stats = api.stats()
+    return {
+        "script": script,
+        "wall_s": round(elapsed, 3),
+        "requests": stats["requests"],
+        "requests_per_s": round(stats["requests"] / elapsed, 2) if elapsed else 0.0,
+        "throttled": stats["throttled"],
+        "connections": stats["connections"],
+        "by_endpoint": stats["by_endpoint"],
+    }
+
+
+def write_image_catalog(api, size, seed, path):
+    """A generated catalog whose images are placeholders served by `api`.
+
+    Generated products share their templates' images; every other product
+    lists them in reverse, so shared files are attached in different orders.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for i, p in enumerate(generate_catalog(load_catalog(TEMPLATES), size, seed=seed)):
+            names = [posixpath.basename(img["src"].split("?")[0]) + ".png" for img in p["images"]]
+            p["images"] = [{"src": api.image_url(name)} for name in (names[::-1] if i % 2 else names)]
+            f.write(json.dumps(p, ensure_ascii=False) + "\n")
+
+
+def misordered_images(api, path):
+    """Titles of seeded products whose media are not in catalog order."""
+    expected = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            p = json.loads(line)
+            expected[p["title"]] = [posixpath.basename(img["src"]) for img in p["images"]]
+    # Attached files keep their upload's filename, the placeholder's name
+    return [p["title"] for p in api.store.products.values()
+            if [posixpath.basename(img["src"]) for img in p["images"]] != expected.get(p["title"])]
+
+
+def compare(results, baseline, tolerance):
+    """Print deltas against a saved run; returns True if anything regressed."""
+    old = {(r["script"], r["size"], r.get("files_api", False)): r for r in baseline}
+    regressed = False
+    print("\n  Compared with baseline:")
+    for r in results:
+        base = old.get((r["script"], r["size"], r.get("files_api", False)))
+        if base is None:
+            continue
+        slower = r["wall_s"] > base["wall_s"] * (1 + tolerance)
+        chattier = r["requests"] > base["requests"]
+        flag = "  REGRESSION" if slower or chattier else ""
+        regressed = regressed or bool(flag)
+        print(f"  {r['script']:<20} {r['size']:>6}  wall {base['wall_s']:.2f}s -> {r['wall_s']:.2f}s  "
+              f"requests {base['requests']} -> {r['requests']}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="20,100,500", help="comma-separated catalog sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--bucket-size", type=int, default=400)
+    parser.add_argument("--leak-rate", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed wall-time growth over the baseline (default: 0.2)")
+    parser.add_argument("--files-api", action="store_true",
+                        help="seed images through the Files API from placeholders the fake serves, "
+                             "and check each product's media order")
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            api = FakeAdminAPI(latency=args.latency, bucket_size=args.bucket_size,
+                               leak_rate=args.leak_rate).start()
+            env = dict(os.environ,
+                       SHOPIFY_ADMIN_TOKEN="fake",
+                       SHOPIFY_ADMIN_DOMAIN="bench.myshopify.com",
+                       SHOPIFY_ADMIN_BASE_URL=api.base_url,
+                       SHOPIFY_CONCURRENCY=str(args.concurrency))
+            env.pop("SHOPIFY_LOCATION_CACHE", None)
+            env.pop("SHOPIFY_IMAGE_DIR", None)
+            journal = os.path.join(tmp, f"{size}")
+            seed_args = ["--generate", str(size), "--seed", str(args.seed), "--inline-images"]
+            if args.files_api:
+                catalog = journal + "-catalog.jsonl"
+                write_image_catalog(api, size, args.seed, catalog)
+                seed_args = ["--catalog", catalog]
+                env["SHOPIFY_IMAGE_CACHE"] = journal + "-image-cache.json"
+            runs = [
+                ("populate_shopify.py", seed_args + ["--journal", journal + "-seed.jsonl"]),
+                ("fix_inventory.py", ["--journal", journal + "-fix.jsonl"]),
+            ]
+            for script, script_args in runs:
+                result = run_script(api, script, script_args, env, args.verbose)
+                result.update(size=size, files_api=args.files_api)
+                results.append(result)
+                if args.files_api and script == "populate_shopify.py":
+                    misordered = misordered_images(api, catalog)
+                    if misordered:
+                        api.stop()
+                        raise SystemExit(f"{len(misordered)} products have their images out of catalog "
+                                         f"order, e.g. {misordered[0]}")
+            api.stop()
+
+    print("=" * 78)
+    print(f"  {'script':<20} {'size':>6} {'wall s':>9} {'requests':>9} {'req/s':>8} {'429s':>6} {'conns':>6}")
+    print("=" * 78)
+    for r in results:
+        print(f"  {r['script']:<20} {r['size']:>6} {r['wall_s']:>9.2f} {r['requests']:>9} "
+              f"{r['requests_per_s']:>8.1f} {r['throttled']:>6} {r['connections']:>6}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  Saved results to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
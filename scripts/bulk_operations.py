@@ -0,0 +1,136 @@
+"""
+GraphQL Admin bulk operations: staged uploads, bulk queries and mutations, polling.
+"""
+
+import json
+import tempfile
+import time
+
+import requests
+
+STAGED_UPLOAD = """
+mutation StagedUpload($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+RUN_MUTATION = """
+mutation RunBulkMutation($mutation: String!, $path: String!) {
+  bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $path) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+RUN_QUERY = """
+mutation RunBulkQuery($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+POLL = """
+query BulkOperation($id: ID!) {
+  node(id: $id) {
+    ... on BulkOperation { id status errorCode objectCount url partialDataUrl }
+  }
+}
+"""
+
+DONE_STATUSES = {"COMPLETED", "FAILED", "CANCELED", "EXPIRED"}
+
+
+class BulkOperationError(Exception):
+    """A bulk operation could not be started or did not complete."""
+
+
+def _check(payload, name):
+    errors = payload.get("userErrors") or []
+    if errors:
+        raise BulkOperationError(f"{name}: " + "; ".join(e["message"] for e in errors))
+    return payload
+
+
+def stage_upload(client, resource, filename, mime_type, fileobj, file_size=None):
+    """Upload a file to a staged upload target; returns the target.
+
+    The target's `resourceUrl` (or its `key` parameter, for bulk variables)
+    is what the mutation that consumes the upload takes as input.
+    """
+    spec = {"resource": resource, "filename": filename, "mimeType": mime_type, "httpMethod": "POST"}
+    if file_size is not None:
+        spec["fileSize"] = str(file_size)
+    # Only reserves an upload target, so it is safe to send again
+    data = client.graphql(STAGED_UPLOAD, {"input": [spec]}, idempotent=True)
+    target = _check(data["stagedUploadsCreate"], "stagedUploadsCreate")["stagedTargets"][0]
+    params = {p["name"]: p["value"] for p in target["parameters"]}
+    # The staged target is cloud storage, not the Admin API: no access token
+    r = requests.post(target["url"], data=params,
+                      files={"file": (filename, fileobj, mime_type)},
+                      timeout=client.timeout)
+    r.raise_for_status()
+    return dict(target, parameters=params)
+
+
+def upload_jsonl(client, lines, filename="bulk_vars.jsonl"):
+    """Stage a JSONL variables file for a bulk mutation; returns the staged path.
+
+    `lines` is streamed into a temporary file first, so it can be a generator.
+    """
+    with tempfile.TemporaryFile("w+b") as f:
+        for line in lines:
+            f.write(json.dumps(line).encode("utf-8") + b"\n")
+        f.seek(0)
+        target = stage_upload(client, "BULK_MUTATION_VARIABLES", filename, "text/jsonl", f)
+    return target["parameters"]["key"]
+
+
+def run_mutation(client, mutation, lines):
+    """Start a bulk mutation over JSONL variables; returns the operation ID."""
+    path = upload_jsonl(client, lines)
+    data = client.graphql(RUN_MUTATION, {"mutation": mutation, "path": path})
+    result = _check(data["bulkOperationRunMutation"], "bulkOperationRunMutation")
+    return result["bulkOperation"]["id"]
+
+
+def run_query(client, query):
+    """Start a bulk query (one top-level connection); returns the operation ID.
+
+    Only one bulk query runs per shop at a time, so wait_for() it before
+    starting the next.
+    """
+    data = client.graphql(RUN_QUERY, {"query": query})
+    result = _check(data["bulkOperationRunQuery"], "bulkOperationRunQuery")
+    return result["bulkOperation"]["id"]
+
+
+def wait_for(client, operation_id, poll_interval=2.0, max_interval=30.0, progress=None):
+    """Poll a bulk operation until it finishes; returns its final state."""
+    interval = poll_interval
+    while True:
+        op = client.graphql(POLL, {"id": operation_id})["node"]
+        if progress:
+            progress(op)
+        if op["status"] in DONE_STATUSES:
+            if op["status"] != "COMPLETED":
+                raise BulkOperationError(f"Bulk operation {op['status']}: {op.get('errorCode')}")
+            return op
+        time.sleep(interval)
+        interval = min(max_interval, interval * 1.5)
+
+
+def iter_results(url, timeout=60):
+    """Stream-parse a bulk operation's JSONL result file line by line."""
+    if not url:
+        return
+    with requests.get(url, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if line:
+                yield json.loads(line)
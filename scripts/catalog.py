@@ -0,0 +1,337 @@
+"""
+In-memory catalog model with inverted indexes for collection assembly.
+
+Collections are defined by rules resolved against the indexes instead of
+scanning every product per collection:
+
+    {"product_type": ["Bags", "Stationery"]}  product type is any of these
+    {"tag": ["sale"]}                         has any of these tags
+    {"vendor": ["TrendAudio"]}                vendor is any of these
+    {"on_sale": True}                         some variant has compare_at_price
+    {"price_below": "50.00"}                  cheapest variant under this price
+    {"price_at_least": "100.00"}              cheapest variant at or above this price
+
+Rule kinds combine with AND; values inside one kind combine with OR.
+
+Catalogs are streamed from JSON Lines (one product per line, same shape as the
+create_product input) or CSV (one row per variant, rows of a product adjacent)
+and validated record by record as they are read.
+"""
+
+import bisect
+import csv
+import itertools
+import json
+import os
+import random
+from decimal import Decimal, InvalidOperation
+
+PRODUCT_STRING_FIELDS = ("title", "body_html", "vendor", "product_type", "tags")
+
+# CSV columns: product fields are read from the first row of each product
+CSV_PRODUCT_COLUMNS = PRODUCT_STRING_FIELDS + ("option1_name", "option2_name", "option3_name", "images")
+CSV_VARIANT_COLUMNS = ("variant_title", "price", "compare_at_price", "sku", "inventory_quantity",
+                       "option1", "option2", "option3")
+
+
+class CatalogError(ValueError):
+    """A catalog record does not match the product schema."""
+
+    def __init__(self, where, message):
+        super().__init__(f"{where}: {message}")
+
+
+def _tags(product):
+    return {t.strip().lower() for t in product.get("tags", "").split(",") if t.strip()}
+
+
+def rules_for(coll):
+    """Membership rules for a collection definition."""
+    if "rules" in coll:
+        return coll["rules"]
+    # Older definitions only listed product types
+    return {"product_type": coll.get("product_types", [])}
+
+
+class CatalogIndex:
+    """Products by position, plus inverted indexes over the fields rules use."""
+
+    def __init__(self, products=(), keep_products=True):
+        self.keep_products = keep_products
+        self.count = 0
+        self.products = []
+        self.by_type = {}
+        self.by_tag = {}
+        self.by_vendor = {}
+        self.on_sale = set()
+        self.min_price = []
+        self._price_order = None
+        self._prices = None
+        for product in products:
+            self.add(product)
+
+    def add(self, product):
+        """Index one product; returns its position."""
+        pos = self.count
+        self.count += 1
+        if self.keep_products:
+            self.products.append(product)
+        self.by_type.setdefault(product["product_type"], set()).add(pos)
+        self.by_vendor.setdefault(product.get("vendor"), set()).add(pos)
+        for tag in _tags(product):
+            self.by_tag.setdefault(tag, set()).add(pos)
+        if any(v.get("compare_at_price") for v in product["variants"]):
+            self.on_sale.add(pos)
+        self.min_price.append(min(Decimal(str(v["price"])) for v in product["variants"]))
+        self._price_order = None
+        return pos
+
+    def __len__(self):
+        return self.count
+
+    def _union(self, index, keys):
+        result = set()
+        for key in keys:
+            result |= index.get(key, set())
+        return result
+
+    def _price_range(self, low=None, high=None):
+        if self._price_order is None:
+            self._price_order = sorted((price, pos) for pos, price in enumerate(self.min_price))
+            self._prices = [price for price, _ in self._price_order]
+        prices = self._prices
+        start = bisect.bisect_left(prices, Decimal(str(low))) if low is not None else 0
+        end = bisect.bisect_left(prices, Decimal(str(high))) if high is not None else len(prices)
+        return {pos for _, pos in self._price_order[start:end]}
+
+    def resolve(self, rules):
+        """Positions of the products matching `rules`, in catalog order."""
+        matches = None
+
+        def narrow(found):
+            nonlocal matches
+            matches = found if matches is None else matches & found
+
+        if rules.get("product_type"):
+            narrow(self._union(self.by_type, rules["product_type"]))
+        if rules.get("tag"):
+            narrow(self._union(self.by_tag, [t.lower() for t in rules["tag"]]))
+        if rules.get("vendor"):
+            narrow(self._union(self.by_vendor, rules["vendor"]))
+        if rules.get("on_sale"):
+            narrow(self.on_sale)
+        if "price_below" in rules or "price_at_least" in rules:
+            narrow(self._price_range(rules.get("price_at_least"), rules.get("price_below")))
+        return sorted(matches or ())
+
+    def members(self, coll):
+        """Catalog products that belong in a collection."""
+        return [self.products[pos] for pos in self.resolve(rules_for(coll))]
+
+
+# ── Synthetic catalogs ───────────────────────────────────────────────
+
+GENERATED_ADJECTIVES = ("Classic", "Essential", "Premium", "Everyday", "Signature", "Modern",
+                        "Vintage", "Urban", "Studio", "Travel", "Compact", "Deluxe")
+
+
+def _option_values(template):
+    """The values of each of a template's options, from its own variants."""
+    values = [[] for _ in template["options"]]
+    for v in template["variants"]:
+        for n, seen in enumerate(values, 1):
+            value = v.get(f"option{n}")
+            if value and value not in seen:
+                seen.append(value)
+    return values
+
+
+def generate_catalog(templates, count, seed=0, variant_fanout=None,
+                     on_sale_ratio=0.3, out_of_stock_ratio=0.05):
+    """Lazily yield `count` synthetic products expanded from template products.
+
+    Each product is derived from its own seeded RNG, so product N is the same
+    for a given seed no matter how many products are generated or consumed.
+    A product keeps its template's vendor and combines only the template's own
+    option values, so sneakers never come in "XL". `variant_fanout` caps
+    variants per product (default: the template's count).
+    """
+    templates = list(templates)
+    option_values = [_option_values(t) for t in templates]
+
+    for i in range(count):
+        rng = random.Random(f"{seed}:{i}")
+        k = rng.randrange(len(templates))
+        t = templates[k]
+        number = i + 1
+        title = f"{rng.choice(GENERATED_ADJECTIVES)} {t['title']} {number:06d}"
+        on_sale = rng.random() < on_sale_ratio
+        out_of_stock = rng.random() < out_of_stock_ratio
+        base = min(Decimal(str(v["price"])) for v in t["variants"])
+        base = max(Decimal("1.00"), (base * Decimal(str(rng.uniform(0.7, 1.3)))).quantize(Decimal("1")))
+
+        names = [o["name"] for o in t["options"]]
+        if names == ["Title"]:
+            combos = [("Default Title",)]
+        else:
+            combos = list(itertools.product(*option_values[k]))
+            rng.shuffle(combos)
+        fanout = variant_fanout or len(t["variants"])
+        combos = combos[:max(1, min(len(combos), rng.randint(1, fanout)))]
+
+        variants = []
+        for j, combo in enumerate(combos):
+            price = base + Decimal(rng.choice((0, 0, 5, 10))) - Decimal("0.01")
+            variant = {
+                "title": " / ".join(combo) if names != ["Title"] else "Default",
+                "price": str(price),
+                "compare_at_price": str((price * Decimal("1.25")).quantize(Decimal("1")) - Decimal("0.01"))
+                if on_sale else None,
+                "sku": f"GEN{seed}-{number:07d}-{j + 1:02d}",
+                "inventory_quantity": 0 if out_of_stock else rng.randint(1, 200),
+            }
+            for n, value in enumerate(combo, 1):
+                variant[f"option{n}"] = value
+            variants.append(variant)
+
+        yield {
+            "title": title,
+            "body_html": t["body_html"],
+            "vendor": t["vendor"],
+            "product_type": t["product_type"],
+            "tags": t["tags"] + ", generated",
+            "variants": variants,
+            "options": [{"name": name} for name in names],
+            "images": t.get("images", []),
+        }
+
+
+# ── Loading ──────────────────────────────────────────────────────────
+
+def _decimal(value, where, field):
+    try:
+        Decimal(str(value))
+    except InvalidOperation:
+        raise CatalogError(where, f"{field} is not a price: {value!r}")
+
+
+def validate_product(product, where="product"):
+    """Check one catalog record against the product schema; returns it unchanged."""
+    if not isinstance(product, dict):
+        raise CatalogError(where, "expected an object")
+    for field in PRODUCT_STRING_FIELDS:
+        if not isinstance(product.get(field), str):
+            raise CatalogError(where, f"{field} must be a string")
+    if not product["title"].strip():
+        raise CatalogError(where, "title is empty")
+
+    options = product.get("options")
+    if not isinstance(options, list) or not 1 <= len(options) <= 3 \
+            or not all(isinstance(o, dict) and o.get("name") for o in options):
+        raise CatalogError(where, "options must be 1-3 objects with a name")
+
+    variants = product.get("variants")
+    if not isinstance(variants, list) or not variants:
+        raise CatalogError(where, "variants must be a non-empty list")
+    for i, v in enumerate(variants):
+        vwhere = f"{where} variant {i + 1}"
+        if not isinstance(v, dict):
+            raise CatalogError(vwhere, "expected an object")
+        for field in ("title", "sku"):
+            if not isinstance(v.get(field), str) or not v[field]:
+                raise CatalogError(vwhere, f"{field} must be a non-empty string")
+        _decimal(v.get("price"), vwhere, "price")
+        if v.get("compare_at_price") is not None:
+            _decimal(v["compare_at_price"], vwhere, "compare_at_price")
+        qty = v.get("inventory_quantity", 0)
+        if not isinstance(qty, int) or qty < 0:
+            raise CatalogError(vwhere, "inventory_quantity must be a non-negative integer")
+        if "inventory" in v and not isinstance(v["inventory"], dict):
+            raise CatalogError(vwhere, "inventory must map locations to quantities")
+        if not v.get("option1"):
+            raise CatalogError(vwhere, "option1 is required")
+
+    images = product.get("images", [])
+    if not isinstance(images, list) or not all(isinstance(i, dict) and i.get("src") for i in images):
+        raise CatalogError(where, "images must be a list of objects with a src")
+    product.setdefault("images", images)
+    return product
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            where = f"{path}:{line_no}"
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise CatalogError(where, f"invalid JSON ({e.msg})")
+            yield validate_product(record, where)
+
+
+def _csv_product(row):
+    product = {field: row.get(field) or "" for field in PRODUCT_STRING_FIELDS}
+    product["options"] = [{"name": row[f"option{n}_name"]} for n in (1, 2, 3)
+                          if row.get(f"option{n}_name")]
+    product["images"] = [{"src": src} for src in (row.get("images") or "").split("|") if src]
+    product["variants"] = []
+    return product
+
+
+def _csv_variant(row, where):
+    qty = row.get("inventory_quantity") or "0"
+    try:
+        qty = int(qty)
+    except ValueError:
+        raise CatalogError(where, f"inventory_quantity is not an integer: {qty!r}")
+    return {
+        "title": row.get("variant_title") or "",
+        "price": row.get("price") or "",
+        "compare_at_price": row.get("compare_at_price") or None,
+        "sku": row.get("sku") or "",
+        "inventory_quantity": qty,
+        "option1": row.get("option1") or None,
+        "option2": row.get("option2") or None,
+        "option3": row.get("option3") or None,
+    }
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = set(CSV_VARIANT_COLUMNS + ("title",)) - set(reader.fieldnames or ())
+        if missing:
+            raise CatalogError(path, f"missing columns: {', '.join(sorted(missing))}")
+        product, start = None, None
+        for row in reader:
+            where = f"{path}:{reader.line_num}"
+            if product is None or row["title"] != product["title"]:
+                if product is not None:
+                    yield validate_product(product, f"{path}:{start}")
+                product, start = _csv_product(row), reader.line_num
+            product["variants"].append(_csv_variant(row, where))
+        if product is not None:
+            yield validate_product(product, f"{path}:{start}")
+
+
+def load_catalog(path):
+    """Stream validated products from a .jsonl or .csv catalog file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return _read_jsonl(path)
+    if ext == ".csv":
+        return _read_csv(path)
+    raise CatalogError(path, "catalog must be .jsonl, .ndjson or .csv")
+
+
+def load_collections(path):
+    """Collection definitions from a JSON list."""
+    with open(path, encoding="utf-8") as f:
+        collections = json.load(f)
+    for i, coll in enumerate(collections):
+        for field in ("title", "body_html", "image_src"):
+            if not isinstance(coll.get(field), str):
+                raise CatalogError(f"{path} collection {i + 1}", f"{field} must be a string")
+    return collections
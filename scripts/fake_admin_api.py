@@ -0,0 +1,878 @@
+#!/usr/bin/env python3
+"""
+Local in-process stand-in for the parts of the Shopify Admin API the seeding
+scripts use, with simulated latency and leaky-bucket rate limits.
+
+    python scripts/fake_admin_api.py --port 8081
+    SHOPIFY_ADMIN_BASE_URL=http://127.0.0.1:8081/admin/api/2024-10 \\
+        SHOPIFY_ADMIN_TOKEN=fake python scripts/populate_shopify.py
+
+REST: products, custom_collections, smart_collections, collects, locations,
+inventory_levels (list and set). GraphQL: inventorySetQuantities,
+inventoryBulkToggleActivation, collectionAddProducts, collectionRemoveProducts, productDelete,
+productSet, publications and publishablePublish, Files (fileCreate from staged
+uploads, fileUpdate references, nodes lookups) and bulk
+operations (bulkOperationRunMutation, bulkOperationRunQuery for the snapshot
+queries, node polling). Staged uploads, bulk result files and placeholder
+product images (IMAGES_PREFIX) are served from the same port; bulk operations
+complete synchronously.
+"""
+
+import argparse
+import base64
+import gzip
+import itertools
+import json
+import re
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+API_PREFIX = "/admin/api/2024-10/"
+UPLOAD_PATH = "/staged-uploads"
+RESULTS_PREFIX = "/bulk-results/"
+# Stand-in image host: any name under it is a small image of its own
+IMAGES_PREFIX = "/images/"
+
+LOCATIONS = [
+    {"id": 1001, "name": "Main Warehouse"},
+    {"id": 1002, "name": "Retail Store"},
+]
+
+# The only sales channel; publishablePublish accepts nothing else
+ONLINE_STORE_PUBLICATION = 2001
+
+# Flat GraphQL cost charged per query or mutation
+GRAPHQL_COST = 10
+
+# Seconds a created file stays UPLOADED before it turns READY
+FILE_PROCESSING_SECONDS = 0.2
+
+
+def _handleize(title):
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def _gid_id(value):
+    return int(str(value).rsplit("/", 1)[-1])
+
+
+def _argument(query, variables, name):
+    """Value of a field argument, following `name: $var` to the variables."""
+    m = re.search(rf"\b{name}\s*:\s*\$(\w+)", query)
+    return variables.get(m.group(1)) if m else None
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S-00:00", time.gmtime())
+
+
+class Bucket:
+    """Leaky bucket: `size` slots draining at `leak_rate` per second."""
+
+    def __init__(self, size, leak_rate):
+        self.size = size
+        self.leak_rate = leak_rate
+        self.level = 0.0
+        self.updated = time.monotonic()
+
+    def take(self, amount=1):
+        """Add `amount` to the bucket; returns False if it would overflow."""
+        now = time.monotonic()
+        self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+        self.updated = now
+        if self.level + amount > self.size:
+            return False
+        self.level += amount
+        return True
+
+    @property
+    def available(self):
+        return max(0.0, self.size - self.level)
+
+
+class FakeStore:
+    """In-memory store state plus request accounting."""
+
+    def __init__(self):
+        self.ids = itertools.count(10_000)
+        self.products = {}
+        self.custom_collections = {}
+        self.smart_collections = {}
+        self.collects = {}
+        self.levels = {}  # (inventory_item_id, location_id) -> available
+        self.level_updated = {}  # (inventory_item_id, location_id) -> updated_at
+        self.item_variant = {}  # inventory_item_id -> variant
+        self.handles = set()
+        self.collect_pairs = set()  # (collection_id, product_id)
+        self.requests = 0
+        self.throttled = 0
+        self.connections = 0
+        self.by_endpoint = {}
+        self.uploads = {}  # staged upload key -> bytes
+        self.bulk_operations = {}  # id -> BulkOperation node
+        self.bulk_results = {}  # result file name -> bytes
+        self.files = {}  # file gid -> MediaImage node plus "created"
+
+    def next_id(self):
+        return next(self.ids)
+
+    # ── Products ──
+
+    def create_product(self, data):
+        pid = self.next_id()
+        handle = base = _handleize(data["title"])
+        for n in itertools.count(1):
+            if handle not in self.handles:
+                break
+            handle = f"{base}-{n}"
+        self.handles.add(handle)
+        product = {
+            "id": pid,
+            "handle": handle,
+            "title": data["title"],
+            "body_html": data.get("body_html"),
+            "vendor": data.get("vendor"),
+            "product_type": data.get("product_type", ""),
+            "tags": ", ".join(sorted(t.strip() for t in data.get("tags", "").split(",") if t.strip())),
+            "status": data.get("status", "active"),
+            # REST creates publish to the Online Store; productSet does not
+            "published_at": _now() if data.get("published", True) else None,
+            "options": [{"name": o["name"], "position": i + 1}
+                        for i, o in enumerate(data.get("options") or [{"name": "Title"}])],
+            "images": [{"id": self.next_id(), "src": img["src"]} for img in data.get("images", [])],
+            "variants": [],
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        for v in data.get("variants") or [{"title": "Default Title", "price": "0.00"}]:
+            product["variants"].append(self._new_variant(pid, v))
+        self.products[pid] = product
+        return product
+
+    def _new_variant(self, product_id, v):
+        item_id = self.next_id()
+        variant = {
+            "id": self.next_id(),
+            "product_id": product_id,
+            "title": v.get("title", "Default Title"),
+            "price": v.get("price", "0.00"),
+            "compare_at_price": v.get("compare_at_price"),
+            "sku": v.get("sku"),
+            "option1": v.get("option1"),
+            "option2": v.get("option2"),
+            "option3": v.get("option3"),
+            "inventory_item_id": item_id,
+            "inventory_quantity": 0,
+        }
+        self.item_variant[item_id] = variant
+        # New items are stocked at the primary location only, as in Shopify
+        self.activate(item_id, LOCATIONS[0]["id"])
+        return variant
+
+    def update_product(self, pid, data):
+        product = self.products[pid]
+        for field in ("title", "body_html", "vendor", "product_type", "tags", "status"):
+            if field in data:
+                product[field] = data[field]
+        if "options" in data:
+            product["options"] = [{"name": o["name"], "position": i + 1}
+                                  for i, o in enumerate(data["options"])]
+        if "variants" in data:
+            existing = {v["id"]: v for v in product["variants"]}
+            variants = []
+            for v in data["variants"]:
+                if v.get("id") in existing:
+                    current = existing.pop(v["id"])
+                    current.update({k: val for k, val in v.items() if k != "id"})
+                    variants.append(current)
+                else:
+                    variants.append(self._new_variant(pid, v))
+            for gone in existing.values():
+                self.item_variant.pop(gone["inventory_item_id"], None)
+            product["variants"] = variants
+        product["updated_at"] = _now()
+        return product
+
+    def delete_product(self, pid):
+        product = self.products.pop(pid, None)
+        if product is None:
+            return False
+        self.handles.discard(product["handle"])
+        for v in product["variants"]:
+            self.item_variant.pop(v["inventory_item_id"], None)
+        for cid in [c["id"] for c in self.collects.values() if c["product_id"] == pid]:
+            self._drop_collect(cid)
+        return True
+
+    def _drop_collect(self, collect_id):
+        collect = self.collects.pop(collect_id, None)
+        if collect:
+            self.collect_pairs.discard((collect["collection_id"], collect["product_id"]))
+        return collect is not None
+
+    # ── Collections ──
+
+    def add_collect(self, collection_id, product_id):
+        if product_id not in self.products:
+            return None, "product does not exist"
+        if (collection_id, product_id) in self.collect_pairs:
+            return None, "product is already in the collection"
+        collect = {"id": self.next_id(), "collection_id": collection_id, "product_id": product_id}
+        self.collects[collect["id"]] = collect
+        self.collect_pairs.add((collection_id, product_id))
+        return collect, None
+
+    def delete_collection(self, table, cid):
+        if table.pop(cid, None) is None:
+            return False
+        for collect_id in [c["id"] for c in self.collects.values() if c["collection_id"] == cid]:
+            self._drop_collect(collect_id)
+        return True
+
+    # ── Inventory ──
+
+    def activate(self, item_id, location_id):
+        if (item_id, location_id) not in self.levels:
+            self.levels[item_id, location_id] = 0
+            self.level_updated[item_id, location_id] = _now()
+
+    def set_level(self, item_id, location_id, available, connect=False):
+        """Set a level; `connect` stocks the item at the location first, as REST set.json does."""
+        if item_id not in self.item_variant:
+            return "inventory item does not exist"
+        if location_id not in {loc["id"] for loc in LOCATIONS}:
+            return "location does not exist"
+        if (item_id, location_id) not in self.levels and not connect:
+            return "inventory item is not stocked at the location"
+        self.levels[item_id, location_id] = available
+        self.level_updated[item_id, location_id] = _now()
+        variant = self.item_variant[item_id]
+        variant["inventory_quantity"] = sum(self.levels.get((item_id, loc["id"]), 0) for loc in LOCATIONS)
+        return None
+
+
+class FakeAdminAPI:
+    """Runs the fake Admin API on a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, bucket_size=40, leak_rate=2.0,
+                 graphql_bucket=1000, graphql_restore=50.0, outage=None):
+        self.store = FakeStore()
+        self.latency = latency
+        # (after, count): requests after..after+count answer 503, like a brief outage
+        self.outage = outage
+        self.rest_bucket = Bucket(bucket_size, leak_rate)
+        self.graphql_bucket = Bucket(graphql_bucket, graphql_restore)
+        self.lock = threading.RLock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX.rstrip('/')}"
+
+    def image_url(self, name):
+        """URL of a placeholder image served by the fake."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{IMAGES_PREFIX}{name}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        s = self.store
+        return {"requests": s.requests, "throttled": s.throttled,
+                "connections": s.connections, "by_endpoint": dict(s.by_endpoint)}
+
+    def reset_stats(self):
+        with self.lock:
+            s = self.store
+            s.requests = s.throttled = s.connections = 0
+            s.by_endpoint = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.api.lock:
+            self.server.api.store.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    # ── Plumbing ──
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else {}
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload if payload is not None else {}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 512:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _origin(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _staged_upload(self):
+        """Accept a multipart form POST the way cloud storage would."""
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        head = f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode()
+        form = {}
+        for part in BytesParser(policy=HTTP).parsebytes(head + raw).iter_parts():
+            form[part.get_param("name", header="content-disposition")] = part.get_payload(decode=True)
+        api = self.server.api
+        with api.lock:
+            api.store.uploads[form["key"].decode()] = form["file"]
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _bulk_result(self, name):
+        body = self.server.api.store.bulk_results.get(name)
+        if body is None:
+            self._send(404, {"errors": "Not Found"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/jsonl")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _image(self, name):
+        body = b"\x89PNG\r\n\x1a\n" + name.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        api = self.server.api
+        url = urlparse(self.path)
+        if url.path.startswith(IMAGES_PREFIX) and method == "GET":
+            self._image(url.path[len(IMAGES_PREFIX):])
+            return
+        if url.path == UPLOAD_PATH and method == "POST":
+            self._staged_upload()
+            return
+        if url.path.startswith(RESULTS_PREFIX) and method == "GET":
+            self._bulk_result(url.path[len(RESULTS_PREFIX):])
+            return
+        if not url.path.startswith(API_PREFIX):
+            self._send(404, {"errors": "Not Found"})
+            return
+        path = url.path[len(API_PREFIX):]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = self._body() if method in ("POST", "PUT") else {}
+        endpoint = f"{method} " + re.sub(r"/\d+", "/{id}", path)
+
+        if api.latency:
+            time.sleep(api.latency)
+        with api.lock:
+            store = api.store
+            store.requests += 1
+            store.by_endpoint[endpoint] = store.by_endpoint.get(endpoint, 0) + 1
+            if api.outage and api.outage[0] < store.requests <= sum(api.outage):
+                status, payload, headers = 503, {"errors": "Service Unavailable"}, {}
+            elif path == "graphql.json":
+                status, payload, headers = self._graphql(api, body)
+            elif not api.rest_bucket.take():
+                store.throttled += 1
+                size = api.rest_bucket.size
+                status, payload = 429, {"errors": "Exceeded 2 calls per second for api client."}
+                headers = {"Retry-After": "1.0", "X-Shopify-Shop-Api-Call-Limit": f"{size}/{size}"}
+            else:
+                status, payload, headers = self._rest(method, path, query, body)
+                headers["X-Shopify-Shop-Api-Call-Limit"] = \
+                    f"{int(round(api.rest_bucket.level))}/{api.rest_bucket.size}"
+        self._send(status, payload, headers)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # ── REST ──
+
+    def _page(self, key, records, query, path):
+        """Cursor pagination over records sorted by ID, like page_info."""
+        limit = min(int(query.get("limit", 50)), 250)
+        after = int(query.get("since_id", 0))
+        if "page_info" in query:
+            after = int(base64.urlsafe_b64decode(query["page_info"]).decode())
+        records = sorted((r for r in records if r["id"] > after), key=lambda r: r["id"])
+        page, more = records[:limit], len(records) > limit
+        headers = {}
+        if more:
+            cursor = base64.urlsafe_b64encode(str(page[-1]["id"]).encode()).decode()
+            # Filters ride along in the cursor URL, as Shopify keeps them in page_info
+            params = {k: v for k, v in query.items() if k not in ("page_info", "since_id")}
+            params.update(limit=limit, page_info=cursor)
+            host, port = self.server.server_address[:2]
+            headers["Link"] = f'<http://{host}:{port}{API_PREFIX}{path}?{urlencode(params)}>; rel="next"'
+        if "fields" in query:
+            fields = query["fields"].split(",")
+            page = [{f: r[f] for f in fields if f in r} for r in page]
+        return 200, {key: page}, headers
+
+    def _rest(self, method, path, query, body):
+        store = self.server.api.store
+        m = re.fullmatch(r"(products|custom_collections|smart_collections|collects)/(\d+)\.json", path)
+        if m:
+            table, rid = m.group(1), int(m.group(2))
+            return self._rest_item(method, table, rid, body)
+
+        if path == "products.json" and method == "GET":
+            products = store.products.values()
+            if "updated_at_min" in query:
+                products = [p for p in products if p["updated_at"] >= query["updated_at_min"]]
+            if "ids" in query:
+                wanted = {int(i) for i in query["ids"].split(",") if i}
+                products = [p for p in products if p["id"] in wanted]
+            return self._page("products", products, query, path)
+        if path == "products.json" and method == "POST":
+            return 201, {"product": store.create_product(body["product"])}, {}
+        m = re.fullmatch(r"(products|custom_collections|smart_collections|collects)/count\.json", path)
+        if m:
+            return 200, {"count": len(getattr(store, m.group(1)))}, {}
+        if path in ("custom_collections.json", "smart_collections.json") and method == "GET":
+            key = path[:-len(".json")]
+            records = getattr(store, key).values()
+            if "updated_at_min" in query:
+                records = [c for c in records if c.get("updated_at", "") >= query["updated_at_min"]]
+            return self._page(key, records, query, path)
+        if path == "custom_collections.json" and method == "POST":
+            data = body["custom_collection"]
+            coll = {"id": store.next_id(), "title": data["title"], "body_html": data.get("body_html"),
+                    "handle": _handleize(data["title"]), "updated_at": _now()}
+            store.custom_collections[coll["id"]] = coll
+            for collect in data.get("collects", []):
+                store.add_collect(coll["id"], collect["product_id"])
+            return 201, {"custom_collection": coll}, {}
+        if path == "collects.json" and method == "GET":
+            collects = store.collects.values()
+            if "collection_id" in query:
+                collects = [c for c in collects if c["collection_id"] == int(query["collection_id"])]
+            return self._page("collects", collects, query, path)
+        if path == "collects.json" and method == "POST":
+            data = body["collect"]
+            collect, error = store.add_collect(data["collection_id"], data["product_id"])
+            if error:
+                return 422, {"errors": {"product_id": [error]}}, {}
+            return 201, {"collect": collect}, {}
+        if path == "locations.json":
+            return 200, {"locations": [dict(loc, active=True) for loc in LOCATIONS]}, {}
+        if path == "inventory_levels.json":
+            items = [int(i) for i in query.get("inventory_item_ids", "").split(",") if i]
+            locations = [int(i) for i in query.get("location_ids", "").split(",") if i]
+            locations = locations or [loc["id"] for loc in LOCATIONS]
+            # Levels have no ID of their own; a stable synthetic one drives the paging
+            levels = [{"id": iid * len(LOCATIONS) + n, "inventory_item_id": iid, "location_id": lid,
+                       "available": store.levels[iid, lid], "updated_at": store.level_updated[iid, lid]}
+                      for iid in items or list(store.item_variant)
+                      for n, lid in enumerate(locations)
+                      if iid in store.item_variant and (iid, lid) in store.levels]
+            if "updated_at_min" in query:
+                levels = [level for level in levels if level["updated_at"] >= query["updated_at_min"]]
+            status, payload, headers = self._page("inventory_levels", levels, query, path)
+            for level in payload["inventory_levels"]:
+                level.pop("id", None)
+            return status, payload, headers
+        if path == "inventory_levels/set.json" and method == "POST":
+            error = store.set_level(body["inventory_item_id"], body["location_id"], body["available"], connect=True)
+            if error:
+                return 422, {"errors": [error]}, {}
+            return 200, {"inventory_level": {k: body[k] for k in
+                                             ("inventory_item_id", "location_id", "available")}}, {}
+        return 404, {"errors": "Not Found"}, {}
+
+    def _rest_item(self, method, table, rid, body):
+        store = self.server.api.store
+        records = getattr(store, table)
+        singular = table[:-1]
+        if method == "GET":
+            if rid not in records:
+                return 404, {"errors": "Not Found"}, {}
+            return 200, {singular: records[rid]}, {}
+        if method == "DELETE":
+            if table == "products":
+                found = store.delete_product(rid)
+            elif table == "collects":
+                found = store._drop_collect(rid)
+            else:
+                found = store.delete_collection(records, rid)
+            return (200, {}, {}) if found else (404, {"errors": "Not Found"}, {})
+        if method == "PUT":
+            if rid not in records:
+                return 404, {"errors": "Not Found"}, {}
+            data = body[singular]
+            if table == "products":
+                return 200, {"product": store.update_product(rid, data)}, {}
+            records[rid].update({k: v for k, v in data.items() if k != "id"}, updated_at=_now())
+            return 200, {singular: records[rid]}, {}
+        return 405, {"errors": "Method Not Allowed"}, {}
+
+    # ── GraphQL ──
+
+    def _graphql(self, api, body):
+        bucket = api.graphql_bucket
+        cost = {"requestedQueryCost": GRAPHQL_COST, "actualQueryCost": GRAPHQL_COST}
+        if not bucket.take(GRAPHQL_COST):
+            api.store.throttled += 1
+            cost["throttleStatus"] = {"maximumAvailable": bucket.size,
+                                      "currentlyAvailable": int(bucket.available),
+                                      "restoreRate": bucket.leak_rate}
+            return 200, {"errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                         "extensions": {"cost": cost}}, {}
+        cost["throttleStatus"] = {"maximumAvailable": bucket.size,
+                                  "currentlyAvailable": int(bucket.available),
+                                  "restoreRate": bucket.leak_rate}
+
+        query, variables = body.get("query", ""), body.get("variables") or {}
+        handler = self._operation(query)
+        if handler is None:
+            return 200, {"errors": [{"message": "Operation not supported by the fake Admin API"}]}, {}
+        return 200, {"data": handler(api.store, variables, query), "extensions": {"cost": cost}}, {}
+
+    def _operation(self, query):
+        return next((getattr(self, f"_gql_{name.rstrip('(')}") for name in GRAPHQL_OPERATIONS
+                     if name in query), None)
+
+    def _gql_inventorySetQuantities(self, store, variables, query):
+        quantities = variables["input"]["quantities"]
+        errors = []
+        for i, q in enumerate(quantities):
+            item_id = _gid_id(q["inventoryItemId"])
+            if item_id not in store.item_variant:
+                errors.append({"field": ["input", "quantities", str(i), "inventoryItemId"],
+                               "message": "The specified inventory item could not be found.",
+                               "code": "INVALID_INVENTORY_ITEM"})
+            elif _gid_id(q["locationId"]) not in {loc["id"] for loc in LOCATIONS}:
+                errors.append({"field": ["input", "quantities", str(i), "locationId"],
+                               "message": "The specified location could not be found.",
+                               "code": "INVALID_LOCATION"})
+            elif (item_id, _gid_id(q["locationId"])) not in store.levels:
+                errors.append({"field": ["input", "quantities", str(i), "locationId"],
+                               "message": "The specified inventory item is not stocked at the location.",
+                               "code": "ITEM_NOT_STOCKED_AT_LOCATION"})
+        if not errors:
+            for q in quantities:
+                store.set_level(_gid_id(q["inventoryItemId"]), _gid_id(q["locationId"]), q["quantity"])
+        return {"inventorySetQuantities": {"userErrors": errors}}
+
+    def _gql_inventoryBulkToggleActivation(self, store, variables, query):
+        item_id = _gid_id(variables["inventoryItemId"])
+        if item_id not in store.item_variant:
+            return {"inventoryBulkToggleActivation": {"userErrors": [
+                {"field": ["inventoryItemId"], "message": "The specified inventory item could not be found.",
+                 "code": "INVENTORY_ITEM_NOT_FOUND"}]}}
+        locations = {loc["id"] for loc in LOCATIONS}
+        errors = [{"field": ["inventoryItemUpdates", str(i), "locationId"],
+                   "message": "The specified location could not be found.", "code": "LOCATION_NOT_FOUND"}
+                  for i, u in enumerate(variables["inventoryItemUpdates"]) if _gid_id(u["locationId"]) not in locations]
+        if not errors:
+            for u in variables["inventoryItemUpdates"]:
+                if u.get("activate", True):
+                    store.activate(item_id, _gid_id(u["locationId"]))
+        return {"inventoryBulkToggleActivation": {"userErrors": errors}}
+
+    def _gql_collectionAddProducts(self, store, variables, query):
+        cid = _gid_id(variables["id"])
+        if cid not in store.custom_collections:
+            return {"collectionAddProducts": {"userErrors": [
+                {"field": ["id"], "message": "Collection does not exist"}]}}
+        errors = []
+        for pid in variables["productIds"]:
+            _, error = store.add_collect(cid, _gid_id(pid))
+            if error:
+                errors.append({"field": ["productIds"], "message": error})
+        return {"collectionAddProducts": {"userErrors": errors}}
+
+
+    def _gql_collectionRemoveProducts(self, store, variables, query):
+        cid = _gid_id(variables["id"])
+        if cid not in store.custom_collections:
+            return {"collectionRemoveProducts": {"userErrors": [
+                {"field": ["id"], "message": "Collection does not exist"}]}}
+        remove = {_gid_id(pid) for pid in variables["productIds"]}
+        for collect in [c for c in store.collects.values()
+                        if c["collection_id"] == cid and c["product_id"] in remove]:
+            store._drop_collect(collect["id"])
+        return {"collectionRemoveProducts": {"userErrors": []}}
+
+    def _gql_productDelete(self, store, variables, query):
+        pid = _gid_id(variables["input"]["id"])
+        if not store.delete_product(pid):
+            return {"productDelete": {"deletedProductId": None, "userErrors": [
+                {"field": ["id"], "message": "Product does not exist"}]}}
+        return {"productDelete": {"deletedProductId": variables["input"]["id"], "userErrors": []}}
+
+    def _gql_productSet(self, store, variables, query):
+        spec = variables["input"]
+        options = [o["name"] for o in spec.get("productOptions") or []]
+        locations = {loc["id"] for loc in LOCATIONS}
+        for i, v in enumerate(spec.get("variants") or []):
+            for q in v.get("inventoryQuantities") or []:
+                if _gid_id(q["locationId"]) not in locations:
+                    return {"productSet": {"product": None, "userErrors": [
+                        {"field": ["input", "variants", str(i), "inventoryQuantities"],
+                         "message": "The specified location could not be found.", "code": "INVALID"}]}}
+        variants = []
+        for v in spec.get("variants") or []:
+            values = {o["optionName"]: o["name"] for o in v.get("optionValues") or []}
+            selected = [values.get(name) for name in options]
+            variant = {"title": " / ".join(value for value in selected if value) or "Default Title",
+                       "price": v.get("price", "0.00"), "compare_at_price": v.get("compareAtPrice"),
+                       "sku": (v.get("inventoryItem") or {}).get("sku")}
+            variant.update({f"option{n}": value for n, value in enumerate(selected, 1)})
+            variants.append(variant)
+        product = store.create_product({
+            "title": spec["title"], "body_html": spec.get("descriptionHtml"), "vendor": spec.get("vendor"),
+            "product_type": spec.get("productType", ""), "tags": ", ".join(spec.get("tags") or []),
+            "status": spec.get("status", "ACTIVE").lower(), "options": [{"name": name} for name in options],
+            "images": [{"src": f["originalSource"]} for f in spec.get("files") or []],
+            "variants": variants, "published": False,
+        })
+        for variant, v in zip(product["variants"], spec.get("variants") or []):
+            for q in v.get("inventoryQuantities") or []:
+                # productSet stocks the item at every location it names
+                store.set_level(variant["inventory_item_id"], _gid_id(q["locationId"]), q["quantity"], connect=True)
+        return {"productSet": {"userErrors": [], "product": {
+            "id": f"gid://shopify/Product/{product['id']}", "title": product["title"],
+            "variants": {"nodes": [{"id": f"gid://shopify/ProductVariant/{v['id']}", "title": v["title"],
+                                    "inventoryItem": {"id": f"gid://shopify/InventoryItem/{v['inventory_item_id']}"}}
+                                   for v in product["variants"]]},
+        }}}
+
+    def _gql_publications(self, store, variables, query):
+        return {"publications": {"nodes": [{"id": f"gid://shopify/Publication/{ONLINE_STORE_PUBLICATION}",
+                                            "name": "Online Store"}]}}
+
+    def _gql_publishablePublish(self, store, variables, query):
+        product = store.products.get(_gid_id(variables["id"]))
+        if product is None:
+            return {"publishablePublish": {"userErrors": [{"field": ["id"], "message": "Product does not exist"}]}}
+        if any(_gid_id(p["publicationId"]) != ONLINE_STORE_PUBLICATION for p in variables["input"]):
+            return {"publishablePublish": {"userErrors": [
+                {"field": ["input"], "message": "Publication does not exist"}]}}
+        product["published_at"] = product["published_at"] or _now()
+        return {"publishablePublish": {"userErrors": []}}
+
+    # ── Bulk operations ──
+
+    def _gql_stagedUploadsCreate(self, store, variables, query):
+        targets = []
+        for target in variables["input"]:
+            key = f"tmp/{store.next_id()}/{target['filename']}"
+            targets.append({"url": self._origin() + UPLOAD_PATH,
+                            "resourceUrl": f"{self._origin()}{UPLOAD_PATH}/{key}",
+                            "parameters": [{"name": "key", "value": key}]})
+        return {"stagedUploadsCreate": {"stagedTargets": targets, "userErrors": []}}
+
+    def _gql_bulkOperationRunMutation(self, store, variables, query):
+        def failed(message):
+            return {"bulkOperationRunMutation": {"bulkOperation": None,
+                                                 "userErrors": [{"field": None, "message": message}]}}
+
+        upload = store.uploads.pop(_argument(query, variables, "stagedUploadPath"), None)
+        if upload is None:
+            return failed("The staged upload could not be found.")
+        mutation = _argument(query, variables, "mutation") or ""
+        handler = self._operation(mutation)
+        if handler is None:
+            return failed("Mutation not supported by the fake Admin API.")
+
+        lines = []
+        for number, line in enumerate(upload.decode("utf-8").splitlines()):
+            if line.strip():
+                data = handler(store, json.loads(line), mutation)
+                lines.append({"data": data, "__lineNumber": number})
+        return {"bulkOperationRunMutation": self._finish_bulk(store, lines)}
+
+    def _gql_bulkOperationRunQuery(self, store, variables, query):
+        bulk_query = _argument(query, variables, "query") or ""
+        m = re.match(r"\s*(?:query\s*)?\{\s*(\w+)", bulk_query)
+        lines = getattr(self, f"_bulk_{m.group(1)}", None) if m else None
+        if lines is None:
+            return {"bulkOperationRunQuery": {"bulkOperation": None, "userErrors": [
+                {"field": ["query"], "message": "Query not supported by the fake Admin API."}]}}
+        return {"bulkOperationRunQuery": self._finish_bulk(store, list(lines(store)))}
+
+    def _finish_bulk(self, store, lines):
+        """Store a finished operation's JSONL result; returns the run payload."""
+        op_id = f"gid://shopify/BulkOperation/{store.next_id()}"
+        name = f"{_gid_id(op_id)}.jsonl"
+        store.bulk_results[name] = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        store.bulk_operations[op_id] = {
+            "id": op_id, "status": "COMPLETED", "errorCode": None,
+            "objectCount": str(len(lines)), "partialDataUrl": None,
+            "url": self._origin() + RESULTS_PREFIX + name if lines else None,
+        }
+        return {"bulkOperation": {"id": op_id, "status": "CREATED"}, "userErrors": []}
+
+    # Bulk query results, flattened with __parentId like Shopify's JSONL; they
+    # always carry the fields snapshot.py asks for, whatever the query selects
+
+    def _bulk_products(self, store):
+        memberships = {}
+        for c in store.collects.values():
+            memberships.setdefault(c["product_id"], []).append(c["collection_id"])
+        for p in store.products.values():
+            product_gid = f"gid://shopify/Product/{p['id']}"
+            yield {"id": product_gid, "handle": p["handle"], "title": p["title"],
+                   "descriptionHtml": p["body_html"], "vendor": p["vendor"], "productType": p["product_type"],
+                   "tags": [t.strip() for t in p["tags"].split(",") if t.strip()],
+                   "status": p["status"].upper(), "updatedAt": p["updated_at"],
+                   "options": [{"name": o["name"]} for o in p["options"]]}
+            for v in p["variants"]:
+                selected = [{"name": o["name"], "value": v.get(f"option{n}")}
+                            for n, o in enumerate(p["options"], 1) if v.get(f"option{n}")]
+                yield {"id": f"gid://shopify/ProductVariant/{v['id']}", "title": v["title"], "sku": v["sku"],
+                       "price": v["price"], "compareAtPrice": v["compare_at_price"],
+                       "inventoryQuantity": v["inventory_quantity"], "selectedOptions": selected,
+                       "inventoryItem": {"id": f"gid://shopify/InventoryItem/{v['inventory_item_id']}"},
+                       "__parentId": product_gid}
+            for cid in memberships.get(p["id"], []):
+                yield {"id": f"gid://shopify/Collection/{cid}", "__parentId": product_gid}
+
+    def _bulk_locations(self, store):
+        for loc in LOCATIONS:
+            location_gid = f"gid://shopify/Location/{loc['id']}"
+            yield {"id": location_gid, "name": loc["name"]}
+            for item_id in store.item_variant:
+                if (item_id, loc["id"]) not in store.levels:
+                    continue
+                yield {"item": {"id": f"gid://shopify/InventoryItem/{item_id}"},
+                       "quantities": [{"name": "available", "quantity": store.levels[item_id, loc["id"]]}],
+                       "__parentId": location_gid}
+
+    def _bulk_collections(self, store):
+        for table, rule_set in ((store.custom_collections, None),
+                                (store.smart_collections, {"appliedDisjunctively": False})):
+            for c in table.values():
+                yield {"id": f"gid://shopify/Collection/{c['id']}", "handle": c.get("handle"),
+                       "title": c["title"], "descriptionHtml": c.get("body_html"),
+                       "updatedAt": c.get("updated_at"), "ruleSet": rule_set}
+
+    # ── Files ──
+
+    def _file_node(self, store, file_id):
+        node = store.files.get(file_id)
+        if node is None:
+            return None
+        if node["fileStatus"] == "UPLOADED" and time.monotonic() - node["created"] >= FILE_PROCESSING_SECONDS:
+            node["fileStatus"] = "READY"
+        return {k: v for k, v in node.items() if k != "created"}
+
+    def _gql_fileCreate(self, store, variables, query):
+        files, errors = [], []
+        prefix = f"{self._origin()}{UPLOAD_PATH}/"
+        for i, spec in enumerate(variables["files"]):
+            source = spec["originalSource"]
+            key = source[len(prefix):] if source.startswith(prefix) else None
+            if key not in store.uploads:
+                errors.append({"field": ["files", str(i), "originalSource"],
+                               "message": "The staged upload could not be found."})
+                continue
+            store.uploads.pop(key)
+            file_id = f"gid://shopify/MediaImage/{store.next_id()}"
+            store.files[file_id] = {"id": file_id, "fileStatus": "UPLOADED", "created": time.monotonic(),
+                                    "url": source}
+            files.append({"id": file_id, "fileStatus": "UPLOADED"})
+        return {"fileCreate": {"files": files if not errors else [], "userErrors": errors}}
+
+    def _gql_fileUpdate(self, store, variables, query):
+        errors = []
+        for i, spec in enumerate(variables["files"]):
+            node = self._file_node(store, spec["id"])
+            if node is None:
+                errors.append({"field": ["files", str(i), "id"], "message": "File does not exist.",
+                               "code": "FILE_DOES_NOT_EXIST"})
+            elif node["fileStatus"] != "READY":
+                errors.append({"field": ["files", str(i), "id"], "message": "Non-ready files can't be updated.",
+                               "code": "NON_READY_STATE"})
+            elif any(_gid_id(pid) not in store.products for pid in spec.get("referencesToAdd", [])):
+                errors.append({"field": ["files", str(i), "referencesToAdd"],
+                               "message": "The product could not be found.", "code": "INVALID"})
+        if not errors:
+            for spec in variables["files"]:
+                src = store.files[spec["id"]]["url"]
+                for pid in spec.get("referencesToAdd", []):
+                    product = store.products[_gid_id(pid)]
+                    product["images"].append({"id": store.next_id(), "src": src})
+                    product["updated_at"] = _now()
+        return {"fileUpdate": {"userErrors": errors}}
+
+    def _gql_nodes(self, store, variables, query):
+        return {"nodes": [self._file_node(store, i) for i in variables["ids"]]}
+
+    def _gql_node(self, store, variables, query):
+        return {"node": store.bulk_operations.get(variables["id"])}
+
+
+# Matched against the query text in order, so wrappers come before what they wrap
+GRAPHQL_OPERATIONS = ("stagedUploadsCreate", "bulkOperationRunMutation", "bulkOperationRunQuery",
+                      "inventorySetQuantities", "inventoryBulkToggleActivation",
+                      "collectionAddProducts", "collectionRemoveProducts",
+                      "productDelete", "productSet", "publishablePublish", "publications(",
+                      "fileCreate", "fileUpdate", "nodes(", "node(")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake Shopify Admin API.")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--bucket-size", type=int, default=40)
+    parser.add_argument("--leak-rate", type=float, default=2.0)
+    parser.add_argument("--outage", metavar="AFTER:COUNT",
+                        help="answer 503 to COUNT requests after the first AFTER, e.g. 200:50")
+    args = parser.parse_args()
+
+    outage = tuple(int(n) for n in args.outage.split(":")) if args.outage else None
+    api = FakeAdminAPI(port=args.port, latency=args.latency, bucket_size=args.bucket_size,
+                       leak_rate=args.leak_rate, outage=outage)
+    print(f"Fake Admin API at {api.base_url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
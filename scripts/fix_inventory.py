@@ -4,76 +4,91 @@ Fix inventory levels for all products in the Shopify store.
 The original populate script silently failed to set inventory quantities.
 """
 
-import requests
-import time
+import argparse
 import os
 
+from inventory_writer import LEVELS_CHUNK, InventoryWriter, describe, fetch_levels, item_key
+from journal import Journal
+from locations import LocationCache
+from mirror import open_mirror
+from profiling import Profiler
+from shopify_admin import AdminClient
+from snapshot import inventory_levels, load_snapshot
+from spool import Spool
+
 SHOP_DOMAIN = os.environ.get("SHOPIFY_ADMIN_DOMAIN", "sefadevtest.myshopify.com")
 ACCESS_TOKEN = os.environ["SHOPIFY_ADMIN_TOKEN"]  # Required: Shopify Admin API access token
 API_VERSION = "2024-10"
-BASE_URL = f"https://{SHOP_DOMAIN}/admin/api/{API_VERSION}"
 
-HEADERS = {
-    "X-Shopify-Access-Token": ACCESS_TOKEN,
-    "Content-Type": "application/json",
-}
+CLIENT = AdminClient(SHOP_DOMAIN, ACCESS_TOKEN, API_VERSION)
+LOCATIONS = LocationCache(CLIENT)
+PROFILE = Profiler(CLIENT.metrics)  # started by --profile
 
 
 def api_get(endpoint, params=None):
-    r = requests.get(f"{BASE_URL}/{endpoint}", headers=HEADERS, params=params)
+    r = CLIENT.get(endpoint, params=params)
     r.raise_for_status()
     return r.json()
 
 
 def get_location_id():
-    locations = api_get("locations.json")
-    loc = locations["locations"][0]
+    loc = LOCATIONS.default()
     print(f"Location: {loc['name']} (ID: {loc['id']})")
     return loc["id"]
 
 
 def get_all_products():
-    """Get all products with their variants."""
-    all_products = []
+    """Yield all products with their variants, one page at a time."""
     params = {"limit": 250, "fields": "id,title,variants"}
-    while True:
-        data = api_get("products.json", params)
-        products = data.get("products", [])
-        if not products:
-            break
-        all_products.extend(products)
-        # Check for pagination
-        link = None  # simplified, just get first page for our small store
-        break
-    return all_products
-
-
-def set_inventory(inventory_item_id, location_id, available):
-    """Set inventory level for a variant."""
-    url = f"{BASE_URL}/inventory_levels/set.json"
-    payload = {
-        "location_id": location_id,
-        "inventory_item_id": inventory_item_id,
-        "available": available,
-    }
-    r = requests.post(url, headers=HEADERS, json=payload)
-    if r.status_code >= 400:
-        print(f"    ERROR {r.status_code}: {r.text[:200]}")
-        return False
-    return True
+    yield from CLIENT.paginate("products.json", "products", params)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Reset inventory levels for every product variant.")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip variants an interrupted run already fixed")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="read current levels first and only write variants that differ")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="read products (and, with --reconcile, levels) from a snapshot.py file")
+    parser.add_argument("--mirror", metavar="PATH",
+                        help="refresh a local SQLite mirror (see mirror.py) and read products and levels from it")
+    parser.add_argument("--journal", default=f"{SHOP_DOMAIN}.fix-inventory-journal.jsonl",
+                        help="checkpoint journal for --resume (default: <shop>.fix-inventory-journal.jsonl)")
+    parser.add_argument("--spool", default=f"{SHOP_DOMAIN}.failed-writes.jsonl",
+                        help="where failed writes are recorded for populate_shopify.py --replay "
+                             "(default: <shop>.failed-writes.jsonl)")
+    parser.add_argument("--metrics-json", metavar="PATH",
+                        help="write a JSON summary of API calls (latency per endpoint, retries, 429s, bytes)")
+    parser.add_argument("--metrics-textfile", metavar="PATH",
+                        help="write the same metrics as a Prometheus textfile (.prom)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall time and requests per phase and per function (set_inventory, ...)")
+    parser.add_argument("--profile-json", metavar="PATH", help="write the profile as JSON (implies --profile)")
+    parser.add_argument("--profile-stats", metavar="PATH",
+                        help="write cProfile stats of the main thread, for pstats or snakeviz; worker "
+                             "threads show up in --profile-flamegraph (implies --profile)")
+    parser.add_argument("--profile-flamegraph", metavar="PATH",
+                        help="write sampled stacks in folded format, for flamegraph.pl or speedscope "
+                             "(implies --profile)")
+    args = parser.parse_args()
+    if args.profile or args.profile_json or args.profile_stats or args.profile_flamegraph:
+        PROFILE.start(stats=bool(args.profile_stats), flamegraph=bool(args.profile_flamegraph))
+
+    journal = Journal().open(args.journal, resume=args.resume)
+
     print("=" * 60)
     print("  Shopify Inventory Fix Script")
     print("=" * 60)
     print()
 
-    location_id = get_location_id()
+    with PROFILE.phase("load"):
+        location_id = get_location_id()
+        snapshot = load_snapshot(args.snapshot) if args.snapshot else None
+        mirror = open_mirror(CLIENT, args.mirror, [loc["id"] for loc in LOCATIONS.all()]) if args.mirror else None
     print()
 
-    products = get_all_products()
-    print(f"Found {len(products)} products\n")
+    total_products = 0
 
     # Default quantity for products (50 for each variant)
     DEFAULT_QTY = 50
@@ -82,36 +97,108 @@ def main():
     OUT_OF_STOCK_TITLES = ["Limited Edition Art Print"]
 
     total_variants = 0
-    fixed_variants = 0
-
-    for product in products:
-        title = product["title"]
-        is_oos = title in OUT_OF_STOCK_TITLES
-        target_qty = 0 if is_oos else DEFAULT_QTY
-
-        print(f"Product: {title} (target qty: {target_qty})")
-
-        for variant in product["variants"]:
-            inv_item_id = variant["inventory_item_id"]
-            variant_title = variant["title"]
-            current_qty = variant.get("inventory_quantity", 0)
-            total_variants += 1
-
-            print(f"  Variant: {variant_title} | Current: {current_qty} | Setting to: {target_qty}")
-
-            if set_inventory(inv_item_id, location_id, target_qty):
-                fixed_variants += 1
-            else:
-                print(f"    FAILED to set inventory!")
-
-            time.sleep(0.3)  # Rate limiting
-
-        print()
+    skipped_variants = 0
+    unchanged_variants = 0
+
+    def checkpoint(items):
+        for item in items:
+            journal.record("inventory", item_key(item), item[2])
+
+    spool = Spool(args.spool)
+    writer = InventoryWriter(CLIENT, on_written=checkpoint, on_failed=spool.record,
+                             timer=lambda: PROFILE.measure("set_inventory"))
+    read_levels = PROFILE.timed("fetch_levels", fetch_levels)
+
+    # --reconcile: variants wait here until a chunk of current levels is read
+    to_compare = []
+    known_levels = inventory_levels(snapshot) if snapshot else mirror.inventory_levels() if mirror else None
+
+    def write_differences():
+        nonlocal unchanged_variants
+        if known_levels is not None:
+            levels = known_levels
+        else:
+            levels = read_levels(CLIENT, [item_id for item_id, _, _ in to_compare], [location_id])
+        for item_id, target_qty, label in to_compare:
+            if levels.get((item_id, location_id)) == target_qty:
+                unchanged_variants += 1
+                continue
+            print(f"  {label} | Current: {levels.get((item_id, location_id))} | Setting to: {target_qty}")
+            writer.add(item_id, location_id, target_qty, label=label)
+        to_compare.clear()
+
+    with PROFILE.phase("reconcile" if args.reconcile else "inventory"):
+        if snapshot:
+            products = snapshot["products"]
+        elif mirror:
+            products = mirror.products()
+        else:
+            products = get_all_products()
+        for product in products:
+            total_products += 1
+            title = product["title"]
+            is_oos = title in OUT_OF_STOCK_TITLES
+            target_qty = 0 if is_oos else DEFAULT_QTY
+
+            if not args.reconcile:
+                print(f"Product: {title} (target qty: {target_qty})")
+
+            for variant in product["variants"]:
+                inv_item_id = variant["inventory_item_id"]
+                variant_title = variant["title"]
+                current_qty = variant.get("inventory_quantity", 0)
+                total_variants += 1
+
+                if journal.has("inventory", f"{inv_item_id}@{location_id}"):
+                    skipped_variants += 1
+                    continue
+
+                if args.reconcile:
+                    to_compare.append((inv_item_id, target_qty, f"{title} / {variant_title}"))
+                    if len(to_compare) >= LEVELS_CHUNK:
+                        write_differences()
+                    continue
+
+                print(f"  Variant: {variant_title} | Current: {current_qty} | Setting to: {target_qty}")
+                writer.add(inv_item_id, location_id, target_qty, label=f"{title} / {variant_title}")
+
+            if not args.reconcile:
+                print()
+
+        if to_compare:
+            write_differences()
+        writer.flush()
+    journal.close()
+    if mirror:
+        mirror.close()
+    spool.close()
+    for item, message in writer.errors:
+        print(f"  FAILED to set inventory for {describe(item)}: {message}")
 
     print("=" * 60)
-    print(f"  Done! Fixed {fixed_variants}/{total_variants} variants")
+    print(f"  Done! Fixed {writer.written}/{total_variants} variants across {total_products} products"
+          f" in {writer.requests} requests")
+    if skipped_variants:
+        print(f"  Skipped {skipped_variants} variants already fixed by an earlier run")
+    if unchanged_variants:
+        print(f"  Left {unchanged_variants} variants alone: already at their target")
+    if spool.count:
+        print(f"  {spool.count} failed writes spooled to {args.spool} ({spool.total} waiting there); "
+              f"retry them with populate_shopify.py --replay")
     print("=" * 60)
 
+    if PROFILE.enabled:
+        PROFILE.stop()
+        print("\n=== Profile ===")
+        PROFILE.print_summary()
+        PROFILE.export(args.profile_json, args.profile_stats, args.profile_flamegraph,
+                       labels={"script": "fix_inventory", "shop": SHOP_DOMAIN})
+
+    print("\n=== API metrics ===")
+    CLIENT.metrics.print_summary()
+    CLIENT.metrics.export(args.metrics_json, args.metrics_textfile,
+                          labels={"script": "fix_inventory", "shop": SHOP_DOMAIN})
+
 
 if __name__ == "__main__":
     main()
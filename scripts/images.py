@@ -0,0 +1,323 @@
+"""
+Image ingestion through the Files API instead of inline product image URLs.
+
+Every unique image is downloaded once, keyed by its SHA-256, uploaded once
+through a staged upload + fileCreate, and attached to products by file ID
+with fileUpdate. A per-shop cache of URL -> content hash -> file ID lets a
+reseed skip both the download and the upload for media it has seen before.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+import requests
+
+from bulk_operations import stage_upload
+from shopify_admin import gid
+
+DEFAULT_CACHE_PATH = os.environ.get("SHOPIFY_IMAGE_CACHE", "shopify-image-cache.json")
+# Downloaded image bytes, shared between runs and stores (unset: download every run)
+DEFAULT_CONTENT_DIR = os.environ.get("SHOPIFY_IMAGE_DIR")
+
+# files per fileUpdate call, and file IDs per nodes() lookup
+ATTACH_BATCH = 50
+LOOKUP_BATCH = 250
+
+FILE_CREATE = """
+mutation FileCreate($files: [FileCreateInput!]!) {
+  fileCreate(files: $files) {
+    files { id fileStatus }
+    userErrors { field message }
+  }
+}
+"""
+
+FILE_UPDATE = """
+mutation FileUpdate($files: [FileUpdateInput!]!) {
+  fileUpdate(files: $files) {
+    userErrors { field message code }
+  }
+}
+"""
+
+FILE_STATUS = """
+query FileStatus($ids: [ID!]!) {
+  nodes(ids: $ids) { ... on File { id fileStatus } }
+}
+"""
+
+
+class ImageStore:
+    """Uploads product images once per shop and attaches them by file ID.
+
+    Safe to share between worker threads: concurrent requests for the same URL
+    wait for a single download and upload. `on_attached(keys)` is called with
+    the keys passed to attach() once all of their files are attached, and
+    `on_failed(op, payload, error_class, message)` with every failed upload
+    or attachment (the signature of Spool.record).
+    """
+
+    def __init__(self, client, path=DEFAULT_CACHE_PATH, on_attached=None, content_dir=DEFAULT_CONTENT_DIR,
+                 on_failed=None):
+        self.client = client
+        self.path = path
+        self.content_dir = content_dir
+        self.on_attached = on_attached
+        self.on_failed = on_failed
+        self.enabled = True
+        self.urls = None  # url -> sha256
+        self.files = None  # sha256 -> file gid
+        self.url_inflight = {}  # url -> Future(file gid)
+        self.hash_inflight = {}  # sha256 -> Future(file gid)
+        self.pending = []  # (file gid, product id, key)
+        self.new_files = set()
+        self.errors = []
+        self.uploaded = self.deduplicated = self.cached = self.attached = self.requests = 0
+        self.http = requests.Session()
+        self.lock = threading.Lock()
+
+    # ── Cache ──
+
+    def _load(self):
+        self.urls, self.files = {}, {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                entry = json.load(f).get(self.client.shop_domain) or {}
+            self.urls, self.files = entry.get("urls", {}), entry.get("files", {})
+        if self.files:
+            self._drop_missing_files()
+
+    def _drop_missing_files(self):
+        """Forget cached files that were deleted from the store since."""
+        hashes = list(self.files)
+        missing = set()
+        for start in range(0, len(hashes), LOOKUP_BATCH):
+            chunk = hashes[start:start + LOOKUP_BATCH]
+            nodes = self.client.graphql(FILE_STATUS, {"ids": [self.files[h] for h in chunk]})["nodes"]
+            self.requests += 1
+            missing.update(h for h, node in zip(chunk, nodes) if not node or node.get("fileStatus") == "FAILED")
+        for h in missing:
+            del self.files[h]
+
+    def save(self):
+        if not self.path or self.files is None:
+            return
+        cache = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                cache = json.load(f)
+        with self.lock:
+            cache[self.client.shop_domain] = {"urls": dict(self.urls), "files": dict(self.files)}
+        with open(self.path, "w") as f:
+            json.dump(cache, f, indent=2)
+
+    # ── Ingestion ──
+
+    def _once(self, inflight, key, work):
+        """Run `work()` once per key; concurrent callers share its result."""
+        with self.lock:
+            future = inflight.get(key)
+            owner = future is None
+            if owner:
+                future = inflight[key] = Future()
+        if owner:
+            try:
+                future.set_result(work())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def file_id(self, url):
+        """File ID for an image URL, downloading and uploading it if needed."""
+        with self.lock:
+            if self.files is None:
+                self._load()
+        return self._once(self.url_inflight, url, lambda: self._ingest(url))
+
+    def _ingest(self, url):
+        with self.lock:
+            digest = self.urls.get(url)
+            if digest in self.files:
+                self.cached += 1
+                return self.files[digest]
+
+        content, mime_type = download(self.http, url, self.client.timeout, self.content_dir)
+        digest = hashlib.sha256(content).hexdigest()
+        with self.lock:
+            self.urls[url] = digest
+            if digest in self.files or digest in self.hash_inflight:
+                self.deduplicated += 1
+        return self._once(self.hash_inflight, digest,
+                          lambda: self.files.get(digest) or self._upload(url, digest, content, mime_type))
+
+    def _upload(self, url, digest, content, mime_type):
+        filename = _filename(url, digest, mime_type)
+        target = stage_upload(self.client, "IMAGE", filename, mime_type, content, file_size=len(content))
+        data = self.client.graphql(FILE_CREATE, {"files": [{
+            "originalSource": target["resourceUrl"],
+            "contentType": "IMAGE",
+            "filename": filename,
+        }]})["fileCreate"]
+        if data["userErrors"]:
+            raise RuntimeError("fileCreate: " + "; ".join(e["message"] for e in data["userErrors"]))
+        file_id = data["files"][0]["id"]
+        with self.lock:
+            self.requests += 2
+            self.uploaded += 1
+            self.files[digest] = file_id
+            if data["files"][0].get("fileStatus") != "READY":
+                self.new_files.add(file_id)
+        return file_id
+
+    # ── Attaching ──
+
+    def attach(self, product_id, urls, key=None):
+        """Queue a product's images; they are attached by flush()."""
+        failed = False
+        for url in urls:
+            try:
+                file_id = self.file_id(url)
+            except Exception as e:
+                failed = True
+                with self.lock:
+                    self.errors.append((url, product_id, f"{type(e).__name__}: {e}"))
+                if self.on_failed:
+                    self.on_failed("image_attach", {"product_id": product_id, "urls": [url]},
+                                   type(e).__name__, str(e))
+                continue
+            with self.lock:
+                self.pending.append((file_id, product_id, None))
+        # A key is only reported once everything for it is attached
+        if key is not None and not failed:
+            with self.lock:
+                self.pending.append((None, product_id, key))
+
+    def attach_file(self, file_id, product_id):
+        """Queue an already uploaded file for a product, e.g. to retry an attachment."""
+        with self.lock:
+            self.pending.append((file_id, product_id, None))
+
+    def flush(self):
+        """Attach every queued image, waiting for new uploads to finish processing.
+
+        Media are added in the order they are attached, so the files go out in
+        rounds: the n-th file of every product in round n, once round n - 1 is
+        done. A file shared by products is still one fileUpdate entry per round.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, []
+        self._wait_ready({file_id for file_id, _, _ in pending if file_id in self.new_files})
+
+        rounds = []  # per round: file gid -> product gids, in queue order
+        queued = {}  # product gid -> files queued so far
+        for file_id, product_id, _ in pending:
+            if file_id:
+                product = gid("Product", product_id)
+                n = queued[product] = queued.get(product, 0) + 1
+                if n > len(rounds):
+                    rounds.append({})
+                rounds[n - 1].setdefault(file_id, []).append(product)
+        failed_products = set()
+        for references in rounds:
+            batch = []
+            for file_id, products in references.items():
+                # Spooled behind the failed file, so --replay keeps the order
+                skipped = [p for p in products if p in failed_products]
+                if skipped:
+                    self._failed(file_id, skipped, "Skipped", "an earlier image of the product was not attached")
+                products = [p for p in products if p not in failed_products]
+                if products:
+                    batch.append((file_id, products))
+            for start in range(0, len(batch), ATTACH_BATCH):
+                failed_products |= self._attach(batch[start:start + ATTACH_BATCH])
+
+        keys = [key for _, product_id, key in pending
+                if key is not None and gid("Product", product_id) not in failed_products]
+        if keys and self.on_attached:
+            self.on_attached(keys)
+        self.save()
+
+    def _attach(self, chunk):
+        try:
+            data = self.client.graphql(FILE_UPDATE, {"files": [
+                {"id": file_id, "referencesToAdd": products} for file_id, products in chunk
+            ]})
+            errors = data["fileUpdate"]["userErrors"]
+        except Exception as e:
+            errors = [{"field": None, "message": f"{type(e).__name__}: {e}", "code": type(e).__name__}]
+        finally:
+            with self.lock:
+                self.requests += 1
+
+        # Errors point at ["files", "<index>", ...]; anything else fails the batch
+        failed = set()
+        for err in errors:
+            field = err.get("field") or []
+            named = len(field) > 1 and str(field[1]).isdigit() and int(field[1]) < len(chunk)
+            for file_id, products in ([chunk[int(field[1])]] if named else chunk):
+                failed.update(products)
+                self._failed(file_id, products, err.get("code") or "UserError", err.get("message", "unknown error"))
+        with self.lock:
+            self.attached += sum(len(products) for _, products in chunk if not failed & set(products))
+        return failed
+
+    def _failed(self, file_id, products, error_class, message):
+        with self.lock:
+            self.errors.append((file_id, ", ".join(products), message))
+        if self.on_failed:
+            self.on_failed("file_update", {"file_id": file_id, "product_ids": products}, error_class, message)
+
+    def _wait_ready(self, file_ids, poll_interval=0.5, timeout=300):
+        """Poll new files until Shopify has finished processing them."""
+        waiting = list(file_ids)
+        deadline = time.monotonic() + timeout
+        while waiting and time.monotonic() < deadline:
+            still = []
+            for start in range(0, len(waiting), LOOKUP_BATCH):
+                chunk = waiting[start:start + LOOKUP_BATCH]
+                nodes = self.client.graphql(FILE_STATUS, {"ids": chunk})["nodes"]
+                self.requests += 1
+                still += [n["id"] for n in nodes if n and n.get("fileStatus") not in ("READY", "FAILED")]
+            self.new_files -= set(waiting) - set(still)
+            waiting = still
+            if waiting:
+                time.sleep(poll_interval)
+
+
+def download(session, url, timeout, content_dir=None):
+    """Image bytes and MIME type for a URL, read from `content_dir` when it has them."""
+    if content_dir:
+        base = os.path.join(content_dir, hashlib.sha256(url.encode("utf-8")).hexdigest())
+        if os.path.exists(base + ".type"):
+            with open(base + ".type") as f:
+                mime_type = f.read().strip()
+            with open(base + ".bin", "rb") as f:
+                return f.read(), mime_type
+    r = session.get(url, timeout=timeout)
+    r.raise_for_status()
+    mime_type = r.headers.get("Content-Type", "image/jpeg").split(";")[0].strip()
+    if content_dir:
+        os.makedirs(content_dir, exist_ok=True)
+        tmp = f"{base}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(r.content)
+        os.replace(tmp, base + ".bin")
+        # The .type file is written last and marks the entry complete
+        with open(tmp, "w") as f:
+            f.write(mime_type)
+        os.replace(tmp, base + ".type")
+    return r.content, mime_type
+
+
+def _filename(url, digest, mime_type):
+    name = posixpath.basename(urlparse(url).path) or digest[:16]
+    if not posixpath.splitext(name)[1]:
+        name += mimetypes.guess_extension(mime_type) or ".jpg"
+    return name
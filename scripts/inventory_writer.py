@@ -0,0 +1,226 @@
+"""
+Batched inventory writes through the GraphQL inventorySetQuantities mutation.
+Replaces one inventory_levels/set.json POST per variant with one request per
+few hundred variants, and keeps per-item errors instead of dropping them.
+Items are only stocked at the primary location when created, so levels at
+other locations are activated (inventoryBulkToggleActivation) before they are
+written.
+"""
+
+import threading
+from contextlib import nullcontext
+
+from shopify_admin import gid
+
+# inventorySetQuantities accepts at most 250 quantities per call
+BATCH_SIZE = 250
+
+# inventory_levels.json accepts at most 50 inventory_item_ids per call
+LEVELS_CHUNK = 50
+
+SET_QUANTITIES = """
+mutation SetQuantities($input: InventorySetQuantitiesInput!) {
+  inventorySetQuantities(input: $input) {
+    userErrors { field message code }
+  }
+}
+"""
+
+
+ACTIVATE = """
+mutation ActivateInventory($inventoryItemId: ID!, $inventoryItemUpdates: [InventoryBulkToggleActivationInput!]!) {
+  inventoryBulkToggleActivation(inventoryItemId: $inventoryItemId, inventoryItemUpdates: $inventoryItemUpdates) {
+    userErrors { field message code }
+  }
+}
+"""
+
+
+class InventoryWriter:
+    """Buffers (inventory_item_id, location_id, quantity) tuples and writes them in batches.
+
+    Safe to share between worker threads. Items are written when a batch fills
+    up and on flush(); failed items end up in `errors` as (item, message) pairs.
+    `on_written(items)` is called with every batch that was applied, and
+    `on_failed(op, payload, error_class, message)` with every failed item
+    (the signature of Spool.record). `timer()`, if given, returns a context
+    manager wrapped around each batch write, e.g. to profile it.
+    Items added with `activate=True` are stocked at their location first.
+    """
+
+    def __init__(self, client, batch_size=BATCH_SIZE, reason="correction", on_written=None, on_failed=None,
+                 timer=None):
+        self.client = client
+        self.timer = timer or nullcontext
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self.batch_size = batch_size
+        self.reason = reason
+        self.pending = []
+        self.to_activate = set()  # (inventory_item_id, location_id) not yet stocked there
+        self.written = 0
+        self.errors = []
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def add(self, inventory_item_id, location_id, quantity, label=None, activate=False):
+        """Queue one level; `label` is only used when reporting errors.
+
+        With `activate`, the item is stocked at the location before the write,
+        as a location other than the primary one needs.
+        """
+        item = (inventory_item_id, location_id, quantity, label)
+        with self.lock:
+            if activate:
+                self.to_activate.add((inventory_item_id, location_id))
+            self.pending.append(item)
+            if len(self.pending) < self.batch_size:
+                return
+            batch, self.pending = self.pending, []
+        self.write_batch(batch)
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        for start in range(0, len(batch), self.batch_size):
+            self.write_batch(batch[start:start + self.batch_size])
+
+    def write_batch(self, batch):
+        """Write up to `batch_size` items now, resending them once if the batch is rejected."""
+        if not batch:
+            return
+        with self.timer():
+            batch = self._activate(batch)
+            self._write(batch)
+
+    def _activate(self, batch):
+        """Stock the batch's items where they are not yet; returns the items that can be written."""
+        with self.lock:
+            needed = {}
+            for item_id, location_id, _, _ in batch:
+                if (item_id, location_id) in self.to_activate:
+                    needed.setdefault(item_id, []).append(location_id)
+        if not needed:
+            return batch
+        failed = {}  # item_id -> (message, error class)
+        for item_id, location_ids in needed.items():
+            updates = [{"locationId": gid("Location", location_id), "activate": True}
+                       for location_id in location_ids]
+            try:
+                data = self.client.graphql(ACTIVATE, {"inventoryItemId": gid("InventoryItem", item_id),
+                                                      "inventoryItemUpdates": updates}, idempotent=True)
+                errors = data.get("inventoryBulkToggleActivation", {}).get("userErrors", [])
+                if errors:
+                    failed[item_id] = (errors[0].get("message", "unknown error"), errors[0].get("code") or "UserError")
+            except Exception as e:
+                failed[item_id] = (f"{type(e).__name__}: {e}", type(e).__name__)
+            with self.lock:
+                self.requests += 1
+                if item_id not in failed:
+                    self.to_activate.difference_update((item_id, location_id) for location_id in location_ids)
+        for item_id, (message, error_class) in failed.items():
+            self._fail([item for item in batch if item[0] == item_id and item[1] in needed[item_id]],
+                       f"could not stock at location: {message}", error_class)
+        return [item for item in batch if not (item[0] in failed and item[1] in needed[item[0]])]
+
+    def _write(self, batch, retry=True):
+        if not batch:
+            return
+        variables = {
+            "input": {
+                "name": "available",
+                "reason": self.reason,
+                "ignoreCompareQuantity": True,
+                "quantities": [
+                    {
+                        "inventoryItemId": gid("InventoryItem", item_id),
+                        "locationId": gid("Location", location_id),
+                        "quantity": int(quantity),
+                    }
+                    for item_id, location_id, quantity, _ in batch
+                ],
+            }
+        }
+        try:
+            # Absolute quantities with no compare step, so a resend cannot double-count
+            data = self.client.graphql(SET_QUANTITIES, variables, idempotent=True)
+        except Exception as e:
+            self._fail(batch, f"{type(e).__name__}: {e}", type(e).__name__)
+            return
+        finally:
+            with self.lock:
+                self.requests += 1
+
+        user_errors = data.get("inventorySetQuantities", {}).get("userErrors", [])
+        if not user_errors:
+            with self.lock:
+                self.written += len(batch)
+            if self.on_written:
+                self.on_written(batch)
+            return
+
+        # Errors point at ["input", "quantities", "<index>", ...]; the mutation
+        # is all-or-nothing, so everything not named is sent again once.
+        failed = {}
+        for err in user_errors:
+            index = _error_index(err.get("field"))
+            if index is None or index >= len(batch):
+                self._fail(batch, err.get("message", "unknown error"), err.get("code") or "UserError")
+                return
+            failed[index] = err
+        for i, err in failed.items():
+            self._fail([batch[i]], err.get("message", "unknown error"), err.get("code") or "UserError")
+        remaining = [item for i, item in enumerate(batch) if i not in failed]
+        if retry:
+            self._write(remaining, retry=False)
+        else:
+            self._fail(remaining, "batch rejected", "BatchRejected")
+
+    def _fail(self, items, message, error_class):
+        with self.lock:
+            for item in items:
+                self.errors.append((item, message))
+        if self.on_failed:
+            for item_id, location_id, quantity, label in items:
+                self.on_failed("inventory_set", {"inventory_item_id": item_id, "location_id": location_id,
+                                                 "quantity": quantity, "label": label},
+                               error_class, message)
+
+
+def fetch_levels(client, item_ids, location_ids):
+    """Current `available` per (inventory_item_id, location_id), read in chunks.
+
+    Pairs with no inventory level at all are missing from the result.
+    """
+    item_ids = list(item_ids)
+    levels = {}
+    for start in range(0, len(item_ids), LEVELS_CHUNK):
+        params = {
+            "inventory_item_ids": ",".join(str(i) for i in item_ids[start:start + LEVELS_CHUNK]),
+            "location_ids": ",".join(str(i) for i in location_ids),
+            "limit": 250,
+        }
+        for level in client.paginate("inventory_levels.json", "inventory_levels", params):
+            levels[level["inventory_item_id"], level["location_id"]] = level["available"]
+    return levels
+
+
+def _error_index(field):
+    if not field or len(field) < 3 or field[1] != "quantities":
+        return None
+    try:
+        return int(field[2])
+    except (TypeError, ValueError):
+        return None
+
+
+def item_key(item):
+    """Stable key for an item's (inventory item, location) pair."""
+    return f"{item[0]}@{item[1]}"
+
+
+def describe(item):
+    """Human-readable name for an item in `InventoryWriter.errors`."""
+    item_id, location_id, quantity, label = item
+    name = label or f"inventory item {item_id}"
+    return f"{name} @ location {location_id} -> {quantity}"
@@ -0,0 +1,73 @@
+"""
+Append-only JSONL checkpoint journal for resumable runs.
+
+Each completed unit of work is appended as one line with the Shopify IDs it
+produced. A run started with resume=True replays the file and skips every
+unit already recorded; a fresh run truncates it.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class Journal:
+    """Records (kind, key) -> result; a Journal without a path records nothing."""
+
+    def __init__(self, path=None):
+        self.path = None
+        self.done = {}
+        self.header = None
+        self.file = None
+        self.lock = threading.Lock()
+        if path:
+            self.open(path)
+
+    def open(self, path, resume=False, run_info=None):
+        """Start journaling to `path`, keeping its entries when resuming."""
+        self.path = path
+        self.done = {}
+        self.header = None
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn last line from a crash; everything before it holds
+                    if entry["kind"] == "run":
+                        self.header = self.header or entry["result"]
+                    else:
+                        self.done[entry["kind"], entry["key"]] = entry["result"]
+            self.file = open(path, "a", encoding="utf-8")
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+            self.header = run_info
+            self._append("run", "", run_info)
+        return self
+
+    def get(self, kind, key):
+        return self.done.get((kind, str(key)))
+
+    def has(self, kind, key):
+        return (kind, str(key)) in self.done
+
+    def count(self, kind):
+        return sum(1 for k, _ in self.done if k == kind)
+
+    def record(self, kind, key, result=None):
+        with self.lock:
+            self.done[kind, str(key)] = result
+            if self.file:
+                self._append(kind, str(key), result)
+
+    def _append(self, kind, key, result):
+        entry = {"kind": kind, "key": key, "result": result, "at": time.time()}
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
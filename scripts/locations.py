@@ -0,0 +1,89 @@
+"""
+Per-run cache of the store's inventory locations, optionally persisted to disk.
+Resolves per-variant stock targets to (location_id, quantity) pairs.
+"""
+
+import json
+import os
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.environ.get("SHOPIFY_LOCATION_CACHE")  # unset: memory only
+DEFAULT_CACHE_TTL = float(os.environ.get("SHOPIFY_LOCATION_CACHE_TTL", "86400"))
+
+
+class LocationCache:
+    """Fetches locations.json at most once per run (or per TTL when persisted)."""
+
+    def __init__(self, client, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_CACHE_TTL):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.locations = None
+        self.lock = threading.Lock()
+
+    def all(self):
+        with self.lock:
+            if self.locations is None:
+                self.locations = self._load() or self._fetch()
+            return self.locations
+
+    def default(self):
+        return self.all()[0]
+
+    def resolve(self, key):
+        """Location ID for a location ID or name."""
+        for loc in self.all():
+            if str(loc["id"]) == str(key) or loc["name"] == key:
+                return loc["id"]
+        raise KeyError(f"Unknown location: {key}")
+
+    def needs_activation(self, location_id):
+        """Whether a new inventory item must be activated at a location before it is stocked there.
+
+        Shopify stocks new items at the primary location only, which is the
+        first one listed.
+        """
+        return location_id != self.default()["id"]
+
+    def quantities(self, variant):
+        """(location_id, quantity) targets for one catalog variant.
+
+        A variant may carry `inventory`, a {location name or ID: quantity} map;
+        otherwise its `inventory_quantity` goes to the default location. Levels
+        at other locations need activating first (see needs_activation()).
+        """
+        per_location = variant.get("inventory")
+        if per_location:
+            return [(self.resolve(key), qty) for key, qty in per_location.items()]
+        return [(self.default()["id"], variant.get("inventory_quantity", 0))]
+
+    def _fetch(self):
+        r = self.client.get("locations.json")
+        r.raise_for_status()
+        locations = [
+            {"id": loc["id"], "name": loc["name"]}
+            for loc in r.json()["locations"]
+        ]
+        self._save(locations)
+        return locations
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            entry = json.load(f).get(self.client.shop_domain)
+        if not entry or time.time() - entry["fetched_at"] > self.ttl:
+            return None
+        return entry["locations"]
+
+    def _save(self, locations):
+        if not self.path:
+            return
+        cache = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                cache = json.load(f)
+        cache[self.client.shop_domain] = {"fetched_at": time.time(), "locations": locations}
+        with open(self.path, "w") as f:
+            json.dump(cache, f, indent=2)
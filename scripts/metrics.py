@@ -0,0 +1,274 @@
+"""
+Request metrics for the Admin API client: per-endpoint latency histograms,
+status and retry counts, 429s, bytes on the wire and leaky-bucket fill.
+
+AdminClient records every attempt; the scripts export a JSON summary and a
+Prometheus textfile (node_exporter textfile collector format) at the end of
+a run.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|\.json|$)")
+_OPERATION = re.compile(r"^\s*(?:query|mutation)\s+(\w+)")
+
+
+def endpoint_label(endpoint):
+    """Normalise an endpoint or cursor URL to e.g. `products/{id}.json`."""
+    path = urlparse(endpoint).path if "://" in endpoint else endpoint.split("?", 1)[0]
+    if "/admin/api/" in path:
+        path = path.split("/admin/api/", 1)[1].split("/", 1)[-1]
+    return _ID_SEGMENT.sub("/{id}", path.lstrip("/"))
+
+
+def operation_label(query):
+    """`graphql.json <OperationName>` for a named GraphQL document."""
+    m = _OPERATION.match(query)
+    return f"graphql.json {m.group(1)}" if m else "graphql.json"
+
+
+class _Series:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.waited = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.statuses = {}
+
+    def add(self, seconds, status, waited):
+        self.count += 1
+        self.total += seconds
+        self.waited += waited
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def quantile(self, q):
+        """q-quantile estimated by interpolating inside its histogram bucket."""
+        rank = q * self.count
+        seen, lower = 0, 0.0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            if n and seen + n >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return self.max
+
+
+class Metrics:
+    """Thread-safe counters and histograms for one client."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.series = {}  # (method, endpoint) -> _Series
+        self.waited = 0.0
+        self.retries = 0
+        self.throttled = 0
+        self.graphql_throttled = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.fill = {}  # "rest" / "graphql" -> [last, max, total, samples]
+        self.lock = threading.Lock()
+        self.local = threading.local()  # .counter: attempts charged to the current thread
+
+    def record(self, method, endpoint, seconds, status, sent=0, received=0, retry=False, waited=0.0):
+        """One attempt of one call; `status` is the HTTP status or "error".
+
+        `waited` is the time the attempt spent queued in the rate governor
+        before it was sent; it is not part of `seconds`.
+        """
+        counter = self.thread_counter()
+        with self.lock:
+            counter[0] += 1
+            key = (method, endpoint)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = _Series()
+            series.add(seconds, str(status), waited)
+            self.waited += waited
+            self.bytes_sent += sent
+            self.bytes_received += received
+            if retry:
+                self.retries += 1
+            if status == 429:
+                self.throttled += 1
+            if status == "error":
+                self.errors += 1
+
+    def record_graphql_throttle(self):
+        with self.lock:
+            self.graphql_throttled += 1
+            self.retries += 1
+
+    def sample_fill(self, api, percent):
+        """Bucket fill reported by a response: REST call limit or GraphQL cost."""
+        with self.lock:
+            stats = self.fill.setdefault(api, [0.0, 0.0, 0.0, 0])
+            stats[0] = percent
+            stats[1] = max(stats[1], percent)
+            stats[2] += percent
+            stats[3] += 1
+
+    @property
+    def requests(self):
+        with self.lock:
+            return sum(s.count for s in self.series.values())
+
+    def thread_counter(self):
+        """The calling thread's attempt counter, a one-item list."""
+        counter = getattr(self.local, "counter", None)
+        if counter is None:
+            counter = self.local.counter = [0]
+        return counter
+
+    def charge_to(self, counter):
+        """Count the calling thread's attempts on another thread's counter."""
+        self.local.counter = counter
+
+    def thread_requests(self):
+        """Attempts charged so far to the calling thread."""
+        return self.thread_counter()[0]
+
+    def summary(self):
+        """Everything recorded so far as a JSON-friendly dict."""
+        with self.lock:
+            elapsed = time.time() - self.started
+            endpoints = []
+            for (method, endpoint), s in sorted(self.series.items(), key=lambda kv: -kv[1].total):
+                endpoints.append({
+                    "method": method,
+                    "endpoint": endpoint,
+                    "requests": s.count,
+                    "seconds": round(s.total, 3),
+                    "rate_limit_wait_s": round(s.waited, 3),
+                    "mean_ms": round(1000 * s.total / s.count, 1),
+                    "p50_ms": round(1000 * s.quantile(0.5), 1),
+                    "p95_ms": round(1000 * s.quantile(0.95), 1),
+                    "max_ms": round(1000 * s.max, 1),
+                    "statuses": dict(s.statuses),
+                    "histogram": dict(zip([str(b) for b in LATENCY_BUCKETS], s.buckets)),
+                })
+            requests = sum(s.count for s in self.series.values())
+            return {
+                "started_at": self.started,
+                "elapsed_s": round(elapsed, 3),
+                "requests": requests,
+                "requests_per_s": round(requests / elapsed, 2) if elapsed else 0.0,
+                "rate_limit_wait_s": round(self.waited, 3),
+                "retries": self.retries,
+                "throttled_429": self.throttled,
+                "graphql_throttled": self.graphql_throttled,
+                "connection_errors": self.errors,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "bucket_fill_percent": {
+                    api: {"last": round(last, 1), "max": round(peak, 1), "mean": round(total / n, 1)}
+                    for api, (last, peak, total, n) in self.fill.items()
+                },
+                "endpoints": endpoints,
+            }
+
+    def prometheus(self, labels=None):
+        """The metrics in Prometheus text exposition format."""
+        base = dict(labels or {})
+        summary = self.summary()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for extra, value in samples:
+                lines.append(f"{name}{_labels(dict(base, **extra))} {value}")
+
+        with self.lock:
+            series = sorted(self.series.items())
+        metric("shopify_admin_requests_total", "counter", "Admin API attempts by status.",
+               [({"method": m, "endpoint": e, "status": status}, n)
+                for (m, e), s in series for status, n in sorted(s.statuses.items())])
+        histogram = []
+        for (m, e), s in series:
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, s.buckets):
+                cumulative += n
+                histogram.append(({"method": m, "endpoint": e, "le": str(bound)}, cumulative))
+            histogram.append(({"method": m, "endpoint": e, "le": "+Inf"}, s.count))
+        lines.append("# HELP shopify_admin_request_duration_seconds Admin API attempt latency.")
+        lines.append("# TYPE shopify_admin_request_duration_seconds histogram")
+        for extra, value in histogram:
+            lines.append(f"shopify_admin_request_duration_seconds_bucket{_labels(dict(base, **extra))} {value}")
+        for (m, e), s in series:
+            lbl = _labels(dict(base, method=m, endpoint=e))
+            lines.append(f"shopify_admin_request_duration_seconds_sum{lbl} {s.total:.6f}")
+            lines.append(f"shopify_admin_request_duration_seconds_count{lbl} {s.count}")
+
+        metric("shopify_admin_rate_limit_wait_seconds_total", "counter",
+               "Time attempts spent queued in the rate governor.",
+               [({"method": m, "endpoint": e}, f"{s.waited:.6f}") for (m, e), s in series])
+        metric("shopify_admin_retries_total", "counter", "Attempts that were retries.",
+               [({}, summary["retries"])])
+        metric("shopify_admin_throttled_total", "counter", "Throttled responses by API.",
+               [({"api": "rest"}, summary["throttled_429"]),
+                ({"api": "graphql"}, summary["graphql_throttled"])])
+        metric("shopify_admin_connection_errors_total", "counter", "Attempts that got no response.",
+               [({}, summary["connection_errors"])])
+        metric("shopify_admin_bytes_sent_total", "counter", "Request body bytes sent.",
+               [({}, summary["bytes_sent"])])
+        metric("shopify_admin_bytes_received_total", "counter", "Response body bytes received.",
+               [({}, summary["bytes_received"])])
+        metric("shopify_admin_bucket_fill_percent", "gauge", "Rate limit bucket fill, sampled per response.",
+               [({"api": api, "stat": stat}, values[stat])
+                for api, values in sorted(summary["bucket_fill_percent"].items())
+                for stat in ("last", "max", "mean")])
+        metric("shopify_admin_run_duration_seconds", "gauge", "Wall time of the run.",
+               [({}, summary["elapsed_s"])])
+        metric("shopify_admin_run_finished_timestamp_seconds", "gauge", "When the run finished.",
+               [({}, round(time.time(), 3))])
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path=None, textfile_path=None, labels=None):
+        """Write the JSON summary and/or the Prometheus textfile."""
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(dict(self.summary(), labels=labels or {}), f, indent=2)
+        if textfile_path:
+            # Written under a temp name and renamed so the collector never reads half a file
+            tmp = f"{textfile_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(self.prometheus(labels))
+            os.replace(tmp, textfile_path)
+
+    def print_summary(self, top=8):
+        s = self.summary()
+        print(f"  {s['requests']} requests in {s['elapsed_s']:.1f}s ({s['requests_per_s']:.1f}/s), "
+              f"{s['retries']} retries, {s['throttled_429']} x 429, {s['graphql_throttled']} GraphQL throttles")
+        print(f"  {s['rate_limit_wait_s']:.1f}s of call time spent waiting on the rate limit")
+        fill = ", ".join(f"{api} bucket max {v['max']:.0f}%" for api, v in sorted(s["bucket_fill_percent"].items()))
+        print(f"  {s['bytes_sent'] / 1024:.0f} KiB sent, {s['bytes_received'] / 1024:.0f} KiB received"
+              + (f", {fill}" if fill else ""))
+        for e in s["endpoints"][:top]:
+            print(f"  {e['method']:<6} {e['endpoint']:<40} {e['requests']:>6} req  "
+                  f"{e['seconds']:>8.1f}s  wait {e['rate_limit_wait_s']:>7.1f}s  p50 {e['p50_ms']:.0f}ms  p95 {e['p95_ms']:.0f}ms")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Local SQLite mirror of the store, refreshed with only what changed.
+
+    python scripts/mirror.py                   # creates or refreshes <shop>.mirror.sqlite
+    python scripts/fix_inventory.py --reconcile --mirror <shop>.mirror.sqlite
+    python scripts/populate_shopify.py --plan --mirror <shop>.mirror.sqlite
+
+Products (with variants and their inventory item IDs), inventory levels and
+collections are read with `updated_at_min` set to the previous refresh's
+watermark, so a refresh of a large, mostly unchanged store costs a handful
+of requests. `updated_at_min` cannot report deletions; they show up as a
+count that no longer matches, and only then are the IDs listed again.
+Collects have no updated_at and are read with `since_id` instead.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+from locations import LocationCache
+from shopify_admin import AdminClient
+
+# Watermarks are moved back this far to cover clock skew and writes that
+# land while a refresh is paging; records in the overlap are read twice
+WATERMARK_OVERLAP = float(os.environ.get("SHOPIFY_MIRROR_OVERLAP", "300"))
+
+PRODUCT_FIELDS = "id,handle,title,body_html,vendor,product_type,tags,status,options,variants,updated_at"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY, handle TEXT, title TEXT, body_html TEXT, vendor TEXT,
+    product_type TEXT, tags TEXT, status TEXT, options TEXT, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS variants (
+    id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, position INTEGER, title TEXT, sku TEXT,
+    price TEXT, compare_at_price TEXT, option1 TEXT, option2 TEXT, option3 TEXT,
+    inventory_item_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS variants_by_product ON variants (product_id);
+CREATE TABLE IF NOT EXISTS inventory_levels (
+    inventory_item_id INTEGER, location_id INTEGER, available INTEGER, updated_at TEXT,
+    PRIMARY KEY (inventory_item_id, location_id)
+);
+CREATE TABLE IF NOT EXISTS collections (
+    id INTEGER PRIMARY KEY, kind TEXT, handle TEXT, title TEXT, body_html TEXT, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS collects (id INTEGER PRIMARY KEY, collection_id INTEGER, product_id INTEGER);
+CREATE TABLE IF NOT EXISTS watermarks (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+VARIANT_COLUMNS = ("id", "product_id", "position", "title", "sku", "price", "compare_at_price",
+                   "option1", "option2", "option3", "inventory_item_id")
+
+# kind -> REST endpoint; the kind is also the key of store_state()
+COLLECTION_ENDPOINTS = {"custom_collections": "custom_collections.json",
+                        "smart_collections": "smart_collections.json"}
+
+
+class StoreMirror:
+    """A SQLite copy of one shop's catalog state.
+
+    Call refresh() before reading; the query methods only read the database.
+    `fetched` counts the records refresh() read from the API.
+    """
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.fetched = 0
+
+    def close(self):
+        self.db.close()
+
+    # ── Refreshing ──
+
+    def _watermark(self, name):
+        row = self.db.execute("SELECT value FROM watermarks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_watermark(self, name, value):
+        self.db.execute("INSERT OR REPLACE INTO watermarks (name, value) VALUES (?, ?)", (name, value))
+
+    def _count(self, endpoint):
+        r = self.client.get(endpoint)
+        r.raise_for_status()
+        return r.json()["count"]
+
+    def refresh(self, location_ids):
+        """Read everything changed since the last refresh; returns the records read."""
+        started = datetime.now(timezone.utc) - timedelta(seconds=WATERMARK_OVERLAP)
+        watermark = started.isoformat(timespec="seconds")
+        self.fetched = 0
+        with self.db:
+            self._refresh_products()
+            self._refresh_levels(location_ids)
+            for kind, endpoint in COLLECTION_ENDPOINTS.items():
+                self._refresh_collections(kind, endpoint)
+            self._refresh_collects()
+            # Only moved once every table is read, so a failed refresh is simply repeated
+            for name in ("products", "inventory_levels", *COLLECTION_ENDPOINTS):
+                self._set_watermark(name, watermark)
+            self._set_watermark("refreshed_at", str(time.time()))
+        return self.fetched
+
+    def _changed(self, endpoint, key, name, params=None):
+        params = dict(params or {})
+        since = self._watermark(name)
+        if since:
+            params["updated_at_min"] = since
+        for record in self.client.paginate(endpoint, key, params):
+            self.fetched += 1
+            yield record
+
+    def _refresh_products(self):
+        for p in self._changed("products.json", "products", "products", {"fields": PRODUCT_FIELDS}):
+            self.db.execute(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (p["id"], p.get("handle"), p["title"], p.get("body_html"), p.get("vendor"),
+                 p.get("product_type"), p.get("tags"), p.get("status"),
+                 json.dumps([{"name": o["name"]} for o in p.get("options") or []]), p.get("updated_at")),
+            )
+            self.db.execute("DELETE FROM variants WHERE product_id = ?", (p["id"],))
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO variants VALUES ({', '.join('?' * len(VARIANT_COLUMNS))})",
+                [(v["id"], p["id"], v.get("position", n), v["title"], v.get("sku"), v.get("price"),
+                  v.get("compare_at_price"), v.get("option1"), v.get("option2"), v.get("option3"),
+                  v["inventory_item_id"]) for n, v in enumerate(p["variants"], 1)],
+            )
+
+        if self._count("products/count.json") != self._local_count("products"):
+            ids = [(p["id"],) for p in self.client.paginate("products.json", "products", {"fields": "id"})]
+            self.fetched += len(ids)
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS live (id INTEGER PRIMARY KEY)")
+            self.db.execute("DELETE FROM live")
+            self.db.executemany("INSERT OR IGNORE INTO live VALUES (?)", ids)
+            self.db.execute("DELETE FROM products WHERE id NOT IN (SELECT id FROM live)")
+            self.db.execute("DELETE FROM variants WHERE product_id NOT IN (SELECT id FROM live)")
+            self.db.execute("DELETE FROM collects WHERE product_id NOT IN (SELECT id FROM live)")
+        # Levels of variants that are gone (deleted products or replaced variants)
+        self.db.execute("DELETE FROM inventory_levels WHERE inventory_item_id NOT IN "
+                        "(SELECT inventory_item_id FROM variants)")
+
+    def _refresh_levels(self, location_ids):
+        params = {"location_ids": ",".join(str(i) for i in location_ids)}
+        for level in self._changed("inventory_levels.json", "inventory_levels", "inventory_levels", params):
+            self.db.execute(
+                "INSERT OR REPLACE INTO inventory_levels VALUES (?, ?, ?, ?)",
+                (level["inventory_item_id"], level["location_id"], level["available"], level.get("updated_at")),
+            )
+
+    def _refresh_collections(self, kind, endpoint):
+        for c in self._changed(endpoint, kind, kind):
+            self.db.execute("INSERT OR REPLACE INTO collections VALUES (?, ?, ?, ?, ?, ?)",
+                            (c["id"], kind, c.get("handle"), c["title"], c.get("body_html"), c.get("updated_at")))
+        count_endpoint = endpoint.replace(".json", "/count.json")
+        if self._count(count_endpoint) != self._local_count("collections", "kind = ?", (kind,)):
+            live = {c["id"] for c in self.client.paginate(endpoint, kind, {"fields": "id"})}
+            self.fetched += len(live)
+            stored = [row[0] for row in self.db.execute("SELECT id FROM collections WHERE kind = ?", (kind,))]
+            gone = [(cid,) for cid in stored if cid not in live]
+            self.db.executemany("DELETE FROM collections WHERE id = ?", gone)
+            self.db.executemany("DELETE FROM collects WHERE collection_id = ?", gone)
+
+    def _refresh_collects(self):
+        last = self.db.execute("SELECT MAX(id) FROM collects").fetchone()[0]
+        params = {"since_id": last} if last else {}
+        for c in self.client.paginate("collects.json", "collects", params):
+            self.fetched += 1
+            self.db.execute("INSERT OR REPLACE INTO collects VALUES (?, ?, ?)",
+                            (c["id"], c["collection_id"], c["product_id"]))
+        if self._count("collects/count.json") != self._local_count("collects"):
+            # Removed collects leave no trace to ask for, so the table is read again
+            self.db.execute("DELETE FROM collects")
+            for c in self.client.paginate("collects.json", "collects"):
+                self.fetched += 1
+                self.db.execute("INSERT INTO collects VALUES (?, ?, ?)",
+                                (c["id"], c["collection_id"], c["product_id"]))
+
+    def _local_count(self, table, where="1", args=()):
+        return self.db.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", args).fetchone()[0]
+
+    # ── Queries ──
+
+    def products(self):
+        """Products with their variants, in the REST shape, ordered by ID."""
+        totals = dict(self.db.execute(
+            "SELECT inventory_item_id, SUM(available) FROM inventory_levels GROUP BY inventory_item_id"))
+        variants = {}
+        for row in self.db.execute(f"SELECT {', '.join(VARIANT_COLUMNS)} FROM variants ORDER BY product_id, position"):
+            v = dict(zip(VARIANT_COLUMNS, row))
+            v["inventory_quantity"] = totals.get(v["inventory_item_id"], 0)
+            variants.setdefault(v["product_id"], []).append(v)
+        columns = ("id", "handle", "title", "body_html", "vendor", "product_type", "tags", "status", "options",
+                   "updated_at")
+        for row in self.db.execute(f"SELECT {', '.join(columns)} FROM products ORDER BY id"):
+            p = dict(zip(columns, row))
+            p["options"] = json.loads(p["options"] or "[]")
+            p["variants"] = variants.get(p["id"], [])
+            yield p
+
+    def product_ids(self):
+        return [row[0] for row in self.db.execute("SELECT id FROM products ORDER BY id")]
+
+    def inventory_levels(self):
+        """{(inventory_item_id, location_id): available}, like inventory_writer.fetch_levels()."""
+        return {(item, loc): available for item, loc, available in
+                self.db.execute("SELECT inventory_item_id, location_id, available FROM inventory_levels")}
+
+    def store_state(self):
+        """The mirror in the shape store_sync.fetch_store_state() returns."""
+        state = {kind: [] for kind in COLLECTION_ENDPOINTS}
+        for cid, kind, handle, title, body_html, updated_at in self.db.execute(
+                "SELECT id, kind, handle, title, body_html, updated_at FROM collections ORDER BY id"):
+            state[kind].append({"id": cid, "handle": handle, "title": title, "body_html": body_html,
+                                "updated_at": updated_at})
+        state["collects"] = [{"id": i, "collection_id": c, "product_id": p} for i, c, p in
+                             self.db.execute("SELECT id, collection_id, product_id FROM collects ORDER BY id")]
+        state["products"] = list(self.products())
+        return state
+
+
+def open_mirror(client, path, location_ids):
+    """Open the mirror at `path`, refresh it and report what the refresh read."""
+    mirror = StoreMirror(client, path)
+    start = time.perf_counter()
+    fetched = mirror.refresh(location_ids)
+    print(f"  Mirror {path}: read {fetched} changed records in {time.perf_counter() - start:.1f}s")
+    return mirror
+
+
+def main():
+    shop_domain = os.environ.get("SHOPIFY_ADMIN_DOMAIN", "sefadevtest.myshopify.com")
+    parser = argparse.ArgumentParser(description="Create or refresh a local SQLite mirror of the store.")
+    parser.add_argument("--path", default=f"{shop_domain}.mirror.sqlite",
+                        help="mirror database (default: <shop>.mirror.sqlite)")
+    args = parser.parse_args()
+
+    client = AdminClient(shop_domain, os.environ["SHOPIFY_ADMIN_TOKEN"])
+    print(f"=== Refreshing mirror of {shop_domain} ===")
+    mirror = open_mirror(client, args.path, [loc["id"] for loc in LocationCache(client).all()])
+    counts = {table: mirror._local_count(table)
+              for table in ("products", "variants", "inventory_levels", "collections", "collects")}
+    mirror.close()
+    print("  " + ", ".join(f"{n} {table.replace('_', ' ')}" for table, n in counts.items()))
+    print(f"  {client.metrics.requests} API requests")
+
+
+if __name__ == "__main__":
+    main()
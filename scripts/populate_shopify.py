@@ -3,476 +3,308 @@
 Populate Shopify store with quality products and collections for Trendsdet app.
 """
 
-import requests
+import argparse
+import itertools
 import json
 import time
 import sys
 import os
 
+import bulk_operations
+import product_set
+from audit_store import read_levels, verify
+from catalog import CatalogIndex, generate_catalog, load_catalog, load_collections, rules_for
+from images import ImageStore
+from inventory_writer import InventoryWriter, describe, item_key
+from journal import Journal
+from locations import LocationCache
+from mirror import open_mirror
+from profiling import Profiler
+from shopify_admin import DEFAULT_POOL_SIZE, AdminClient, gid
+from snapshot import inventory_levels, load_snapshot, store_state
+from spool import Spool, read_spool
+from store_sync import build_plan, fetch_store_state, handleize, print_plan, variant_payload
+from workers import TaskGraph, bounded_map
+
 SHOP_DOMAIN = os.environ.get("SHOPIFY_ADMIN_DOMAIN", "sefadevtest.myshopify.com")
 ACCESS_TOKEN = os.environ["SHOPIFY_ADMIN_TOKEN"]  # Required: Shopify Admin API access token
 API_VERSION = "2024-10"
-BASE_URL = f"https://{SHOP_DOMAIN}/admin/api/{API_VERSION}"
+CONCURRENCY = int(os.environ.get("SHOPIFY_CONCURRENCY", "4"))  # product writes in flight
+CREATE_WITH = "rest"  # "rest", "product-set" or "bulk"; set by --create-with
+# Sales channel that productSet-created products are published to
+PUBLICATION_NAME = os.environ.get("SHOPIFY_PUBLICATION", "Online Store")
+PUBLICATION_ID = None  # looked up by find_publication()
+
+CLIENT = AdminClient(SHOP_DOMAIN, ACCESS_TOKEN, API_VERSION,
+                     pool_size=max(DEFAULT_POOL_SIZE, CONCURRENCY))
+JOURNAL = Journal()  # opened by main() for resumable seeds
+PROFILE = Profiler(CLIENT.metrics)  # started by --profile
+SPOOL = Spool()  # opened by run(); failed writes land here for --replay
+CREATE_FAILURES = []  # (title, error) of products that could not be created
+
+
+def _journal_inventory(items):
+    for item in items:
+        JOURNAL.record("inventory", item_key(item), item[2])
 
-HEADERS = {
-    "X-Shopify-Access-Token": ACCESS_TOKEN,
-    "Content-Type": "application/json",
-}
+
+def _journal_images(handles):
+    for handle in handles:
+        JOURNAL.record("images", handle)
+
+
+INVENTORY = InventoryWriter(CLIENT, on_written=_journal_inventory, on_failed=SPOOL.record,
+                            timer=lambda: PROFILE.measure("set_inventory"))
+LOCATIONS = LocationCache(CLIENT)
+IMAGES = ImageStore(CLIENT, on_attached=_journal_images, on_failed=SPOOL.record)
 
 def api_get(endpoint, params=None):
-    r = requests.get(f"{BASE_URL}/{endpoint}", headers=HEADERS, params=params)
+    r = CLIENT.get(endpoint, params=params)
     r.raise_for_status()
     return r.json()
 
 def api_post(endpoint, data):
-    r = requests.post(f"{BASE_URL}/{endpoint}", headers=HEADERS, json=data)
+    r = CLIENT.post(endpoint, data)
     if r.status_code >= 400:
         print(f"  ERROR {r.status_code}: {r.text[:300]}")
     r.raise_for_status()
     return r.json()
 
 def api_put(endpoint, data):
-    r = requests.put(f"{BASE_URL}/{endpoint}", headers=HEADERS, json=data)
+    r = CLIENT.put(endpoint, data)
     if r.status_code >= 400:
         print(f"  ERROR {r.status_code}: {r.text[:300]}")
     r.raise_for_status()
     return r.json()
 
 def api_delete(endpoint):
-    r = requests.delete(f"{BASE_URL}/{endpoint}", headers=HEADERS)
+    r = CLIENT.delete(endpoint)
     return r.status_code
 
 # ── Step 1: Delete all existing products ──────────────────────────────
 
-def delete_all_products():
+PRODUCT_DELETE = """
+mutation call($input: ProductDeleteInput!) {
+  productDelete(input: $input) { deletedProductId userErrors { field message } }
+}
+"""
+
+@PROFILE.timed("delete_product")
+def delete_product(product_id):
+    """Delete one product; a 404 means it is already gone."""
+    status = api_delete(f"products/{product_id}.json")
+    if status not in (200, 404):
+        raise RuntimeError(f"DELETE products/{product_id}.json returned {status}")
+
+def delete_all_products(bulk=False, product_ids=None):
+    """Delete every product, concurrently or as one GraphQL bulk mutation.
+
+    `product_ids` (e.g. from a store mirror) saves listing the products first.
+    """
     print("=== Deleting all existing products ===")
-    page = 1
-    while True:
-        data = api_get("products.json", {"limit": 250, "fields": "id"})
-        products = data.get("products", [])
-        if not products:
-            break
-        for p in products:
-            api_delete(f"products/{p['id']}.json")
-        print(f"  Deleted {len(products)} products")
-        time.sleep(0.5)
-    print("  All products deleted.\n")
+    if product_ids is None:
+        product_ids = (p["id"] for p in CLIENT.paginate("products.json", "products", {"fields": "id"}))
+    deleted = 0
+    failures = []
+
+    if bulk:
+        sent = []  # bulk results only carry the line number
+
+        def lines():
+            for pid in product_ids:
+                sent.append(pid)
+                yield {"input": {"id": gid("Product", pid)}}
+
+        op_id = bulk_operations.run_mutation(CLIENT, PRODUCT_DELETE, lines())
+        op = bulk_operations.wait_for(
+            CLIENT, op_id,
+            progress=lambda op: print(f"  Bulk delete {op['status']}: {op['objectCount']} processed"),
+        )
+        for line in bulk_operations.iter_results(op["url"], timeout=CLIENT.timeout):
+            result = line.get("data", {}).get("productDelete") or {}
+            if result.get("deletedProductId"):
+                deleted += 1
+                continue
+            errors = result.get("userErrors") or line.get("errors") or [{"message": "no result"}]
+            pid = sent[line["__lineNumber"]]
+            failures.append((pid, errors))
+            SPOOL.record("product_delete", {"product_id": pid}, errors[0].get("code") or "UserError",
+                         "; ".join(e["message"] for e in errors))
+    else:
+        for _, pid, future in bounded_map(delete_product, product_ids, CONCURRENCY):
+            try:
+                future.result()
+            except Exception as e:
+                failures.append((pid, e))
+                SPOOL.record("product_delete", {"product_id": pid}, type(e).__name__, str(e))
+                continue
+            deleted += 1
+            if deleted % 250 == 0:
+                print(f"  Deleted {deleted} products")
+
+    remaining = api_get("products/count.json")["count"]
+    print(f"  Deleted {deleted} products, {remaining} remaining.")
+    for pid, error in failures:
+        print(f"  FAILED to delete product {pid}: {error}")
+    print()
+    return remaining
+
+def delete_collection(endpoint, collection_id):
+    """Delete one collection; a 404 means it is already gone."""
+    status = api_delete(f"{endpoint}/{collection_id}.json")
+    if status not in (200, 404):
+        raise RuntimeError(f"DELETE {endpoint}/{collection_id}.json returned {status}")
+
+def _delete_collections(endpoint, kind):
+    """Delete every collection of one kind; returns how many could not be deleted."""
+    failed = 0
+    for c in CLIENT.paginate(f"{endpoint}.json", endpoint):
+        try:
+            delete_collection(endpoint, c["id"])
+        except Exception as e:
+            failed += 1
+            SPOOL.record("collection_delete", {"endpoint": endpoint, "collection_id": c["id"]},
+                         type(e).__name__, str(e))
+            print(f"  FAILED to delete {kind}: {c['title']}: {e}")
+            continue
+        print(f"  Deleted {kind}: {c['title']}")
+    return failed
 
 def delete_custom_collections():
     print("=== Deleting custom collections ===")
-    data = api_get("custom_collections.json", {"limit": 250})
-    for c in data.get("custom_collections", []):
-        api_delete(f"custom_collections/{c['id']}.json")
-        print(f"  Deleted collection: {c['title']}")
+    failed = _delete_collections("custom_collections", "collection")
     print()
+    return failed
 
 def delete_smart_collections():
     print("=== Deleting smart collections ===")
-    data = api_get("smart_collections.json", {"limit": 250})
-    for c in data.get("smart_collections", []):
-        api_delete(f"smart_collections/{c['id']}.json")
-        print(f"  Deleted smart collection: {c['title']}")
+    failed = _delete_collections("smart_collections", "smart collection")
     print()
+    return failed
+
+def check_deleted(left, what):
+    """Raise when a purge step left `left` records behind."""
+    if left:
+        raise RuntimeError(f"{left} {what} could not be deleted; the failed deletes are spooled to {SPOOL.path}")
 
 # ── Step 2: Create products ──────────────────────────────────────────
 
-# High-quality free images from picsum/unsplash-style URLs
-PRODUCTS = [
-    # ── Electronics ──
-    {
-        "title": "Wireless Noise-Canceling Headphones",
-        "body_html": "<p>Premium over-ear headphones with active noise cancellation and 30-hour battery life. Features Bluetooth 5.3, multi-device pairing, and memory foam ear cushions for all-day comfort. Perfect for music lovers and professionals alike.</p>",
-        "vendor": "TrendAudio",
-        "product_type": "Electronics",
-        "tags": "electronics, headphones, wireless, noise-canceling, bluetooth",
-        "variants": [
-            {"title": "Midnight Black", "price": "199.99", "compare_at_price": "249.99", "sku": "WH-BLK-001", "inventory_quantity": 50, "option1": "Midnight Black"},
-            {"title": "Pearl White", "price": "199.99", "compare_at_price": "249.99", "sku": "WH-WHT-001", "inventory_quantity": 35, "option1": "Pearl White"},
-            {"title": "Navy Blue", "price": "209.99", "compare_at_price": "259.99", "sku": "WH-BLU-001", "inventory_quantity": 20, "option1": "Navy Blue"},
-        ],
-        "options": [{"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1583394838336-acd977736f90?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Smart Watch Pro",
-        "body_html": "<p>Advanced fitness and health tracking smartwatch with AMOLED display, GPS, heart rate monitor, blood oxygen sensor, and 7-day battery life. Water resistant to 50 meters. Compatible with iOS and Android.</p>",
-        "vendor": "TrendTech",
-        "product_type": "Electronics",
-        "tags": "electronics, smartwatch, fitness, health, wearable",
-        "variants": [
-            {"title": "40mm / Black Sport Band", "price": "299.99", "compare_at_price": "349.99", "sku": "SW-40-BLK", "inventory_quantity": 40, "option1": "40mm", "option2": "Black Sport Band"},
-            {"title": "40mm / White Sport Band", "price": "299.99", "compare_at_price": "349.99", "sku": "SW-40-WHT", "inventory_quantity": 25, "option1": "40mm", "option2": "White Sport Band"},
-            {"title": "44mm / Black Sport Band", "price": "329.99", "compare_at_price": "379.99", "sku": "SW-44-BLK", "inventory_quantity": 30, "option1": "44mm", "option2": "Black Sport Band"},
-            {"title": "44mm / Silver Mesh", "price": "359.99", "compare_at_price": "399.99", "sku": "SW-44-SLV", "inventory_quantity": 15, "option1": "44mm", "option2": "Silver Mesh"},
-        ],
-        "options": [{"name": "Size"}, {"name": "Band"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1546868871-af0de0ae72be?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Portable Bluetooth Speaker",
-        "body_html": "<p>Compact waterproof Bluetooth speaker with 360-degree sound, deep bass, and 12-hour playtime. IPX7 waterproof rating makes it perfect for pool parties, beach trips, and outdoor adventures.</p>",
-        "vendor": "TrendAudio",
-        "product_type": "Electronics",
-        "tags": "electronics, speaker, bluetooth, portable, waterproof",
-        "variants": [
-            {"title": "Ocean Blue", "price": "79.99", "compare_at_price": None, "sku": "BS-BLU-001", "inventory_quantity": 100, "option1": "Ocean Blue"},
-            {"title": "Sunset Orange", "price": "79.99", "compare_at_price": None, "sku": "BS-ORG-001", "inventory_quantity": 80, "option1": "Sunset Orange"},
-            {"title": "Forest Green", "price": "79.99", "compare_at_price": None, "sku": "BS-GRN-001", "inventory_quantity": 60, "option1": "Forest Green"},
-        ],
-        "options": [{"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1608043152269-423dbba4e7e1?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Wireless Charging Pad",
-        "body_html": "<p>Ultra-slim 15W fast wireless charging pad compatible with all Qi-enabled devices. Features LED indicator, anti-slip surface, and foreign object detection for safe charging.</p>",
-        "vendor": "TrendTech",
-        "product_type": "Electronics",
-        "tags": "electronics, charging, wireless, accessories",
-        "variants": [
-            {"title": "Default", "price": "29.99", "compare_at_price": "39.99", "sku": "WC-001", "inventory_quantity": 200, "option1": "Default Title"},
-        ],
-        "options": [{"name": "Title"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1586953208448-b95a79798f07?w=800&q=80"},
-        ],
-    },
-    # ── Clothing ──
-    {
-        "title": "Premium Cotton T-Shirt",
-        "body_html": "<p>Ultra-soft 100% organic cotton t-shirt with a relaxed fit. Pre-shrunk fabric, reinforced seams, and tagless comfort label. Available in multiple colors and sizes for everyday style.</p>",
-        "vendor": "TrendWear",
-        "product_type": "Clothing",
-        "tags": "clothing, t-shirt, cotton, organic, casual",
-        "variants": [
-            {"title": "S / White", "price": "29.99", "compare_at_price": None, "sku": "TS-S-WHT", "inventory_quantity": 100, "option1": "S", "option2": "White"},
-            {"title": "M / White", "price": "29.99", "compare_at_price": None, "sku": "TS-M-WHT", "inventory_quantity": 150, "option1": "M", "option2": "White"},
-            {"title": "L / White", "price": "29.99", "compare_at_price": None, "sku": "TS-L-WHT", "inventory_quantity": 120, "option1": "L", "option2": "White"},
-            {"title": "M / Black", "price": "29.99", "compare_at_price": None, "sku": "TS-M-BLK", "inventory_quantity": 130, "option1": "M", "option2": "Black"},
-            {"title": "L / Black", "price": "29.99", "compare_at_price": None, "sku": "TS-L-BLK", "inventory_quantity": 110, "option1": "L", "option2": "Black"},
-        ],
-        "options": [{"name": "Size"}, {"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1583743814966-8936f5b7be1a?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Classic Denim Jacket",
-        "body_html": "<p>Timeless denim jacket crafted from premium selvedge denim. Features brass buttons, adjustable waist tabs, and a modern slim fit. A wardrobe essential that gets better with age.</p>",
-        "vendor": "TrendWear",
-        "product_type": "Clothing",
-        "tags": "clothing, jacket, denim, classic, outerwear",
-        "variants": [
-            {"title": "S", "price": "89.99", "compare_at_price": "119.99", "sku": "DJ-S-001", "inventory_quantity": 30, "option1": "S"},
-            {"title": "M", "price": "89.99", "compare_at_price": "119.99", "sku": "DJ-M-001", "inventory_quantity": 45, "option1": "M"},
-            {"title": "L", "price": "89.99", "compare_at_price": "119.99", "sku": "DJ-L-001", "inventory_quantity": 40, "option1": "L"},
-            {"title": "XL", "price": "89.99", "compare_at_price": "119.99", "sku": "DJ-XL-001", "inventory_quantity": 20, "option1": "XL"},
-        ],
-        "options": [{"name": "Size"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1551028719-00167b16eac5?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1495105787522-5334e3ffa0ef?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Running Sneakers",
-        "body_html": "<p>Lightweight performance running shoes with responsive cushioning and breathable mesh upper. Engineered for comfort on long runs with arch support and shock absorption technology.</p>",
-        "vendor": "TrendSport",
-        "product_type": "Clothing",
-        "tags": "clothing, shoes, sneakers, running, sport",
-        "variants": [
-            {"title": "US 8 / Gray", "price": "129.99", "compare_at_price": "159.99", "sku": "RS-8-GRY", "inventory_quantity": 25, "option1": "US 8", "option2": "Gray"},
-            {"title": "US 9 / Gray", "price": "129.99", "compare_at_price": "159.99", "sku": "RS-9-GRY", "inventory_quantity": 35, "option1": "US 9", "option2": "Gray"},
-            {"title": "US 10 / Gray", "price": "129.99", "compare_at_price": "159.99", "sku": "RS-10-GRY", "inventory_quantity": 40, "option1": "US 10", "option2": "Gray"},
-            {"title": "US 10 / Black", "price": "129.99", "compare_at_price": "159.99", "sku": "RS-10-BLK", "inventory_quantity": 30, "option1": "US 10", "option2": "Black"},
-        ],
-        "options": [{"name": "Size"}, {"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1542291026-7eec264c27ff?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1460353581641-37baddab0fa2?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Wool Blend Scarf",
-        "body_html": "<p>Luxuriously soft wool-cashmere blend scarf with classic herringbone pattern. Generously sized at 180cm x 30cm for versatile styling. Perfect for adding warmth and elegance to any outfit.</p>",
-        "vendor": "TrendWear",
-        "product_type": "Clothing",
-        "tags": "clothing, scarf, wool, accessories, winter",
-        "variants": [
-            {"title": "Camel", "price": "49.99", "compare_at_price": None, "sku": "SC-CML-001", "inventory_quantity": 70, "option1": "Camel"},
-            {"title": "Charcoal", "price": "49.99", "compare_at_price": None, "sku": "SC-CHR-001", "inventory_quantity": 60, "option1": "Charcoal"},
-            {"title": "Burgundy", "price": "49.99", "compare_at_price": None, "sku": "SC-BRG-001", "inventory_quantity": 45, "option1": "Burgundy"},
-        ],
-        "options": [{"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1520903920243-00d872a2d1c9?w=800&q=80"},
-        ],
-    },
-    # ── Home & Living ──
-    {
-        "title": "Scented Soy Candle Set",
-        "body_html": "<p>Hand-poured soy wax candles in artisan ceramic jars. Set of 3 complementary scents: Vanilla Bean, Fresh Linen, and Mediterranean Fig. Each candle burns for 45+ hours with a clean, even flame.</p>",
-        "vendor": "TrendHome",
-        "product_type": "Home & Living",
-        "tags": "home, candles, soy, scented, decor",
-        "variants": [
-            {"title": "Set of 3", "price": "44.99", "compare_at_price": "59.99", "sku": "SC-SET3-001", "inventory_quantity": 80, "option1": "Set of 3"},
-            {"title": "Single - Vanilla Bean", "price": "18.99", "compare_at_price": None, "sku": "SC-VAN-001", "inventory_quantity": 120, "option1": "Single - Vanilla Bean"},
-            {"title": "Single - Fresh Linen", "price": "18.99", "compare_at_price": None, "sku": "SC-LIN-001", "inventory_quantity": 100, "option1": "Single - Fresh Linen"},
-        ],
-        "options": [{"name": "Size"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1602028915047-37269d1a73f7?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1603006905003-be475563bc59?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Ceramic Coffee Mug",
-        "body_html": "<p>Handcrafted ceramic mug with a matte finish and comfortable handle. Holds 12oz of your favorite beverage. Microwave and dishwasher safe. Each piece is unique with subtle glaze variations.</p>",
-        "vendor": "TrendHome",
-        "product_type": "Home & Living",
-        "tags": "home, mug, ceramic, coffee, kitchen",
-        "variants": [
-            {"title": "Sage Green", "price": "19.99", "compare_at_price": None, "sku": "MG-SGN-001", "inventory_quantity": 90, "option1": "Sage Green"},
-            {"title": "Dusty Rose", "price": "19.99", "compare_at_price": None, "sku": "MG-DRS-001", "inventory_quantity": 85, "option1": "Dusty Rose"},
-            {"title": "Slate Blue", "price": "19.99", "compare_at_price": None, "sku": "MG-SBL-001", "inventory_quantity": 75, "option1": "Slate Blue"},
-            {"title": "Cream", "price": "19.99", "compare_at_price": None, "sku": "MG-CRM-001", "inventory_quantity": 100, "option1": "Cream"},
-        ],
-        "options": [{"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1514228742587-6b1558fcca3d?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Minimalist Wall Clock",
-        "body_html": "<p>Modern minimalist wall clock with silent sweep mechanism. 12-inch diameter with clean numerical design. Precision quartz movement ensures accurate timekeeping. A stylish addition to any room.</p>",
-        "vendor": "TrendHome",
-        "product_type": "Home & Living",
-        "tags": "home, clock, wall, minimalist, decor",
-        "variants": [
-            {"title": "White / Gold", "price": "39.99", "compare_at_price": "54.99", "sku": "WC-WGD-001", "inventory_quantity": 45, "option1": "White / Gold"},
-            {"title": "Black / Silver", "price": "39.99", "compare_at_price": "54.99", "sku": "WC-BSV-001", "inventory_quantity": 40, "option1": "Black / Silver"},
-        ],
-        "options": [{"name": "Style"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1563861826100-9cb868fdbe1c?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Linen Throw Pillow",
-        "body_html": "<p>Premium stonewashed linen throw pillow with hidden zipper closure. 18x18 inches, filled with hypoallergenic down-alternative insert. Adds texture and warmth to any sofa or bed.</p>",
-        "vendor": "TrendHome",
-        "product_type": "Home & Living",
-        "tags": "home, pillow, linen, decor, living room",
-        "variants": [
-            {"title": "Natural Beige", "price": "34.99", "compare_at_price": None, "sku": "TP-NBG-001", "inventory_quantity": 65, "option1": "Natural Beige"},
-            {"title": "Olive Green", "price": "34.99", "compare_at_price": None, "sku": "TP-OGN-001", "inventory_quantity": 55, "option1": "Olive Green"},
-            {"title": "Terracotta", "price": "34.99", "compare_at_price": None, "sku": "TP-TRC-001", "inventory_quantity": 50, "option1": "Terracotta"},
-        ],
-        "options": [{"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1584100936595-c0654b55a2e2?w=800&q=80"},
-        ],
-    },
-    # ── Beauty & Personal Care ──
-    {
-        "title": "Vitamin C Serum",
-        "body_html": "<p>Professional-grade 20% Vitamin C serum with Hyaluronic Acid and Vitamin E. Brightens skin, reduces dark spots, and boosts collagen production. Suitable for all skin types. 30ml dropper bottle.</p>",
-        "vendor": "TrendBeauty",
-        "product_type": "Beauty",
-        "tags": "beauty, skincare, serum, vitamin c, anti-aging",
-        "variants": [
-            {"title": "30ml", "price": "24.99", "compare_at_price": "34.99", "sku": "VCS-30-001", "inventory_quantity": 150, "option1": "30ml"},
-            {"title": "60ml", "price": "39.99", "compare_at_price": "54.99", "sku": "VCS-60-001", "inventory_quantity": 80, "option1": "60ml"},
-        ],
-        "options": [{"name": "Size"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1620916566398-39f1143ab7be?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Natural Lip Balm Set",
-        "body_html": "<p>Set of 4 organic lip balms made with beeswax, coconut oil, and shea butter. Flavors include Honey, Mint, Berry, and Vanilla. Moisturizes and protects lips all day long.</p>",
-        "vendor": "TrendBeauty",
-        "product_type": "Beauty",
-        "tags": "beauty, lip balm, organic, natural, skincare",
-        "variants": [
-            {"title": "Set of 4", "price": "14.99", "compare_at_price": "19.99", "sku": "LB-SET4-001", "inventory_quantity": 200, "option1": "Set of 4"},
-        ],
-        "options": [{"name": "Title"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1586495777744-4413f21062fa?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Jade Face Roller",
-        "body_html": "<p>Authentic jade stone face roller with dual-ended design for face and under-eye massage. Reduces puffiness, promotes circulation, and enhances skincare product absorption. Comes in a velvet storage pouch.</p>",
-        "vendor": "TrendBeauty",
-        "product_type": "Beauty",
-        "tags": "beauty, face roller, jade, skincare, wellness",
-        "variants": [
-            {"title": "Green Jade", "price": "22.99", "compare_at_price": None, "sku": "JR-GRN-001", "inventory_quantity": 90, "option1": "Green Jade"},
-            {"title": "Rose Quartz", "price": "24.99", "compare_at_price": None, "sku": "JR-RSQ-001", "inventory_quantity": 70, "option1": "Rose Quartz"},
-        ],
-        "options": [{"name": "Stone"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1590439471364-192aa70c0b53?w=800&q=80"},
-        ],
-    },
-    # ── Bags & Accessories ──
-    {
-        "title": "Leather Crossbody Bag",
-        "body_html": "<p>Handcrafted genuine leather crossbody bag with adjustable strap. Features two main compartments, interior zip pocket, and magnetic snap closure. Compact yet spacious enough for daily essentials.</p>",
-        "vendor": "TrendAccessories",
-        "product_type": "Bags",
-        "tags": "bags, leather, crossbody, accessories, fashion",
-        "variants": [
-            {"title": "Cognac", "price": "79.99", "compare_at_price": "99.99", "sku": "CB-COG-001", "inventory_quantity": 35, "option1": "Cognac"},
-            {"title": "Black", "price": "79.99", "compare_at_price": "99.99", "sku": "CB-BLK-001", "inventory_quantity": 40, "option1": "Black"},
-            {"title": "Tan", "price": "79.99", "compare_at_price": "99.99", "sku": "CB-TAN-001", "inventory_quantity": 25, "option1": "Tan"},
-        ],
-        "options": [{"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1548036328-c9fa89d128fa?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1590874103328-eac38a683ce7?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Canvas Tote Bag",
-        "body_html": "<p>Durable organic cotton canvas tote bag with reinforced handles and interior pocket. Perfect for groceries, beach trips, or everyday carry. Machine washable and eco-friendly.</p>",
-        "vendor": "TrendAccessories",
-        "product_type": "Bags",
-        "tags": "bags, canvas, tote, eco-friendly, organic",
-        "variants": [
-            {"title": "Natural", "price": "24.99", "compare_at_price": None, "sku": "TB-NAT-001", "inventory_quantity": 150, "option1": "Natural"},
-            {"title": "Black", "price": "24.99", "compare_at_price": None, "sku": "TB-BLK-001", "inventory_quantity": 120, "option1": "Black"},
-        ],
-        "options": [{"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1544816155-12df9643f363?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Minimalist Watch",
-        "body_html": "<p>Elegant minimalist watch with Japanese quartz movement and genuine leather strap. 38mm stainless steel case with scratch-resistant sapphire crystal. Water resistant to 30 meters.</p>",
-        "vendor": "TrendAccessories",
-        "product_type": "Bags",
-        "tags": "accessories, watch, minimalist, leather, fashion",
-        "variants": [
-            {"title": "Silver / Brown Strap", "price": "149.99", "compare_at_price": "189.99", "sku": "MW-SBR-001", "inventory_quantity": 20, "option1": "Silver / Brown Strap"},
-            {"title": "Gold / Black Strap", "price": "159.99", "compare_at_price": "199.99", "sku": "MW-GBK-001", "inventory_quantity": 15, "option1": "Gold / Black Strap"},
-            {"title": "Rose Gold / Pink Strap", "price": "159.99", "compare_at_price": "199.99", "sku": "MW-RGP-001", "inventory_quantity": 18, "option1": "Rose Gold / Pink Strap"},
-        ],
-        "options": [{"name": "Style"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1524592094714-0f0654e20314?w=800&q=80"},
-            {"src": "https://images.unsplash.com/photo-1522312346375-d1a52e2b99b3?w=800&q=80"},
-        ],
-    },
-    {
-        "title": "Sunglasses UV400",
-        "body_html": "<p>Classic aviator sunglasses with UV400 protection and polarized lenses. Lightweight metal frame with adjustable nose pads for a comfortable fit. Includes hard shell carrying case and cleaning cloth.</p>",
-        "vendor": "TrendAccessories",
-        "product_type": "Bags",
-        "tags": "accessories, sunglasses, uv protection, fashion, summer",
-        "variants": [
-            {"title": "Gold / Green", "price": "59.99", "compare_at_price": None, "sku": "SG-GGN-001", "inventory_quantity": 55, "option1": "Gold / Green"},
-            {"title": "Silver / Blue", "price": "59.99", "compare_at_price": None, "sku": "SG-SBL-001", "inventory_quantity": 45, "option1": "Silver / Blue"},
-            {"title": "Black / Gray", "price": "59.99", "compare_at_price": None, "sku": "SG-BGY-001", "inventory_quantity": 60, "option1": "Black / Gray"},
-        ],
-        "options": [{"name": "Style"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1572635196237-14b3f281503f?w=800&q=80"},
-        ],
-    },
-    # ── Books & Stationery ──
-    {
-        "title": "Leather Bound Journal",
-        "body_html": "<p>Handmade leather journal with 240 pages of acid-free cream paper. Features a wrap-around closure, bookmark ribbon, and back pocket. Perfect for journaling, sketching, or note-taking.</p>",
-        "vendor": "TrendStationery",
-        "product_type": "Stationery",
-        "tags": "stationery, journal, leather, notebook, writing",
-        "variants": [
-            {"title": "A5 / Brown", "price": "32.99", "compare_at_price": None, "sku": "LJ-A5-BRN", "inventory_quantity": 80, "option1": "A5", "option2": "Brown"},
-            {"title": "A5 / Black", "price": "32.99", "compare_at_price": None, "sku": "LJ-A5-BLK", "inventory_quantity": 70, "option1": "A5", "option2": "Black"},
-            {"title": "A6 / Brown", "price": "24.99", "compare_at_price": None, "sku": "LJ-A6-BRN", "inventory_quantity": 90, "option1": "A6", "option2": "Brown"},
-        ],
-        "options": [{"name": "Size"}, {"name": "Color"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1544716278-ca5e3f4abd8c?w=800&q=80"},
-        ],
-    },
-    # ── One Out of Stock product for testing ──
-    {
-        "title": "Limited Edition Art Print",
-        "body_html": "<p>Museum-quality giclée art print on archival matte paper. Each print is numbered and signed by the artist. Available in two sizes with optional framing.</p>",
-        "vendor": "TrendArt",
-        "product_type": "Home & Living",
-        "tags": "home, art, print, limited edition, decor",
-        "variants": [
-            {"title": "12x16 / Unframed", "price": "45.00", "compare_at_price": None, "sku": "AP-12-UF", "inventory_quantity": 0, "option1": "12x16", "option2": "Unframed"},
-            {"title": "18x24 / Unframed", "price": "65.00", "compare_at_price": None, "sku": "AP-18-UF", "inventory_quantity": 0, "option1": "18x24", "option2": "Unframed"},
-            {"title": "18x24 / Framed", "price": "120.00", "compare_at_price": None, "sku": "AP-18-FR", "inventory_quantity": 0, "option1": "18x24", "option2": "Framed"},
-        ],
-        "options": [{"name": "Size"}, {"name": "Frame"}],
-        "images": [
-            {"src": "https://images.unsplash.com/photo-1513364776144-60967b0f800f?w=800&q=80"},
-        ],
-    },
-]
+# Product and collection data live in data/; pass --catalog / --collections to
+# seed from other files. Catalogs stream record by record (see catalog.py).
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_CATALOG = os.path.join(DATA_DIR, "products.jsonl")
+DEFAULT_COLLECTIONS = os.path.join(DATA_DIR, "collections.json")
+
+
+def queue_inventory(product_data, variants, title):
+    """Queue stock for created variants, skipping levels the journal already has."""
+    for v_data, v in zip(product_data["variants"], variants):
+        for location_id, target_qty in LOCATIONS.quantities(v_data):
+            if JOURNAL.has("inventory", f"{v['inventory_item_id']}@{location_id}"):
+                continue
+            INVENTORY.add(v["inventory_item_id"], location_id, target_qty,
+                          label=f"{title} / {v['title']}", activate=LOCATIONS.needs_activation(location_id))
+
+
+def queue_images(product_data, product_id, handle):
+    """Upload a product's images once and queue them for attaching by file ID."""
+    if IMAGES.enabled and product_data["images"] and not JOURNAL.has("images", handle):
+        IMAGES.attach(product_id, [img["src"] for img in product_data["images"]], key=handle)
+
+
+def find_publication():
+    """Look up the publication of PUBLICATION_NAME once; exits if there is none."""
+    global PUBLICATION_ID
+    if PUBLICATION_ID is None:
+        PUBLICATION_ID = product_set.find_publication(CLIENT, PUBLICATION_NAME)
+        if PUBLICATION_ID is None:
+            raise SystemExit(f"No publication named {PUBLICATION_NAME!r}; products created with productSet "
+                             f"cannot be published (set SHOPIFY_PUBLICATION)")
+    return PUBLICATION_ID
+
+
+def publish_product(product_id, handle):
+    """Publish a productSet-created product, spooling it if that fails."""
+    try:
+        product_set.publish(CLIENT, product_id, find_publication())
+    except Exception as e:
+        SPOOL.record("product_publish", {"product_id": product_id, "publication_id": PUBLICATION_ID},
+                     type(e).__name__, str(e))
+        return
+    JOURNAL.record("published", handle)
+
+
+def publish_products_bulk(products):
+    """Publish (product ID, handle) pairs with one bulk mutation."""
+    failed = {i: (error_class, message) for i, error_class, message in product_set.publish_bulk(
+        CLIENT, [pid for pid, _ in products], find_publication(),
+        progress=lambda op: print(f"  Bulk publish {op['status']}: {op['objectCount']} processed"),
+    )}
+    for i, (pid, handle) in enumerate(products):
+        if i in failed:
+            print(f"  FAILED to publish product {pid}: {failed[i][1]}")
+            SPOOL.record("product_publish", {"product_id": pid, "publication_id": PUBLICATION_ID}, *failed[i])
+        else:
+            JOURNAL.record("published", handle)
+
+
+def needs_publishing(done):
+    """Whether a journalled product was created unpublished and not published since."""
+    return done.get("unpublished") and not JOURNAL.has("published", handleize(done["title"]))
 
-# ── Step 3: Collections ──────────────────────────────────────────────
 
-COLLECTIONS = [
-    {
-        "title": "Electronics",
-        "body_html": "Discover the latest in tech — headphones, smartwatches, speakers and more.",
-        "image_src": "https://images.unsplash.com/photo-1468495244123-6c6c332eeece?w=1200&q=80",
-        "product_types": ["Electronics"],
-    },
-    {
-        "title": "Clothing & Fashion",
-        "body_html": "Timeless style essentials for every season.",
-        "image_src": "https://images.unsplash.com/photo-1441986300917-64674bd600d8?w=1200&q=80",
-        "product_types": ["Clothing"],
-    },
-    {
-        "title": "Home & Living",
-        "body_html": "Beautiful pieces to make your space feel like home.",
-        "image_src": "https://images.unsplash.com/photo-1616046229478-9901c5536a45?w=1200&q=80",
-        "product_types": ["Home & Living"],
-    },
-    {
-        "title": "Beauty & Care",
-        "body_html": "Premium skincare and beauty essentials for your daily routine.",
-        "image_src": "https://images.unsplash.com/photo-1596462502278-27bfdc403348?w=1200&q=80",
-        "product_types": ["Beauty"],
-    },
-    {
-        "title": "Bags & Accessories",
-        "body_html": "Elevate your look with handcrafted bags and accessories.",
-        "image_src": "https://images.unsplash.com/photo-1553062407-98eeb64c6a62?w=1200&q=80",
-        "product_types": ["Bags", "Stationery"],
-    },
-    {
-        "title": "On Sale",
-        "body_html": "Don't miss out — our best deals and discounted items.",
-        "image_src": "https://images.unsplash.com/photo-1607082349566-187342175e2f?w=1200&q=80",
-        "product_types": [],  # Will manually add products with compare_at_price
-    },
-]
+def record_product(product_data, product, stocked=False):
+    """Journal a created product; `stocked` when its inventory was set with it.
 
+    Stocked products came from productSet, which leaves them unpublished.
+    """
+    handle = handleize(product_data["title"])
+    JOURNAL.record("product", handle, {
+        "id": product["id"],
+        "title": product["title"],
+        "variants": [{"inventory_item_id": v["inventory_item_id"], "title": v["title"]}
+                     for v in product["variants"]],
+        "unpublished": stocked,
+    })
+    if stocked:
+        _journal_inventory([(v["inventory_item_id"], location_id, qty, None)
+                            for v_data, v in zip(product_data["variants"], product["variants"])
+                            for location_id, qty in LOCATIONS.quantities(v_data)])
+    else:
+        # Queue inventory quantities; INVENTORY writes them in batches
+        queue_inventory(product_data, product["variants"], product["title"])
+    queue_images(product_data, product["id"], handle)
 
+
+def resume_product(product_data, done):
+    """Queue what is left of a journalled product: unwritten stock and images."""
+    queue_inventory(product_data, done["variants"], done["title"])
+    queue_images(product_data, done["id"], handleize(product_data["title"]))
+
+
+@PROFILE.timed("create_product")
 def create_product(product_data):
-    """Create a product with variants and images."""
+    """Create a product with variants and images.
+
+    Products already in the journal are not created again; only their
+    unwritten inventory and unattached images are queued, and they are
+    published if that did not happen yet.
+    """
+    handle = handleize(product_data["title"])
+    done = JOURNAL.get("product", handle)
+    if done:
+        resume_product(product_data, done)
+        if needs_publishing(done):
+            publish_product(done["id"], handle)
+        return done
+
+    if CREATE_WITH != "rest":
+        payload = product_set.product_set_input(product_data, LOCATIONS.quantities, images=not IMAGES.enabled)
+        product = product_set.create(CLIENT, payload)
+        record_product(product_data, product, stocked=True)
+        publish_product(product["id"], handle)
+        return product
+
     payload = {
         "product": {
             "title": product_data["title"],
@@ -483,140 +315,749 @@ def create_product(product_data):
             "status": "active",
             "options": product_data["options"],
             "variants": [],
-            "images": [{"src": img["src"]} for img in product_data["images"]],
         }
     }
+    if not IMAGES.enabled:
+        payload["product"]["images"] = [{"src": img["src"]} for img in product_data["images"]]
 
     for v in product_data["variants"]:
-        variant = {
-            "title": v["title"],
-            "price": v["price"],
-            "sku": v["sku"],
-            "inventory_management": "shopify",
-            "option1": v.get("option1"),
-            "option2": v.get("option2"),
-            "option3": v.get("option3"),
-        }
-        if v.get("compare_at_price"):
-            variant["compare_at_price"] = v["compare_at_price"]
-        payload["product"]["variants"].append(variant)
+        payload["product"]["variants"].append(variant_payload(v))
 
     result = api_post("products.json", payload)
     product = result["product"]
+    record_product(product_data, product)
+    return product
 
-    # Set inventory quantities
-    for i, v in enumerate(product["variants"]):
-        if i < len(product_data["variants"]):
-            target_qty = product_data["variants"][i].get("inventory_quantity", 0)
-            inv_item_id = v["inventory_item_id"]
-            # Get location
-            locations = api_get("locations.json")
-            location_id = locations["locations"][0]["id"]
-            # Set inventory level
-            try:
-                requests.post(
-                    f"{BASE_URL}/inventory_levels/set.json",
-                    headers=HEADERS,
-                    json={
-                        "location_id": location_id,
-                        "inventory_item_id": inv_item_id,
-                        "available": target_qty,
-                    }
-                )
-            except Exception:
-                pass
 
-    return product
+def product_create_failed(product_data, error_class, message):
+    """Record and spool a product that could not be created."""
+    CREATE_FAILURES.append((product_data["title"], f"{error_class}: {message}"))
+    SPOOL.record("product_create", {"product": product_data}, error_class, message)
+
+
+def create_products(products, concurrency=CONCURRENCY):
+    """Create products with up to `concurrency` creates in flight.
+
+    `products` may be any iterable, including a streaming catalog reader. All
+    workers share CLIENT's rate governor. Returns the created product IDs in
+    catalog order regardless of the order the creates finish in, with None
+    for products that failed; those are reported and spooled.
+    """
+    if CREATE_WITH == "bulk":
+        return create_products_bulk(products)
+    product_ids = {}
+    for done_count, (i, p, future) in enumerate(bounded_map(create_product, products, concurrency), 1):
+        try:
+            product_ids[i] = future.result()["id"]
+        except Exception as e:
+            product_ids[i] = None
+            product_create_failed(p, type(e).__name__, str(e))
+            print(f"  [{done_count}] FAILED to create {p['title']}: {type(e).__name__}: {e}")
+            continue
+        print(f"  [{done_count}] Created: {p['title']}")
+    return [product_ids[i] for i in range(len(product_ids))]
+
+
+def create_products_bulk(products):
+    """Create products with one productSet bulk mutation.
+
+    Products already in the journal are skipped as in create_product(). The
+    catalog records are kept until the operation's results are in, so
+    failures can be spooled. The created products are then published with a
+    second bulk mutation. Returns the product IDs in catalog order, with None
+    for products that failed; those are reported and spooled.
+    """
+    product_ids, waiting, kept = {}, {}, {}  # catalog position -> ID / bulk line / product data
+    resumed = []  # catalog positions of journalled products
+    to_publish = []  # (product ID, handle)
+
+    def payloads():
+        # Only bookkeeping here: the generator runs while the upload streams
+        for i, p in enumerate(products):
+            kept[i] = p
+            if JOURNAL.has("product", handleize(p["title"])):
+                resumed.append(i)
+                continue
+            waiting[len(waiting)] = i
+            yield product_set.product_set_input(p, LOCATIONS.quantities, images=not IMAGES.enabled)
+
+    failures = []  # (catalog position, error class, message)
+    pending = payloads()
+    first = next(pending, None)  # a resumed run may have nothing left to create
+    results = () if first is None else product_set.create_bulk(
+        CLIENT, itertools.chain([first], pending),
+        progress=lambda op: print(f"  Bulk create {op['status']}: {op['objectCount']} processed"),
+    )
+    for line, product, error in results:
+        i = waiting.pop(line)
+        if error:
+            error_class, _, message = error.partition(": ")
+            failures.append((i, error_class, message))
+            continue
+        record_product(kept[i], product, stocked=True)
+        product_ids[i] = product["id"]
+        to_publish.append((product["id"], handleize(kept[i]["title"])))
+    for i in resumed:
+        done = JOURNAL.get("product", handleize(kept[i]["title"]))
+        resume_product(kept[i], done)
+        product_ids[i] = done["id"]
+        if needs_publishing(done):
+            to_publish.append((done["id"], handleize(done["title"])))
+    if to_publish:
+        publish_products_bulk(to_publish)
+    failures += [(i, "BulkOperationError", "no result from the bulk operation") for i in waiting.values()]
+    for i, error_class, message in sorted(failures):
+        print(f"  FAILED to create {kept[i]['title']}: {error_class}: {message}")
+        product_create_failed(kept[i], error_class, message)
+    return [product_ids.get(i) for i in range(len(kept))]
 
 
+def attach_images():
+    """Attach queued product images and report what the image stage did."""
+    IMAGES.flush()
+    if not (IMAGES.uploaded or IMAGES.cached or IMAGES.deduplicated or IMAGES.errors):
+        return
+    print("=== Images ===")
+    print(f"  {IMAGES.uploaded} uploaded, {IMAGES.deduplicated} duplicates skipped, "
+          f"{IMAGES.cached} reused from cache; {IMAGES.attached} attached in {IMAGES.requests} requests.")
+    for source, product, message in IMAGES.errors:
+        print(f"  ERROR {source} -> {product}: {message}")
+    print()
+
+
+# ── Step 3: Collections ──────────────────────────────────────────────
+
+COLLECTION_ADD_PRODUCTS = """
+mutation AddProducts($id: ID!, $productIds: [ID!]!) {
+  collectionAddProducts(id: $id, productIds: $productIds) {
+    userErrors { field message }
+  }
+}
+"""
+
+# collectionAddProducts takes at most 250 product IDs per call
+COLLECTION_CHUNK = 250
+
+
+@PROFILE.timed("create_collection")
 def create_collection(coll_data, product_ids):
-    """Create a custom collection and add products."""
-    payload = {
-        "custom_collection": {
-            "title": coll_data["title"],
-            "body_html": coll_data["body_html"],
-            "image": {"src": coll_data["image_src"]},
-            "published": True,
+    """Create a custom collection with its first chunk of products inline."""
+    product_ids = list(product_ids)
+    collection = JOURNAL.get("collection", coll_data["title"])
+    if collection is None:
+        payload = {
+            "custom_collection": {
+                "title": coll_data["title"],
+                "body_html": coll_data["body_html"],
+                "image": {"src": coll_data["image_src"]},
+                "published": True,
+                "collects": [{"product_id": pid} for pid in product_ids[:COLLECTION_CHUNK]],
+            }
         }
-    }
-    result = api_post("custom_collections.json", payload)
-    collection = result["custom_collection"]
-    coll_id = collection["id"]
+        result = api_post("custom_collections.json", payload)
+        collection = result["custom_collection"]
+        JOURNAL.record("collection", coll_data["title"],
+                       {"id": collection["id"], "title": collection["title"]})
+    add_to_collection(collection["id"], product_ids[COLLECTION_CHUNK:], journal_key=coll_data["title"])
+    return collection
+
+
+@PROFILE.timed("add_to_collection")
+def add_to_collection(coll_id, product_ids, journal_key=None):
+    """Add products to a collection, one collectionAddProducts call per chunk.
 
-    # Add products to collection via collects
-    for pid in product_ids:
+    With a `journal_key`, chunks already recorded in the journal are skipped.
+    """
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), COLLECTION_CHUNK):
+        chunk = product_ids[start:start + COLLECTION_CHUNK]
+        chunk_key = f"{journal_key}#{start}"
+        if journal_key and JOURNAL.has("collection_chunk", chunk_key):
+            continue
         try:
-            api_post("collects.json", {
-                "collect": {
-                    "product_id": pid,
-                    "collection_id": coll_id,
-                }
+            data = CLIENT.graphql(COLLECTION_ADD_PRODUCTS, {
+                "id": gid("Collection", coll_id),
+                "productIds": [gid("Product", pid) for pid in chunk],
             })
+            errors = data["collectionAddProducts"]["userErrors"]
         except Exception as e:
-            print(f"  Warning adding product {pid} to collection: {e}")
-        time.sleep(0.2)
+            errors = [{"message": str(e), "code": type(e).__name__}]
+        for err in errors:
+            print(f"  Warning adding {len(chunk)} products to collection {coll_id}: {err['message']}")
+        if errors:
+            SPOOL.record("collection_add", {"collection_id": coll_id, "product_ids": chunk},
+                         errors[0].get("code") or "UserError", "; ".join(e["message"] for e in errors))
+        if journal_key and not errors:
+            JOURNAL.record("collection_chunk", chunk_key)
 
-    return collection
+
+COLLECTION_REMOVE_PRODUCTS = """
+mutation RemoveProducts($id: ID!, $productIds: [ID!]!) {
+  collectionRemoveProducts(id: $id, productIds: $productIds) {
+    userErrors { field message }
+  }
+}
+"""
+
+
+def remove_from_collection(coll_id, product_ids):
+    """Remove products from a custom collection, one call per chunk."""
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), COLLECTION_CHUNK):
+        chunk = product_ids[start:start + COLLECTION_CHUNK]
+        try:
+            data = CLIENT.graphql(COLLECTION_REMOVE_PRODUCTS, {
+                "id": gid("Collection", coll_id),
+                "productIds": [gid("Product", pid) for pid in chunk],
+            })
+            errors = data["collectionRemoveProducts"]["userErrors"]
+        except Exception as e:
+            errors = [{"message": str(e), "code": type(e).__name__}]
+        for err in errors:
+            print(f"  Warning removing {len(chunk)} products from collection {coll_id}: {err['message']}")
+        if errors:
+            SPOOL.record("collection_remove", {"collection_id": coll_id, "product_ids": chunk},
+                         errors[0].get("code") or "UserError", "; ".join(e["message"] for e in errors))
+
+
+# ── Replaying failed writes ──────────────────────────────────────────
+
+def replay_failed(path):
+    """Send the writes spooled at `path` again, batched as in a normal run.
+
+    The spool is moved aside first, so whatever fails again is spooled
+    afresh at `path`. Returns the number of writes that failed again.
+    """
+    replaying = f"{path}.replaying"
+    # A replay that crashed leaves its input behind; it is retried as well
+    entries = read_spool(replaying) + read_spool(path)
+    print(f"=== Replaying {len(entries)} failed writes from {path} ===")
+    if not entries:
+        print()
+        return 0
+    with open(f"{replaying}.tmp", "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    os.replace(f"{replaying}.tmp", replaying)
+    if os.path.exists(path):
+        os.remove(path)
+    SPOOL.open(path)
+
+    by_op, classes = {}, {}
+    for entry in entries:
+        by_op.setdefault(entry["op"], []).append(entry["payload"])
+        key = (entry["op"], entry["error_class"])
+        classes[key] = classes.get(key, 0) + 1
+    for (op, error_class), n in sorted(classes.items()):
+        print(f"  {n:>6} {op:<18} {error_class}")
+
+    # Created first, so their stock and images go out with the rest below
+    created = create_products([p["product"] for p in by_op.get("product_create", [])])
+    if any(created):
+        print(f"  {sum(1 for pid in created if pid)} products created; run --sync to add them to collections")
+
+    # Later entries for the same level win
+    levels = {(p["inventory_item_id"], p["location_id"]): p for p in by_op.get("inventory_set", [])}
+    for p in levels.values():
+        INVENTORY.add(p["inventory_item_id"], p["location_id"], p["quantity"], label=p.get("label"),
+                      activate=LOCATIONS.needs_activation(p["location_id"]))
+    INVENTORY.flush()
+
+    for op, write in (("collection_add", add_to_collection), ("collection_remove", remove_from_collection)):
+        merged = {}  # collection ID -> product IDs, deduplicated in order
+        for p in by_op.get(op, []):
+            merged.setdefault(p["collection_id"], {}).update(dict.fromkeys(p["product_ids"]))
+        for coll_id, product_ids in merged.items():
+            write(coll_id, list(product_ids))
+
+    for p in by_op.get("collection_delete", []):
+        try:
+            delete_collection(p["endpoint"], p["collection_id"])
+        except Exception as e:
+            SPOOL.record("collection_delete", p, type(e).__name__, str(e))
+
+    to_delete = list(dict.fromkeys(p["product_id"] for p in by_op.get("product_delete", [])))
+    for _, pid, future in bounded_map(delete_product, to_delete, CONCURRENCY):
+        try:
+            future.result()
+        except Exception as e:
+            SPOOL.record("product_delete", {"product_id": pid}, type(e).__name__, str(e))
+
+    for p in by_op.get("product_publish", []):
+        try:
+            product_set.publish(CLIENT, p["product_id"], p["publication_id"])
+        except Exception as e:
+            SPOOL.record("product_publish", p, type(e).__name__, str(e))
+
+    for p in by_op.get("image_attach", []):
+        IMAGES.attach(p["product_id"], p["urls"])
+    for p in by_op.get("file_update", []):
+        for product_id in p["product_ids"]:
+            IMAGES.attach_file(p["file_id"], product_id)
+    if by_op.get("image_attach") or by_op.get("file_update"):
+        IMAGES.flush()
+
+    os.remove(replaying)
+    print(f"\n  Replayed {len(entries)} writes"
+          + (f"; {SPOOL.count} failed again and are spooled to {path}" if SPOOL.count else "; all went through"))
+    return SPOOL.count
+
+
+# ── Incremental sync ─────────────────────────────────────────────────
+
+def apply_plan(plan):
+    """Apply a sync plan: only the products, stock and collections that differ."""
+    if plan.deletes:
+        print("=== Deleting removed products ===")
+        for _, p, future in bounded_map(lambda p: delete_product(p["id"]), plan.deletes, CONCURRENCY):
+            try:
+                future.result()
+            except Exception as e:
+                SPOOL.record("product_delete", {"product_id": p["id"]}, type(e).__name__, str(e))
+                print(f"  FAILED to delete {p['title']}: {e}")
+                continue
+            print(f"  Deleted: {p['title']}")
+        print()
+
+    product_ids = {}  # handle -> product ID
+    if plan.creates:
+        print("=== Creating new products ===")
+        for p, product_id in zip(plan.creates, create_products(plan.creates)):
+            if product_id:
+                product_ids[handleize(p["title"])] = product_id
+        print()
+
+    if plan.updates:
+        print("=== Updating changed products ===")
+        for store, desired, changes in plan.updates:
+            result = api_put(f"products/{store['id']}.json",
+                             {"product": dict(changes, id=store["id"])})
+            product = result["product"]
+            print(f"  Updated: {store['title']} ({', '.join(sorted(changes))})")
+            # Variants added by the update need their stock set too
+            known = {v.get("sku") for v in store["variants"]}
+            desired_variants = {v["sku"]: v for v in desired["variants"]}
+            for v in product["variants"]:
+                if v.get("sku") in known or v.get("sku") not in desired_variants:
+                    continue
+                for location_id, qty in LOCATIONS.quantities(desired_variants[v["sku"]]):
+                    INVENTORY.add(v["inventory_item_id"], location_id, qty,
+                                  label=f"{desired['title']} / {v['title']}",
+                                  activate=LOCATIONS.needs_activation(location_id))
+        print()
+
+    for item_id, location_id, qty, label in plan.inventory:
+        INVENTORY.add(item_id, location_id, qty, label=label, activate=(item_id, location_id) in plan.unstocked)
+    INVENTORY.flush()
+    if INVENTORY.written or INVENTORY.errors:
+        print(f"=== Inventory: set {INVENTORY.written} levels in {INVENTORY.requests} requests ===")
+        for item, message in INVENTORY.errors:
+            print(f"  ERROR {describe(item)}: {message}")
+        print()
+    attach_images()
+
+    print("=== Syncing collections ===")
+    for endpoint, coll in plan.collection_deletes:
+        api_delete(f"{endpoint}/{coll['id']}.json")
+        print(f"  Deleted collection: {coll['title']}")
+    for coll, changes in plan.collection_updates:
+        api_put(f"custom_collections/{coll['id']}.json",
+                {"custom_collection": dict(changes, id=coll["id"])})
+        print(f"  Updated collection: {coll['title']}")
+    to_remove = {}  # collection ID -> product IDs
+    for coll, collect in plan.collects_remove:
+        to_remove.setdefault(coll["id"], []).append(collect["product_id"])
+    for coll_id, pids in to_remove.items():
+        remove_from_collection(coll_id, pids)
+
+    product_ids.update(plan.product_ids)
+    to_add = {}  # collection ID -> handles
+    for coll, handle in plan.collects_add:
+        to_add.setdefault(coll["id"], []).append(handle)
+    for coll_id, handles in to_add.items():
+        add_to_collection(coll_id, [product_ids[h] for h in handles if h in product_ids])
+    for coll, handles in plan.collection_creates:
+        member_ids = [product_ids[h] for h in handles if h in product_ids]
+        print(f"  Creating collection: {coll['title']} ({len(member_ids)} products)...")
+        create_collection(coll, member_ids)
+    print()
+
+
+def sync_store(catalog, collections, dry_run=False, snapshot=None, mirror=None):
+    """Bring the store in line with the catalog without wiping it.
+
+    The store is read page by page, from a snapshot file written by
+    snapshot.py when `snapshot` is given, or from a refreshed SQLite mirror
+    (mirror.py) when `mirror` is given.
+    """
+    print("=== Reading current store state ===")
+    location_ids = [loc["id"] for loc in LOCATIONS.all()]
+    if snapshot:
+        snapshot = load_snapshot(snapshot)
+        state, known = store_state(snapshot), inventory_levels(snapshot)
+        levels_for = lambda item_ids: known
+    elif mirror:
+        state, known = mirror.store_state(), mirror.inventory_levels()
+        levels_for = lambda item_ids: known
+    else:
+        state = fetch_store_state(CLIENT)
+        levels_for = lambda item_ids: read_levels(CLIENT, item_ids, location_ids)
+    print(f"  {len(state['products'])} products, "
+          f"{len(state['custom_collections']) + len(state['smart_collections'])} collections\n")
+
+    catalog = list(catalog)
+    plan = build_plan(catalog, collections, CatalogIndex(catalog).members, state, LOCATIONS.quantities, levels_for)
+    print_plan(plan)
+    if dry_run or plan.is_empty():
+        return plan
+    apply_plan(plan)
+    return plan
+
+
+def catalog_source(args):
+    """Products to seed: the catalog file, or a synthetic expansion of it."""
+    if not args.generate:
+        return load_catalog(args.catalog)
+    return generate_catalog(
+        load_catalog(args.catalog), args.generate, seed=args.seed,
+        variant_fanout=args.variant_fanout, on_sale_ratio=args.on_sale_ratio,
+        out_of_stock_ratio=args.out_of_stock_ratio,
+    )
+
+
+def write_catalog(products, path):
+    with open(path, "w", encoding="utf-8") as f:
+        count = 0
+        for p in products:
+            f.write(json.dumps(p, ensure_ascii=False) + "\n")
+            count += 1
+    print(f"  Wrote {count} products to {path}")
+
+
+# ── Pipelined seed ───────────────────────────────────────────────────
+
+def seed_pipelined(args, collections, mirror=None):
+    """Seed with each step started as soon as what it needs is done.
+
+    Product creates start once the product purge is done; each collection waits
+    for the collection purge and its own member products; the last inventory
+    batch and the image attachment wait for all products. Everything shares
+    CLIENT's rate governor, so there are no idle phase boundaries.
+    """
+    graph = TaskGraph(CONCURRENCY)
+    product_deps, collection_deps = [], []
+    if JOURNAL.has("phase", "delete"):
+        print("=== Skipping cleanup (already done) ===\n")
+    else:
+        # Read here: the SQLite connection belongs to this thread
+        product_ids = mirror.product_ids() if mirror else None
+        graph.add("delete products", lambda: check_deleted(
+            delete_all_products(bulk=args.bulk_delete, product_ids=product_ids), "products"))
+        graph.add("delete collections", lambda: check_deleted(
+            delete_custom_collections() + delete_smart_collections(), "collections"))
+        graph.add("delete recorded", lambda: JOURNAL.record("phase", "delete"),
+                  deps=["delete products", "delete collections"])
+        product_deps, collection_deps = ["delete products"], ["delete collections"]
+
+    # Membership is resolved up front (one extra pass over the catalog) so each
+    # collection can list the products it waits for
+    index = CatalogIndex(keep_products=False)
+    for p in catalog_source(args):
+        index.add(p)
+
+    def create_member_collection(coll, members):
+        member_ids = [graph.results[("product", pos)] for pos in members]
+        print(f"  Creating collection: {coll['title']} ({len(member_ids)} products)...")
+        return create_collection(coll, member_ids)
+
+    for coll in collections:
+        members = index.resolve(rules_for(coll))
+        graph.add(("collection", coll["title"]),
+                  lambda coll=coll, members=members: create_member_collection(coll, members),
+                  deps=collection_deps + [("product", pos) for pos in members])
+
+    def create(p):
+        try:
+            product = create_product(p)
+        except Exception as e:
+            product_create_failed(p, type(e).__name__, str(e))
+            raise
+        print(f"  Created: {p['title']}")
+        return product["id"]
+
+    start = time.perf_counter()
+    if product_deps:
+        # Products queued behind the purge would all sit in memory until it ends
+        graph.wait_for("delete products")
+    count = 0
+    for i, p in enumerate(catalog_source(args)):
+        graph.add(("product", i), lambda p=p: create(p), deps=product_deps)
+        count += 1
+    all_products = [("product", i) for i in range(count)]
+    graph.add("inventory", INVENTORY.flush, deps=all_products)
+    graph.add("images", attach_images, deps=all_products)
+    graph.wait()
+    elapsed = time.perf_counter() - start
+
+    products_done = sum(key in graph.results for key in all_products)
+    collections_done = sum(("collection", coll["title"]) in graph.results for coll in collections)
+    print(f"\n  Created {products_done} products, {collections_done} collections and "
+          f"{INVENTORY.written} inventory levels in {elapsed:.1f}s.")
+    for item, message in INVENTORY.errors:
+        print(f"  ERROR {describe(item)}: {message}")
+    for key, error in graph.errors.items():
+        print(f"  FAILED {key}: {error}")
+    if graph.errors:
+        raise RuntimeError(f"{len(graph.errors)} seeding tasks failed or were skipped")
+    return count
+
+
+def exit_if_creates_failed():
+    """End the run with a non-zero status when products could not be created."""
+    if CREATE_FAILURES:
+        raise SystemExit(f"\n  {len(CREATE_FAILURES)} products could not be created. They are spooled to "
+                         f"{SPOOL.path}: create them with --replay, then --sync adds them to their collections.")
+
+
+def verify_store(args, collections):
+    """Audit the finished store against the catalog; exits 1 when it drifted."""
+    print()
+    with PROFILE.phase("verify"):
+        drift = verify(CLIENT, catalog_source(args), collections, LOCATIONS)
+    if drift:
+        raise SystemExit(1)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Populate the Shopify store for the Trendsdet app.")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG,
+                        help="product catalog, .jsonl or .csv (default: data/products.jsonl)")
+    parser.add_argument("--collections", default=DEFAULT_COLLECTIONS,
+                        help="collection definitions, JSON (default: data/collections.json)")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="seed N synthetic products expanded from the catalog's templates")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed (default: 0)")
+    parser.add_argument("--variant-fanout", type=int,
+                        help="max variants per generated product (default: the template's count)")
+    parser.add_argument("--on-sale-ratio", type=float, default=0.3,
+                        help="share of generated products with a compare_at_price (default: 0.3)")
+    parser.add_argument("--out-of-stock-ratio", type=float, default=0.05,
+                        help="share of generated products with zero stock (default: 0.05)")
+    parser.add_argument("--write-catalog", metavar="PATH",
+                        help="write the catalog (e.g. a generated one) to a .jsonl file and stop")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted seed, skipping work recorded in the journal")
+    parser.add_argument("--journal", default=f"{SHOP_DOMAIN}.seed-journal.jsonl",
+                        help="checkpoint journal for --resume (default: <shop>.seed-journal.jsonl)")
+    parser.add_argument("--sync", action="store_true",
+                        help="update the store in place instead of wiping and recreating it")
+    parser.add_argument("--plan", action="store_true",
+                        help="print the sync diff and estimated API cost without writing anything")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="with --sync/--plan, read the store from a snapshot.py file instead of the API")
+    parser.add_argument("--mirror", metavar="PATH",
+                        help="refresh a local SQLite mirror (see mirror.py) and read the store from it "
+                             "for --sync/--plan and the product purge")
+    parser.add_argument("--purge", action="store_true",
+                        help="delete all products and collections, then stop")
+    parser.add_argument("--bulk-delete", action="store_true",
+                        help="delete products with one GraphQL bulk mutation (for very large stores)")
+    parser.add_argument("--create-with", choices=("rest", "product-set", "bulk"), default="rest",
+                        help="create products with a REST POST plus inventory writes (default), one "
+                             "productSet call each, or one productSet bulk mutation")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="start every product, collection and inventory step as soon as its inputs exist "
+                             "instead of running the steps as phases")
+    parser.add_argument("--verify", action="store_true",
+                        help="audit the store against the catalog afterwards (see audit_store.py); exit 1 on drift")
+    parser.add_argument("--spool", default=f"{SHOP_DOMAIN}.failed-writes.jsonl",
+                        help="where failed writes are recorded (default: <shop>.failed-writes.jsonl)")
+    parser.add_argument("--replay", action="store_true",
+                        help="retry only the writes recorded in the spool, then stop")
+    parser.add_argument("--inline-images", action="store_true",
+                        help="send image URLs with each product instead of uploading them once to Files")
+    parser.add_argument("--metrics-json", metavar="PATH",
+                        help="write a JSON summary of API calls (latency per endpoint, retries, 429s, bytes)")
+    parser.add_argument("--metrics-textfile", metavar="PATH",
+                        help="write the same metrics as a Prometheus textfile (.prom)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall time and requests per phase and per function (create_product, ...)")
+    parser.add_argument("--profile-json", metavar="PATH", help="write the profile as JSON (implies --profile)")
+    parser.add_argument("--profile-stats", metavar="PATH",
+                        help="write cProfile stats of the main thread, for pstats or snakeviz; worker "
+                             "threads show up in --profile-flamegraph (implies --profile)")
+    parser.add_argument("--profile-flamegraph", metavar="PATH",
+                        help="write sampled stacks in folded format, for flamegraph.pl or speedscope "
+                             "(implies --profile)")
+    args = parser.parse_args()
+    if args.pipeline and args.create_with == "bulk":
+        parser.error("--pipeline creates products one by one; it cannot be combined with --create-with bulk")
+    if args.profile or args.profile_json or args.profile_stats or args.profile_flamegraph:
+        PROFILE.start(stats=bool(args.profile_stats), flamegraph=bool(args.profile_flamegraph))
+    try:
+        run(args)
+    finally:
+        if PROFILE.enabled:
+            PROFILE.stop()
+            print("\n=== Profile ===")
+            PROFILE.print_summary()
+            PROFILE.export(args.profile_json, args.profile_stats, args.profile_flamegraph,
+                           labels={"script": "populate_shopify", "shop": SHOP_DOMAIN})
+        if CLIENT.metrics.requests:
+            print("\n=== API metrics ===")
+            CLIENT.metrics.print_summary()
+        CLIENT.metrics.export(args.metrics_json, args.metrics_textfile,
+                              labels={"script": "populate_shopify", "shop": SHOP_DOMAIN})
+        SPOOL.close()
+        if SPOOL.count and not args.replay:
+            print(f"\n  {SPOOL.count} failed writes spooled to {args.spool} "
+                  f"({SPOOL.total} waiting there); retry just those with --replay")
+
+
+def run(args):
+    global CREATE_WITH
+    CREATE_WITH = args.create_with
+
     print("=" * 60)
     print("  Shopify Store Population Script")
     print("=" * 60)
     print()
 
+    IMAGES.enabled = not args.inline_images
+    if args.replay:
+        with PROFILE.phase("replay"):
+            failed = replay_failed(args.spool)
+        if failed:
+            raise SystemExit(1)
+        return
+
+    collections = load_collections(args.collections)
+
+    if args.write_catalog:
+        write_catalog(catalog_source(args), args.write_catalog)
+        return
+
+    # A wipe leaves earlier failures pointing at products that are gone
+    SPOOL.open(args.spool, fresh=not (args.resume or args.sync or args.plan))
+    if SPOOL.earlier:
+        print(f"  {SPOOL.earlier} failed writes from earlier runs are waiting in {args.spool} "
+              f"(send them with --replay)\n")
+    if CREATE_WITH != "rest" and not args.plan:
+        # Before anything is wiped: productSet products must be published somewhere
+        print(f"  Publishing created products to {PUBLICATION_NAME} (publication {find_publication()})\n")
+
+    mirror = open_mirror(CLIENT, args.mirror, [loc["id"] for loc in LOCATIONS.all()]) if args.mirror else None
+    try:
+        seed_store(args, collections, mirror)
+    finally:
+        if mirror:
+            mirror.close()
+
+
+def seed_store(args, collections, mirror=None):
+    """Sync, pipeline or wipe and seed the store, as the arguments ask."""
+    if args.sync or args.plan:
+        with PROFILE.phase("plan" if args.plan else "sync"):
+            sync_store(catalog_source(args), collections, dry_run=args.plan, snapshot=args.snapshot, mirror=mirror)
+        exit_if_creates_failed()
+        print("=" * 60)
+        print("  DONE! Plan only, nothing written." if args.plan else "  DONE! Store synced.")
+        print("=" * 60)
+        if args.verify and not args.plan:
+            verify_store(args, collections)
+        return
+
+    run_info = {"catalog": os.path.abspath(args.catalog), "generate": args.generate, "seed": args.seed,
+                "inline_images": args.inline_images, "create_with": args.create_with}
+    if not args.purge:
+        JOURNAL.open(args.journal, resume=args.resume, run_info=run_info)
+        if args.resume:
+            print(f"=== Resuming from {args.journal}: {JOURNAL.count('product')} products, "
+                  f"{JOURNAL.count('inventory')} stock levels, {JOURNAL.count('collection')} collections done ===\n")
+            if JOURNAL.header != run_info:
+                print(f"  WARNING: journal was written for {JOURNAL.header}\n")
+
+    if args.pipeline and not args.purge:
+        with PROFILE.phase("pipeline"):
+            count = seed_pipelined(args, collections, mirror)
+        print()
+        print("=" * 60)
+        print("  DONE! Store populated successfully.")
+        print(f"  Products: {count}")
+        print(f"  Collections: {len(collections)}")
+        print("=" * 60)
+        if args.verify:
+            verify_store(args, collections)
+        return
+
     # Step 1: Clean up
-    delete_all_products()
-    delete_custom_collections()
-    delete_smart_collections()
+    if JOURNAL.has("phase", "delete"):
+        print("=== Skipping cleanup (already done) ===\n")
+    else:
+        with PROFILE.phase("delete"):
+            remaining = delete_all_products(bulk=args.bulk_delete,
+                                            product_ids=mirror.product_ids() if mirror else None)
+            failed = delete_custom_collections() + delete_smart_collections()
+        if remaining or failed:
+            # Not journalled: a seed on top of stale products would look done to --resume
+            raise SystemExit(
+                f"\n  Cleanup incomplete: {remaining} products left and {failed} collections not deleted. "
+                f"The failed deletes are spooled to {SPOOL.path}; "
+                + ("rerun --purge, or send just those with --replay." if args.purge else
+                   "rerun with --resume to finish the cleanup and the seed, or send just those with --replay."))
+        if args.purge:
+            print("=" * 60)
+            print(f"  DONE! Store purged ({remaining} products left).")
+            print("=" * 60)
+            return
+        JOURNAL.record("phase", "delete")
 
     # Step 2: Create products
     print("=== Creating products ===")
-    created_products = {}  # product_type -> list of (product_id, has_compare_at)
+    # Only IDs and index entries are kept, so memory stays flat for big catalogs
+    index = CatalogIndex(keep_products=False)
 
-    for i, p in enumerate(PRODUCTS):
-        print(f"  [{i+1}/{len(PRODUCTS)}] Creating: {p['title']}...")
-        product = create_product(p)
-        ptype = p["product_type"]
-        has_compare = any(v.get("compare_at_price") for v in p["variants"])
+    def indexed(products):
+        for p in products:
+            index.add(p)
+            yield p
 
-        if ptype not in created_products:
-            created_products[ptype] = []
-        created_products[ptype].append({
-            "id": product["id"],
-            "title": product["title"],
-            "has_compare_at": has_compare,
-        })
-        time.sleep(0.5)  # Rate limiting
+    start = time.perf_counter()
+    with PROFILE.phase("create"):
+        product_ids = create_products(indexed(catalog_source(args)))
+    elapsed = time.perf_counter() - start
 
-    print(f"\n  Created {len(PRODUCTS)} products total.\n")
+    created = sum(1 for pid in product_ids if pid)
+    rate = created / elapsed if elapsed else 0.0
+    print(f"\n  Created {created} products total in {elapsed:.1f}s ({rate:.2f} products/s).\n")
+
+    print("=== Setting inventory ===")
+    with PROFILE.phase("inventory"):
+        INVENTORY.flush()
+    print(f"  Set {INVENTORY.written} inventory levels in {INVENTORY.requests} requests.")
+    for item, message in INVENTORY.errors:
+        print(f"  ERROR {describe(item)}: {message}")
+    print()
+
+    with PROFILE.phase("images"):
+        attach_images()
 
     # Step 3: Create collections
     print("=== Creating collections ===")
-    for coll in COLLECTIONS:
-        product_ids = []
-
-        if coll["title"] == "On Sale":
-            # Add all products that have compare_at_price
-            for ptype_list in created_products.values():
-                for p in ptype_list:
-                    if p["has_compare_at"]:
-                        product_ids.append(p["id"])
-        else:
-            for ptype in coll["product_types"]:
-                for p in created_products.get(ptype, []):
-                    product_ids.append(p["id"])
-
-        print(f"  Creating collection: {coll['title']} ({len(product_ids)} products)...")
-        create_collection(coll, product_ids)
-        time.sleep(0.5)
+    with PROFILE.phase("collections"):
+        for coll in collections:
+            member_ids = [product_ids[pos] for pos in index.resolve(rules_for(coll)) if product_ids[pos]]
+            print(f"  Creating collection: {coll['title']} ({len(member_ids)} products)...")
+            create_collection(coll, member_ids)
 
     print()
+    exit_if_creates_failed()
     print("=" * 60)
     print("  DONE! Store populated successfully.")
-    print(f"  Products: {len(PRODUCTS)}")
-    print(f"  Collections: {len(COLLECTIONS)}")
+    print(f"  Products: {len(product_ids)}")
+    print(f"  Collections: {len(collections)}")
     print("=" * 60)
+    if args.verify:
+        verify_store(args, collections)
 
 
 if __name__ == "__main__":
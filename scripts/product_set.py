@@ -0,0 +1,177 @@
+"""
+Product creation through the GraphQL productSet mutation.
+
+One productSet call creates a product with its options, variants and stock
+levels, where the REST path needs a products.json POST plus inventory writes.
+The same mutation runs as a bulk operation for large catalogs. Unlike a REST
+create, productSet does not publish the product to any sales channel, so the
+products are published to a publication (the Online Store by default) after.
+"""
+
+import bulk_operations
+from shopify_admin import gid, numeric_id
+
+PRODUCT_SET = """
+mutation ProductSet($input: ProductSetInput!, $synchronous: Boolean!) {
+  productSet(synchronous: $synchronous, input: $input) {
+    product {
+      id title
+      variants(first: 250) { nodes { id title inventoryItem { id } } }
+    }
+    userErrors { field message code }
+  }
+}
+"""
+
+PUBLICATIONS = """
+query Publications {
+  publications(first: 50) { nodes { id name } }
+}
+"""
+
+PUBLISH = """
+mutation Publish($id: ID!, $input: [PublicationInput!]!) {
+  publishablePublish(id: $id, input: $input) {
+    userErrors { field message }
+  }
+}
+"""
+
+
+class ProductSetError(RuntimeError):
+    """productSet returned user errors."""
+
+
+def _option_values(product):
+    """(option name, values in first-seen order) for each product option."""
+    options = [o["name"] for o in product["options"]] or ["Title"]
+    values = [[] for _ in options]
+    for v in product["variants"]:
+        for n, seen in enumerate(values, 1):
+            value = v.get(f"option{n}") or "Default Title"
+            if value not in seen:
+                seen.append(value)
+    return list(zip(options, values))
+
+
+def product_set_input(product, quantities, images=True):
+    """ProductSetInput for a catalog product.
+
+    `quantities(variant)` gives the (location_id, quantity) stock targets of a
+    catalog variant, e.g. LocationCache.quantities. With `images`, the image
+    URLs are passed along as files; otherwise they are left out.
+    """
+    options = _option_values(product)
+    variants = []
+    for v in product["variants"]:
+        variant = {
+            "optionValues": [{"optionName": name, "name": v.get(f"option{n}") or "Default Title"}
+                             for n, (name, _) in enumerate(options, 1)],
+            "price": v["price"],
+            "inventoryItem": {"sku": v["sku"], "tracked": True},
+            "inventoryQuantities": [
+                {"locationId": gid("Location", location_id), "name": "available", "quantity": int(qty)}
+                for location_id, qty in quantities(v)
+            ],
+        }
+        if v.get("compare_at_price"):
+            variant["compareAtPrice"] = v["compare_at_price"]
+        variants.append(variant)
+
+    payload = {
+        "title": product["title"],
+        "descriptionHtml": product["body_html"],
+        "vendor": product["vendor"],
+        "productType": product["product_type"],
+        "tags": [t.strip() for t in product["tags"].split(",") if t.strip()],
+        "status": "ACTIVE",
+        "productOptions": [{"name": name, "values": [{"name": value} for value in values]}
+                           for name, values in options],
+        "variants": variants,
+    }
+    if images and product.get("images"):
+        payload["files"] = [{"originalSource": img["src"], "contentType": "IMAGE"}
+                            for img in product["images"]]
+    return payload
+
+
+def created_product(result):
+    """A productSet payload as the REST-shaped {id, title, variants} the scripts journal."""
+    if result.get("userErrors"):
+        raise ProductSetError("; ".join(e["message"] for e in result["userErrors"]))
+    product = result["product"]
+    return {
+        "id": numeric_id(product["id"]),
+        "title": product["title"],
+        "variants": [{"id": numeric_id(v["id"]), "title": v["title"],
+                      "inventory_item_id": numeric_id(v["inventoryItem"]["id"])}
+                     for v in product["variants"]["nodes"]],
+    }
+
+
+def create(client, payload):
+    """Create one product synchronously; returns it in REST shape."""
+    data = client.graphql(PRODUCT_SET, {"input": payload, "synchronous": True})
+    return created_product(data["productSet"])
+
+
+def create_bulk(client, payloads, poll_interval=2.0, progress=None):
+    """Create products with one productSet bulk mutation.
+
+    `payloads` may be a generator. Yields (index, product, error) in result
+    order, with `index` the payload's position and exactly one of `product`
+    and `error` set.
+    """
+    op_id = bulk_operations.run_mutation(
+        client, PRODUCT_SET,
+        ({"input": payload, "synchronous": True} for payload in payloads),
+    )
+    op = bulk_operations.wait_for(client, op_id, poll_interval=poll_interval, progress=progress)
+    for line in bulk_operations.iter_results(op["url"], timeout=client.timeout) if op.get("url") else ():
+        index = line.get("__lineNumber")
+        try:
+            if "errors" in line and not line.get("data"):
+                raise ProductSetError("; ".join(e["message"] for e in line["errors"]))
+            yield index, created_product(line["data"]["productSet"]), None
+        except (ProductSetError, KeyError, TypeError) as e:
+            yield index, None, f"{type(e).__name__}: {e}"
+
+
+def find_publication(client, name):
+    """ID of the publication (sales channel) called `name`, or None."""
+    data = client.graphql(PUBLICATIONS)
+    return next((numeric_id(p["id"]) for p in data["publications"]["nodes"] if p["name"] == name), None)
+
+
+def _publish_variables(product_id, publication_id):
+    return {"id": gid("Product", product_id), "input": [{"publicationId": gid("Publication", publication_id)}]}
+
+
+def publish(client, product_id, publication_id):
+    """Publish a product to a publication; raises ProductSetError on user errors."""
+    data = client.graphql(PUBLISH, _publish_variables(product_id, publication_id), idempotent=True)
+    errors = data["publishablePublish"]["userErrors"]
+    if errors:
+        raise ProductSetError("; ".join(e["message"] for e in errors))
+
+
+def publish_bulk(client, product_ids, publication_id, poll_interval=2.0, progress=None):
+    """Publish products with one publishablePublish bulk mutation.
+
+    Yields (index, error_class, message) for each product that could not be
+    published, with `index` its position in `product_ids`. Lines without a
+    result count as failed as well.
+    """
+    op_id = bulk_operations.run_mutation(
+        client, PUBLISH, (_publish_variables(pid, publication_id) for pid in product_ids),
+    )
+    op = bulk_operations.wait_for(client, op_id, poll_interval=poll_interval, progress=progress)
+    waiting = set(range(len(product_ids)))
+    for line in bulk_operations.iter_results(op["url"], timeout=client.timeout) if op.get("url") else ():
+        index = line.get("__lineNumber")
+        waiting.discard(index)
+        errors = line.get("errors") or ((line.get("data") or {}).get("publishablePublish") or {}).get("userErrors")
+        if errors:
+            yield index, "ProductSetError", "; ".join(e["message"] for e in errors)
+    for index in sorted(waiting):
+        yield index, "BulkOperationError", "no result from the bulk operation"
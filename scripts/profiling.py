@@ -0,0 +1,189 @@
+"""
+Phase and function timings for the seeding scripts, with optional cProfile
+stats and a sampled flame graph.
+
+Phases are the sequential steps of a run (delete, create, inventory, ...);
+functions are the units of work done inside them, often on worker threads.
+Each gets its wall time and the Admin API requests it made. Everything is a
+no-op until start() is called, so the hooks stay in place in normal runs.
+"""
+
+import cProfile
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Seconds between flame graph samples
+SAMPLE_INTERVAL = 0.005
+
+
+class Profiler:
+    """Wall time and requests per phase and per function for one run.
+
+    `metrics` is the client's Metrics; requests are counted per thread, so a
+    function running on a worker thread is charged only for its own calls.
+    Function times include the functions they call.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.enabled = False
+        self.started = None
+        self.phases = []  # [name, seconds, requests] in the order they ran
+        self.functions = {}  # name -> [calls, seconds, requests, errors]
+        self.lock = threading.Lock()
+        self.profile = None  # cProfile of the main thread
+        self.sampler = None
+
+    def start(self, stats=False, flamegraph=False):
+        """Start recording; `stats` adds cProfile, `flamegraph` a stack sampler."""
+        self.enabled = True
+        self.started = time.perf_counter()
+        if stats:
+            # Only the calling thread: from Python 3.12 a process can have just
+            # one active cProfile, so worker threads are left to the sampler
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        if flamegraph:
+            self.sampler = _StackSampler()
+            self.sampler.start()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        if self.profile:
+            self.profile.disable()
+        if self.sampler:
+            self.sampler.stop()
+        self.enabled = False
+
+    @contextmanager
+    def phase(self, name):
+        """Time a step of the run and count the requests made meanwhile."""
+        if not self.enabled:
+            yield
+            return
+        start, requests = time.perf_counter(), self.metrics.requests
+        try:
+            yield
+        finally:
+            self.phases.append([name, time.perf_counter() - start, self.metrics.requests - requests])
+
+    @contextmanager
+    def measure(self, name):
+        """Record the enclosed block as one call of `name`."""
+        if not self.enabled:
+            yield
+            return
+        start, requests = time.perf_counter(), self.metrics.thread_requests()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - start
+            made = self.metrics.thread_requests() - requests
+            with self.lock:
+                stats = self.functions.setdefault(name, [0, 0.0, 0, 0])
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] += made
+                stats[3] += failed
+
+    def timed(self, name, fn=None):
+        """Wrap `fn` (or decorate a function) to record its calls under `name`."""
+        if fn is None:
+            return lambda f: self.timed(name, f)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            with self.measure(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def summary(self):
+        """Phases and functions as a JSON-friendly dict."""
+        total = time.perf_counter() - self.started if self.started else 0.0
+        with self.lock:
+            functions = sorted(self.functions.items(), key=lambda kv: -kv[1][1])
+        return {
+            "wall_s": round(total, 3),
+            "phases": [{"phase": name, "wall_s": round(seconds, 3), "requests": requests,
+                        "share": round(seconds / total, 3) if total else 0.0}
+                       for name, seconds, requests in self.phases],
+            "functions": [{"function": name, "calls": calls, "total_s": round(seconds, 3),
+                           "mean_ms": round(1000 * seconds / calls, 1), "requests": requests, "errors": errors}
+                          for name, (calls, seconds, requests, errors) in functions],
+        }
+
+    def print_summary(self):
+        s = self.summary()
+        print(f"  {'phase':<24} {'wall s':>8} {'share':>6} {'requests':>9}")
+        for p in s["phases"]:
+            print(f"  {p['phase']:<24} {p['wall_s']:>8.2f} {p['share']:>6.0%} {p['requests']:>9}")
+        print(f"  {'total':<24} {s['wall_s']:>8.2f}")
+        if s["functions"]:
+            print()
+            print(f"  {'function':<24} {'calls':>7} {'total s':>8} {'mean ms':>8} {'requests':>9} {'errors':>7}")
+            for f in s["functions"]:
+                print(f"  {f['function']:<24} {f['calls']:>7} {f['total_s']:>8.2f} {f['mean_ms']:>8.1f} "
+                      f"{f['requests']:>9} {f['errors']:>7}")
+
+    def export(self, json_path=None, stats_path=None, flamegraph_path=None, labels=None):
+        """Write the summary as JSON, the cProfile stats and the folded stacks."""
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(dict(self.summary(), labels=labels or {}), f, indent=2)
+        if stats_path and self.profile:
+            pstats.Stats(self.profile).dump_stats(stats_path)
+        if flamegraph_path and self.sampler:
+            self.sampler.write(flamegraph_path)
+
+
+class _StackSampler(threading.Thread):
+    """Samples every thread's stack and counts them in folded-stack format.
+
+    The samples are wall-clock: a thread waiting on the network or the rate
+    limit is counted where it waits. Worker threads of one pool are merged.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {t.ident: re.sub(r"_\d+$", "", t.name) for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, path):
+        """One `frame;frame;... count` line per stack, for flamegraph.pl or speedscope."""
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Seed many stores concurrently from one run.
+
+    python scripts/seed_stores.py --stores stores.json
+    python scripts/seed_stores.py --stores stores.json --generate 5000 -- --sync
+
+`stores.json` lists the stores as [{"domain": "...", "token": "..."}, ...];
+use "token_env": "LANE1_TOKEN" instead of "token" to read a token from the
+environment. Arguments after `--` are passed to every populate_shopify.py run.
+
+The catalog is parsed (or generated) once into the log directory and every
+unique image is downloaded once into a shared directory; each store is then
+seeded by its own populate_shopify.py process, so it gets its own connection
+pool, rate governor and journal. The prepared catalog's path depends only on
+the catalog options, so `-- --resume` finds the journals' catalog again. A
+per-store result table is printed at the end.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+from catalog import generate_catalog, load_catalog
+from images import download
+from journal import Journal
+from workers import bounded_map
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CATALOG = os.path.join(SCRIPTS_DIR, "data", "products.jsonl")
+IMAGE_PREFETCH_CONCURRENCY = 8
+
+
+def load_stores(path):
+    with open(path) as f:
+        stores = json.load(f)
+    for store in stores:
+        if "token" not in store:
+            store["token"] = os.environ[store["token_env"]]
+    return stores
+
+
+def prepared_catalog_path(args):
+    """Where the catalog for these options is written, the same on every run."""
+    options = [os.path.abspath(args.catalog), args.generate, args.seed, args.variant_fanout,
+               args.on_sale_ratio, args.out_of_stock_ratio]
+    key = hashlib.sha256(json.dumps(options).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(args.log_dir, f"catalog-{key}.jsonl")
+
+
+def prepare_catalog(args, path):
+    """Write the (possibly generated) catalog once; returns its image URLs."""
+    products = load_catalog(args.catalog)
+    if args.generate:
+        products = generate_catalog(products, args.generate, seed=args.seed,
+                                    variant_fanout=args.variant_fanout,
+                                    on_sale_ratio=args.on_sale_ratio,
+                                    out_of_stock_ratio=args.out_of_stock_ratio)
+    urls, count = set(), 0
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        for p in products:
+            f.write(json.dumps(p, ensure_ascii=False) + "\n")
+            urls.update(img["src"] for img in p.get("images", []))
+            count += 1
+    os.replace(f"{path}.tmp", path)
+    print(f"  Prepared {count} products, {len(urls)} unique images in {path}")
+    return sorted(urls)
+
+
+def prefetch_images(urls, content_dir):
+    """Download every image once into the shared content directory."""
+    session = requests.Session()
+    failures = 0
+    fetch = lambda url: download(session, url, (5, 30), content_dir)
+    for _, url, future in bounded_map(fetch, urls, IMAGE_PREFETCH_CONCURRENCY):
+        try:
+            future.result()
+        except Exception as e:
+            failures += 1
+            print(f"  WARNING could not prefetch {url}: {e}")
+    print(f"  Prefetched {len(urls) - failures}/{len(urls)} images into {content_dir}")
+
+
+def seed_store(store, catalog_path, args, passthrough):
+    """Run populate_shopify.py for one store; returns its result row."""
+    domain = store["domain"]
+    log_path = os.path.join(args.log_dir, f"{domain}.log")
+    metrics_path = os.path.join(args.log_dir, f"{domain}.metrics.json")
+    journal_path = os.path.join(args.log_dir, f"{domain}.seed-journal.jsonl")
+    env = dict(os.environ,
+               SHOPIFY_ADMIN_DOMAIN=domain,
+               SHOPIFY_ADMIN_TOKEN=store["token"],
+               SHOPIFY_IMAGE_DIR=args.image_dir,
+               # Cache files are rewritten whole, so each store gets its own
+               SHOPIFY_IMAGE_CACHE=os.path.join(args.log_dir, f"{domain}.image-cache.json"))
+    env.pop("SHOPIFY_LOCATION_CACHE", None)
+    if store.get("base_url"):
+        env["SHOPIFY_ADMIN_BASE_URL"] = store["base_url"]
+    command = [sys.executable, os.path.join(SCRIPTS_DIR, "populate_shopify.py"),
+               "--catalog", catalog_path, "--journal", journal_path,
+               "--metrics-json", metrics_path, *passthrough]
+
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        code = subprocess.run(command, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+    row = {"store": domain, "exit_code": code, "wall_s": round(time.perf_counter() - start, 1),
+           "log": log_path}
+
+    if os.path.exists(journal_path):
+        journal = Journal().open(journal_path, resume=True)
+        journal.close()
+        row.update(products=journal.count("product"), collections=journal.count("collection"),
+                   stock_levels=journal.count("inventory"))
+    if os.path.exists(metrics_path):
+        with open(metrics_path) as f:
+            m = json.load(f)
+        row.update(requests=m["requests"], retries=m["retries"], throttled=m["throttled_429"])
+        row["requests_per_s"] = round(m["requests"] / row["wall_s"], 1) if row["wall_s"] else 0.0
+    return row
+
+
+def print_table(rows):
+    print("=" * 100)
+    print(f"  {'store':<36} {'status':<8} {'wall s':>7} {'products':>9} {'colls':>6} {'stock':>7} "
+          f"{'requests':>9} {'req/s':>6} {'429s':>5}")
+    print("=" * 100)
+    for r in rows:
+        status = "ok" if r["exit_code"] == 0 else f"exit {r['exit_code']}"
+        print(f"  {r['store']:<36} {status:<8} {r['wall_s']:>7.1f} {r.get('products', '-'):>9} "
+              f"{r.get('collections', '-'):>6} {r.get('stock_levels', '-'):>7} {r.get('requests', '-'):>9} "
+              f"{r.get('requests_per_s', '-'):>6} {r.get('throttled', '-'):>5}")
+    print("=" * 100)
+
+
+def main():
+    argv = sys.argv[1:]
+    passthrough = argv[argv.index("--") + 1:] if "--" in argv else []
+    argv = argv[:argv.index("--")] if "--" in argv else argv
+
+    parser = argparse.ArgumentParser(description="Seed many Shopify stores concurrently.")
+    parser.add_argument("--stores", required=True, help="JSON list of {domain, token | token_env}")
+    parser.add_argument("--parallel", type=int, help="stores seeded at once (default: all)")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="product catalog, .jsonl or .csv")
+    parser.add_argument("--generate", type=int, metavar="N", help="seed N synthetic products instead")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed (default: 0)")
+    parser.add_argument("--variant-fanout", type=int, help="max variants per generated product")
+    parser.add_argument("--on-sale-ratio", type=float, default=0.3,
+                        help="share of generated products with a compare_at_price (default: 0.3)")
+    parser.add_argument("--out-of-stock-ratio", type=float, default=0.05,
+                        help="share of generated products with zero stock (default: 0.05)")
+    parser.add_argument("--log-dir", default="seed-logs",
+                        help="per-store logs, journals and metrics (default: seed-logs)")
+    parser.add_argument("--image-dir", default=os.path.join("seed-logs", "images"),
+                        help="shared downloaded images (default: seed-logs/images)")
+    parser.add_argument("--skip-image-prefetch", action="store_true",
+                        help="do not download images up front (e.g. with --inline-images)")
+    parser.add_argument("--results-json", metavar="PATH", help="also write the result table as JSON")
+    args = parser.parse_args(argv)
+
+    stores = load_stores(args.stores)
+    os.makedirs(args.log_dir, exist_ok=True)
+
+    print("=== Preparing shared data ===")
+    catalog_path = prepared_catalog_path(args)
+    urls = prepare_catalog(args, catalog_path)
+    if urls and not args.skip_image_prefetch and "--inline-images" not in passthrough:
+        prefetch_images(urls, args.image_dir)
+    print()
+
+    print(f"=== Seeding {len(stores)} stores ===")
+    rows = {}
+    run = lambda store: seed_store(store, catalog_path, args, passthrough)
+    for i, store, future in bounded_map(run, stores, args.parallel or len(stores)):
+        rows[i] = future.result()
+        print(f"  {store['domain']}: {'done' if rows[i]['exit_code'] == 0 else 'FAILED'} "
+              f"in {rows[i]['wall_s']:.1f}s (log: {rows[i]['log']})")
+    print()
+
+    rows = [rows[i] for i in range(len(stores))]
+    print_table(rows)
+    if args.results_json:
+        with open(args.results_json, "w") as f:
+            json.dump(rows, f, indent=2)
+    if any(r["exit_code"] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
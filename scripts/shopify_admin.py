@@ -0,0 +1,348 @@
+"""
+Shared Shopify Admin API client for the store maintenance scripts.
+Keeps one pooled keep-alive session so repeated calls reuse TLS connections.
+"""
+
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from metrics import Metrics, endpoint_label, operation_label
+
+API_VERSION = "2024-10"
+
+DEFAULT_POOL_SIZE = int(os.environ.get("SHOPIFY_POOL_SIZE", "10"))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("SHOPIFY_CONNECT_TIMEOUT", "5"))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("SHOPIFY_READ_TIMEOUT", "30"))
+# Compressed request bodies are opt-in; responses are always asked for gzipped
+DEFAULT_GZIP_REQUESTS = os.environ.get("SHOPIFY_GZIP_REQUESTS", "0") == "1"
+
+# Run the leaky bucket up to this percent of its size before pacing calls
+DEFAULT_BUCKET_TARGET = float(os.environ.get("SHOPIFY_BUCKET_TARGET", "80"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("SHOPIFY_MAX_RETRIES", "5"))
+
+CALL_LIMIT_HEADER = "X-Shopify-Shop-Api-Call-Limit"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A 5xx or a dropped connection may come after the store applied the call, so
+# calls that are not idempotent (creates) are only retried on these
+UNSAFE_RETRY_STATUSES = {429}
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+GZIP_MIN_BYTES = 1024
+
+
+class RateGovernor:
+    """Token bucket that mirrors Shopify's REST leaky bucket for one store.
+
+    The local estimate leaks at the store's restore rate and is corrected from
+    the call-limit header on every response, so callers are paced at the
+    largest rate that keeps the bucket under `target_percent` full.
+    """
+
+    def __init__(self, bucket_size=40, leak_rate=2.0, target_percent=DEFAULT_BUCKET_TARGET,
+                 backoff_base=0.5, backoff_cap=30.0):
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.target_percent = target_percent
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.used = 0.0
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.cond = threading.Condition()
+
+    def _level(self, now):
+        return max(0.0, self.used - (now - self.updated) * self.leak_rate)
+
+    def acquire(self):
+        """Block until one more call fits under the target fill level."""
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                level = self._level(now)
+                ceiling = max(1.0, self.bucket_size * self.target_percent / 100)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if level + 1 <= ceiling:
+                        self.used = level + 1
+                        self.updated = now
+                        self.in_flight += 1
+                        return
+                    wait = (level + 1 - ceiling) / self.leak_rate
+                self.cond.wait(wait)
+
+    def release(self):
+        """Forget an in-flight call that never produced a response."""
+        with self.cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.cond.notify_all()
+
+    def observe(self, response):
+        """Sync the estimate with the call-limit and Retry-After headers."""
+        now = time.monotonic()
+        with self.cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            limit = _call_limit(response)
+            if limit:
+                used, size = limit
+                self.bucket_size = size
+                # Standard and Plus buckets both drain completely in 20 seconds
+                self.leak_rate = size / 20.0
+                self.used = used + self.in_flight
+                self.updated = now
+            if response.status_code == 429:
+                self.used = self.bucket_size
+                self.updated = now
+                retry_after = _retry_after(response)
+                if retry_after is None:
+                    retry_after = 1.0 / self.leak_rate
+                self.paused_until = max(self.paused_until, now + retry_after)
+            self.cond.notify_all()
+
+    @property
+    def fill_percent(self):
+        with self.cond:
+            return 100.0 * self._level(time.monotonic()) / self.bucket_size
+
+    def backoff(self, attempt, response=None):
+        """Jittered delay before retrying a throttled or failed call."""
+        if response is not None and response.status_code == 429:
+            # acquire() already waits out Retry-After; only spread the retries
+            return random.uniform(0, 0.5)
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class GraphQLError(Exception):
+    """Top-level errors returned by the GraphQL Admin API."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(e.get("message", str(e)) for e in errors))
+
+
+def gid(resource, id_):
+    """Turn a REST numeric ID into a GraphQL global ID (gids pass through)."""
+    id_ = str(id_)
+    if id_.startswith("gid://"):
+        return id_
+    return f"gid://shopify/{resource}/{id_}"
+
+
+def numeric_id(gid_):
+    """Turn a GraphQL global ID back into the REST numeric ID."""
+    return int(str(gid_).rsplit("/", 1)[-1])
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdminClient:
+    """Pooled HTTP client for one store's Admin REST API."""
+
+    def __init__(self, shop_domain, access_token, api_version=API_VERSION,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 gzip_requests=DEFAULT_GZIP_REQUESTS,
+                 governor=None,
+                 max_retries=DEFAULT_MAX_RETRIES,
+                 base_url=None,
+                 metrics=None):
+        self.shop_domain = shop_domain
+        # SHOPIFY_ADMIN_BASE_URL points the scripts at a local stand-in (fake_admin_api.py)
+        self.base_url = (base_url or os.environ.get("SHOPIFY_ADMIN_BASE_URL")
+                         or f"https://{shop_domain}/admin/api/{api_version}")
+        self.timeout = (connect_timeout, read_timeout)
+        self.gzip_requests = gzip_requests
+        self.governor = governor or RateGovernor()
+        self.max_retries = max_retries
+        self.metrics = metrics or Metrics()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "X-Shopify-Access-Token": access_token,
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+        })
+
+    def url(self, endpoint):
+        if endpoint.startswith("http://") or endpoint.startswith("https://"):
+            return endpoint
+        return f"{self.base_url}/{endpoint}"
+
+    def request(self, method, endpoint, params=None, data=None, label=None, idempotent=None):
+        """Send one request under the rate governor and return the raw response.
+
+        429 and 5xx responses, dropped connections and timeouts are retried with
+        jittered backoff; the last response is returned once retries run out. Calls that
+        are not `idempotent` (by default: POSTs) are only retried when the store
+        cannot have applied them: on 429 and on connections that were never
+        made. Every attempt is recorded in `metrics` under `label` (default:
+        the endpoint).
+        """
+        label = label or endpoint_label(endpoint)
+        if idempotent is None:
+            idempotent = method != "POST"
+        retry_statuses = RETRY_STATUSES if idempotent else UNSAFE_RETRY_STATUSES
+        headers = {}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode("utf-8")
+            if self.gzip_requests and len(body) >= GZIP_MIN_BYTES:
+                body = gzip.compress(body)
+                headers["Content-Encoding"] = "gzip"
+
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            self.governor.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method,
+                    self.url(endpoint),
+                    params=params,
+                    data=body,
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.governor.release()
+                self.metrics.record(method, label, time.perf_counter() - start, "error",
+                                    sent=len(body or b""), retry=attempt > 0, waited=start - queued)
+                if attempt >= self.max_retries or not (idempotent or _never_sent(e)):
+                    raise
+                time.sleep(self.governor.backoff(attempt))
+                attempt += 1
+                continue
+            except Exception:
+                self.governor.release()
+                raise
+            self.governor.observe(response)
+            received = response.headers.get("Content-Length")
+            self.metrics.record(method, label, time.perf_counter() - start, response.status_code,
+                                sent=len(body or b""),
+                                received=int(received) if received else len(response.content),
+                                retry=attempt > 0, waited=start - queued)
+            limit = _call_limit(response)
+            if limit:
+                self.metrics.sample_fill("rest", 100.0 * limit[0] / limit[1])
+            if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                return response
+            time.sleep(self.governor.backoff(attempt, response))
+            attempt += 1
+
+    def get(self, endpoint, params=None):
+        return self.request("GET", endpoint, params=params)
+
+    def post(self, endpoint, data, label=None, idempotent=None):
+        return self.request("POST", endpoint, data=data, label=label, idempotent=idempotent)
+
+    def put(self, endpoint, data):
+        return self.request("PUT", endpoint, data=data)
+
+    def delete(self, endpoint):
+        return self.request("DELETE", endpoint)
+
+    def paginate(self, endpoint, key, params=None):
+        """Yield every record of a REST list endpoint, page by page.
+
+        Follows the `Link: rel="next"` page_info cursor and fetches the next
+        page in the background while the caller works through the current one.
+        """
+        params = dict(params or {})
+        params.setdefault("limit", 250)
+        owner = self.metrics.thread_counter()
+
+        def fetch(url, params):
+            # Prefetched pages count as requests of the thread reading them
+            self.metrics.charge_to(owner)
+            r = self.get(url, params=params)
+            r.raise_for_status()
+            return r.json().get(key, []), r.links.get("next", {}).get("url")
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(fetch, endpoint, params)
+            while future is not None:
+                records, next_url = future.result()
+                # The cursor URL already carries limit and fields
+                future = pool.submit(fetch, next_url, None) if next_url else None
+                yield from records
+
+    def graphql(self, query, variables=None, idempotent=None):
+        """Run a GraphQL Admin query and return its `data`.
+
+        THROTTLED errors are retried once enough query cost has been restored;
+        any other top-level error raises GraphQLError. Queries are retried like
+        GETs; mutations only as `idempotent` ones when the caller says so.
+        """
+        if idempotent is None:
+            idempotent = not query.lstrip().startswith("mutation")
+        attempt = 0
+        while True:
+            r = self.post("graphql.json", {"query": query, "variables": variables or {}},
+                          label=operation_label(query), idempotent=idempotent)
+            r.raise_for_status()
+            result = r.json()
+            status = result.get("extensions", {}).get("cost", {}).get("throttleStatus")
+            if status and status.get("maximumAvailable"):
+                used = status["maximumAvailable"] - status.get("currentlyAvailable", 0)
+                self.metrics.sample_fill("graphql", 100.0 * used / status["maximumAvailable"])
+            errors = result.get("errors") or []
+            throttled = any(e.get("extensions", {}).get("code") == "THROTTLED" for e in errors)
+            if throttled and attempt < self.max_retries:
+                self.metrics.record_graphql_throttle()
+                time.sleep(_throttle_wait(result) + self.governor.backoff(0))
+                attempt += 1
+                continue
+            if errors:
+                raise GraphQLError(errors)
+            return result.get("data") or {}
+
+    def close(self):
+        self.session.close()
+
+
+def _call_limit(response):
+    """(used, size) from the REST call-limit header, or None if it is missing or malformed."""
+    used, _, size = response.headers.get(CALL_LIMIT_HEADER, "").partition("/")
+    try:
+        used, size = int(used), int(size)
+    except ValueError:
+        return None
+    return (used, size) if size > 0 else None
+
+
+def _never_sent(error):
+    """Whether a connection error or timeout happened before the request reached the store."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _throttle_wait(result):
+    cost = result.get("extensions", {}).get("cost", {})
+    status = cost.get("throttleStatus", {})
+    restore = status.get("restoreRate") or 50.0
+    missing = cost.get("requestedQueryCost", restore) - status.get("currentlyAvailable", 0)
+    return max(0.0, missing / restore)
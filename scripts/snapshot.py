@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Whole-store snapshot through GraphQL bulk queries.
+
+    python scripts/snapshot.py                  # writes <shop>.snapshot.json.gz
+    python scripts/fix_inventory.py --reconcile --snapshot <shop>.snapshot.json.gz
+    python scripts/populate_shopify.py --plan --snapshot <shop>.snapshot.json.gz
+
+Runs one bulk query each for products (with variants and collection
+membership), locations (with inventory levels) and collections, streams the
+JSONL results and writes them as one gzipped JSON file. Records use the same
+shapes as the REST endpoints, so tools that page through REST can read the
+snapshot instead.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+
+import bulk_operations
+from shopify_admin import AdminClient, numeric_id
+
+PRODUCTS_QUERY = """
+{
+  products {
+    edges { node {
+      id handle title descriptionHtml vendor productType tags status updatedAt
+      options { name }
+      variants { edges { node {
+        id title sku price compareAtPrice inventoryQuantity
+        selectedOptions { name value }
+        inventoryItem { id }
+      } } }
+      collections { edges { node { id } } }
+    } }
+  }
+}
+"""
+
+LOCATIONS_QUERY = """
+{
+  locations {
+    edges { node {
+      id name
+      inventoryLevels { edges { node {
+        item { id }
+        quantities(names: ["available"]) { name quantity }
+      } } }
+    } }
+  }
+}
+"""
+
+COLLECTIONS_QUERY = """
+{
+  collections {
+    edges { node { id handle title descriptionHtml updatedAt ruleSet { appliedDisjunctively } } }
+  }
+}
+"""
+
+
+def _kind(gid_):
+    return gid_.split("/")[3]
+
+
+def _product(node):
+    return {
+        "id": numeric_id(node["id"]),
+        "handle": node["handle"],
+        "title": node["title"],
+        "body_html": node.get("descriptionHtml"),
+        "vendor": node.get("vendor"),
+        "product_type": node.get("productType"),
+        "tags": ", ".join(node.get("tags") or []),
+        "status": (node.get("status") or "").lower(),
+        "updated_at": node.get("updatedAt"),
+        "options": [{"name": o["name"]} for o in node.get("options") or []],
+        "variants": [],
+    }
+
+
+def _variant(node, product_id):
+    variant = {
+        "id": numeric_id(node["id"]),
+        "product_id": product_id,
+        "title": node["title"],
+        "sku": node.get("sku"),
+        "price": node.get("price"),
+        "compare_at_price": node.get("compareAtPrice"),
+        "inventory_item_id": numeric_id(node["inventoryItem"]["id"]),
+        "inventory_quantity": node.get("inventoryQuantity"),
+    }
+    options = node.get("selectedOptions") or []
+    for n in (1, 2, 3):
+        variant[f"option{n}"] = options[n - 1]["value"] if len(options) >= n else None
+    return variant
+
+
+def _run(client, query, name, poll_interval):
+    op_id = bulk_operations.run_query(client, query)
+    op = bulk_operations.wait_for(
+        client, op_id, poll_interval=poll_interval,
+        progress=lambda op: print(f"  {name}: {op['status']}, {op['objectCount']} objects"),
+    )
+    return bulk_operations.iter_results(op["url"], timeout=client.timeout)
+
+
+def take_snapshot(client, poll_interval=2.0):
+    """Run the bulk queries one after another and assemble the snapshot."""
+    # Child lines carry __parentId; they are collected by parent so line order does not matter
+    products, variants, memberships = {}, {}, []
+    for line in _run(client, PRODUCTS_QUERY, "products", poll_interval):
+        kind = _kind(line["id"])
+        if kind == "Product":
+            products[line["id"]] = _product(line)
+        elif kind == "ProductVariant":
+            variants.setdefault(line["__parentId"], []).append(line)
+        elif kind == "Collection":
+            memberships.append((numeric_id(line["id"]), numeric_id(line["__parentId"])))
+    for product_gid, nodes in variants.items():
+        product = products.get(product_gid)
+        if product is not None:
+            product["variants"] = [_variant(node, product["id"]) for node in nodes]
+
+    locations, levels = [], []
+    for line in _run(client, LOCATIONS_QUERY, "inventory", poll_interval):
+        if "__parentId" not in line:
+            locations.append({"id": numeric_id(line["id"]), "name": line["name"]})
+            continue
+        available = next((q["quantity"] for q in line.get("quantities") or [] if q["name"] == "available"), None)
+        levels.append({"inventory_item_id": numeric_id(line["item"]["id"]),
+                       "location_id": numeric_id(line["__parentId"]), "available": available})
+
+    custom, smart = [], []
+    for line in _run(client, COLLECTIONS_QUERY, "collections", poll_interval):
+        coll = {"id": numeric_id(line["id"]), "handle": line["handle"], "title": line["title"],
+                "body_html": line.get("descriptionHtml"), "updated_at": line.get("updatedAt")}
+        (smart if line.get("ruleSet") else custom).append(coll)
+
+    # Collects only exist for custom collections; smart membership follows the rules
+    custom_ids = {c["id"] for c in custom}
+    return {
+        "shop": client.shop_domain,
+        "taken_at": time.time(),
+        "products": list(products.values()),
+        "custom_collections": custom,
+        "smart_collections": smart,
+        "collects": [{"collection_id": cid, "product_id": pid}
+                     for cid, pid in memberships if cid in custom_ids],
+        "locations": locations,
+        "inventory_levels": levels,
+    }
+
+
+def save_snapshot(snapshot, path):
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_snapshot(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    age = (time.time() - snapshot["taken_at"]) / 60
+    print(f"  Using snapshot {path} of {snapshot['shop']}, taken {age:.0f} min ago")
+    return snapshot
+
+
+def store_state(snapshot):
+    """The snapshot in the shape store_sync.fetch_store_state() returns."""
+    return {key: snapshot[key] for key in ("products", "custom_collections", "smart_collections", "collects")}
+
+
+def inventory_levels(snapshot):
+    """{(inventory_item_id, location_id): available}, like inventory_writer.fetch_levels()."""
+    return {(level["inventory_item_id"], level["location_id"]): level["available"]
+            for level in snapshot["inventory_levels"]}
+
+
+def main():
+    shop_domain = os.environ.get("SHOPIFY_ADMIN_DOMAIN", "sefadevtest.myshopify.com")
+    parser = argparse.ArgumentParser(description="Export the whole store through GraphQL bulk queries.")
+    parser.add_argument("--out", default=f"{shop_domain}.snapshot.json.gz",
+                        help="snapshot file (default: <shop>.snapshot.json.gz)")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="seconds between bulk operation status checks (default: 2)")
+    args = parser.parse_args()
+
+    client = AdminClient(shop_domain, os.environ["SHOPIFY_ADMIN_TOKEN"])
+    print(f"=== Snapshotting {shop_domain} ===")
+    start = time.perf_counter()
+    snapshot = take_snapshot(client, poll_interval=args.poll_interval)
+    save_snapshot(snapshot, args.out)
+    elapsed = time.perf_counter() - start
+
+    variants = sum(len(p["variants"]) for p in snapshot["products"])
+    print()
+    print(f"  {len(snapshot['products'])} products, {variants} variants, "
+          f"{len(snapshot['inventory_levels'])} inventory levels, "
+          f"{len(snapshot['custom_collections']) + len(snapshot['smart_collections'])} collections, "
+          f"{len(snapshot['collects'])} collects")
+    print(f"  Wrote {args.out} ({os.path.getsize(args.out) / 1024:.0f} KiB) in {elapsed:.1f}s "
+          f"with {client.metrics.requests} API requests")
+
+
+if __name__ == "__main__":
+    main()
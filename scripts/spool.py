@@ -0,0 +1,90 @@
+"""
+Append-only JSONL spool of failed writes for targeted replay.
+
+Each write that did not go through is appended as one line with its
+operation, the payload needed to send it again, and the error class and
+message. `populate_shopify.py --replay` sends exactly those writes again.
+A fresh seed wipes the store, which leaves earlier entries pointing at IDs
+that no longer exist, so it starts a new spool and keeps the old one as
+`<path>.1`.
+"""
+
+import json
+import os
+import threading
+import time
+
+# Writes the spool knows how to replay, with the payload each one carries
+OPERATIONS = {
+    "inventory_set": "inventory_item_id, location_id, quantity, label",
+    "collection_add": "collection_id, product_ids",
+    "collection_remove": "collection_id, product_ids",
+    "collection_delete": "endpoint, collection_id",
+    "product_create": "product (the catalog record)",
+    "product_delete": "product_id",
+    "product_publish": "product_id, publication_id",
+    "image_attach": "product_id, urls",
+    "file_update": "file_id, product_ids (gids)",
+}
+
+
+class Spool:
+    """Records failed writes; a Spool without a path records nothing.
+
+    The file is only created once something fails. Safe to share between
+    worker threads.
+    """
+
+    def __init__(self, path=None):
+        self.path = None
+        self.file = None
+        self.count = 0
+        self.earlier = 0  # entries already in the file when it was opened
+        self.lock = threading.Lock()
+        if path:
+            self.open(path)
+
+    def open(self, path, fresh=False):
+        """Spool to `path`; with `fresh`, earlier entries are moved to `<path>.1`."""
+        self.path = path
+        if fresh and os.path.exists(path):
+            os.replace(path, f"{path}.1")
+        self.earlier = len(read_spool(path))
+        return self
+
+    @property
+    def total(self):
+        """Entries in the file: earlier ones plus those recorded since open()."""
+        return self.earlier + self.count if self.path else self.count
+
+    def record(self, op, payload, error_class, message):
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown spool operation: {op}")
+        entry = {"op": op, "payload": payload, "error_class": error_class, "error": message, "at": time.time()}
+        with self.lock:
+            self.count += 1
+            if not self.path:
+                return
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def read_spool(path):
+    """Entries of a spool file, skipping a torn last line."""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return entries
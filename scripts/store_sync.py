@@ -0,0 +1,252 @@
+"""
+Diff the desired catalog against what is already in the store.
+Builds a minimal create/update/delete plan so a reseed only touches what changed.
+"""
+
+import math
+import re
+from decimal import Decimal, InvalidOperation
+
+from inventory_writer import BATCH_SIZE
+
+PRODUCT_FIELDS = ("title", "body_html", "vendor", "product_type", "tags")
+VARIANT_FIELDS = ("price", "compare_at_price", "option1", "option2", "option3")
+
+
+def handleize(title):
+    """Shopify's default handle for a title."""
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def normalize(field, value):
+    """Comparable form of a product or variant field value."""
+    if value in (None, ""):
+        return None
+    if field == "tags":
+        return sorted(t.strip().lower() for t in value.split(",") if t.strip())
+    if field in ("price", "compare_at_price"):
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            return value
+    return str(value).strip()
+
+
+def fetch_store_state(client):
+    """Current products, custom/smart collections and collects in the store."""
+    products = list(client.paginate("products.json", "products", {
+        "fields": "id,handle,title,body_html,vendor,product_type,tags,options,variants",
+    }))
+    custom = list(client.paginate("custom_collections.json", "custom_collections"))
+    smart = list(client.paginate("smart_collections.json", "smart_collections"))
+    collects = list(client.paginate("collects.json", "collects"))
+    return {"products": products, "custom_collections": custom,
+            "smart_collections": smart, "collects": collects}
+
+
+class Plan:
+    """Minimal set of writes that turns the store into the desired catalog."""
+
+    def __init__(self):
+        self.creates = []              # catalog products
+        self.updates = []              # (store product, catalog product, changed fields payload)
+        self.deletes = []              # store products
+        self.unchanged = 0
+        self.product_ids = {}          # catalog handle -> matched store product ID
+        self.inventory = []            # (inventory_item_id, location_id, quantity, label) for existing variants
+        self.unstocked = set()         # (inventory_item_id, location_id) with no level yet: activate first
+        self.collection_creates = []   # (catalog collection, member handles)
+        self.collection_updates = []   # (store collection, changed fields payload)
+        self.collection_deletes = []   # (endpoint, store collection)
+        self.collects_add = []         # (store collection, member handle)
+        self.collects_remove = []      # (store collection, collect)
+
+    def is_empty(self):
+        return not (self.creates or self.updates or self.deletes or self.inventory
+                    or self.collection_creates or self.collection_updates
+                    or self.collection_deletes or self.collects_add or self.collects_remove)
+
+    def estimated_requests(self):
+        """Admin API requests needed to apply the plan."""
+        new_variants = sum(len(p["variants"]) for p in self.creates)
+        inventory = len(self.inventory) + new_variants
+        adds, removes = {}, {}
+        for coll, _ in self.collects_add:
+            adds[coll["id"]] = adds.get(coll["id"], 0) + 1
+        for coll, _ in self.collects_remove:
+            removes[coll["id"]] = removes.get(coll["id"], 0) + 1
+        return (len(self.creates) + len(self.updates) + len(self.deletes)
+                + math.ceil(inventory / BATCH_SIZE)
+                + len(self.collection_creates) + len(self.collection_updates)
+                + len(self.collection_deletes)
+                + sum(_chunks(len(members)) - 1 for _, members in self.collection_creates if members)
+                + sum(_chunks(n) for n in adds.values())
+                + sum(_chunks(n) for n in removes.values()))
+
+
+def _chunks(n, size=250):
+    return math.ceil(n / size)
+
+
+def variant_payload(v):
+    variant = {
+        "title": v["title"],
+        "price": v["price"],
+        "sku": v["sku"],
+        "inventory_management": "shopify",
+        "option1": v.get("option1"),
+        "option2": v.get("option2"),
+        "option3": v.get("option3"),
+    }
+    if v.get("compare_at_price"):
+        variant["compare_at_price"] = v["compare_at_price"]
+    return variant
+
+
+def _diff_product(store, desired):
+    changes = {}
+    for field in PRODUCT_FIELDS:
+        if normalize(field, desired.get(field)) != normalize(field, store.get(field)):
+            changes[field] = desired[field]
+
+    store_options = [o["name"] for o in store.get("options", [])]
+    desired_options = [o["name"] for o in desired["options"]]
+    store_variants = {v.get("sku"): v for v in store["variants"]}
+    variants_changed = store_options != desired_options or (
+        [v.get("sku") for v in store["variants"]] != [v["sku"] for v in desired["variants"]]
+    )
+    for v in desired["variants"]:
+        current = store_variants.get(v["sku"])
+        if current is None:
+            continue
+        if any(normalize(f, v.get(f)) != normalize(f, current.get(f)) for f in VARIANT_FIELDS):
+            variants_changed = True
+
+    if variants_changed:
+        changes["options"] = desired["options"]
+        changes["variants"] = []
+        for v in desired["variants"]:
+            payload = variant_payload(v)
+            if v["sku"] in store_variants:
+                payload["id"] = store_variants[v["sku"]]["id"]
+            if not v.get("compare_at_price"):
+                payload["compare_at_price"] = None
+            changes["variants"].append(payload)
+    return changes
+
+
+def build_plan(catalog, collections, members_of, state, quantities, levels_for):
+    """Match catalog products to store products by handle, then SKU, and diff them.
+
+    `members_of(collection)` returns the catalog products that belong in a
+    collection; membership is compared by product handle. `quantities(variant)`
+    gives a catalog variant's (location_id, quantity) targets. Variants that
+    name their locations are diffed per location against
+    `levels_for(item_ids)`, as audit_store does; the rest against the
+    variant's inventory_quantity.
+    """
+    plan = Plan()
+    store_products = state["products"]
+    by_handle = {p["handle"]: p for p in store_products}
+    by_sku = {v["sku"]: p for p in store_products for v in p["variants"] if v.get("sku")}
+
+    matched = set()
+    per_location = []  # (inventory_item_id, location_id, quantity, label)
+    for desired in catalog:
+        store = by_handle.get(handleize(desired["title"]))
+        if store is None:
+            store = next((by_sku[v["sku"]] for v in desired["variants"] if v["sku"] in by_sku), None)
+        if store is None or store["id"] in matched:
+            plan.creates.append(desired)
+            continue
+        matched.add(store["id"])
+        plan.product_ids[handleize(desired["title"])] = store["id"]
+
+        changes = _diff_product(store, desired)
+        if changes:
+            plan.updates.append((store, desired, changes))
+        else:
+            plan.unchanged += 1
+
+        store_variants = {v.get("sku"): v for v in store["variants"]}
+        for v in desired["variants"]:
+            current = store_variants.get(v["sku"])
+            if current is None:
+                continue
+            label = f"{desired['title']} / {v['title']}"
+            targets = quantities(v)
+            if "inventory" in v:
+                per_location += [(current["inventory_item_id"], location_id, qty, label)
+                                 for location_id, qty in targets]
+            elif current.get("inventory_quantity") != targets[0][1]:
+                plan.inventory.append((current["inventory_item_id"], targets[0][0], targets[0][1], label))
+
+    if per_location:
+        levels = levels_for({item_id for item_id, _, _, _ in per_location})
+        plan.inventory += [(item_id, location_id, qty, label) for item_id, location_id, qty, label in per_location
+                           if levels.get((item_id, location_id)) != qty]
+        plan.unstocked = {(item_id, location_id) for item_id, location_id, _, _ in per_location
+                          if (item_id, location_id) not in levels}
+
+    plan.deletes = [p for p in store_products if p["id"] not in matched]
+
+    # Collections: custom ones are matched by title; smart ones are removed as in a full reseed
+    handle_of = {pid: handle for handle, pid in plan.product_ids.items()}
+    store_collections = {c["title"]: c for c in state["custom_collections"]}
+    collects_by_collection = {}
+    for collect in state["collects"]:
+        collects_by_collection.setdefault(collect["collection_id"], []).append(collect)
+
+    wanted = set()
+    for coll in collections:
+        members = [handleize(p["title"]) for p in members_of(coll)]
+        store = store_collections.get(coll["title"])
+        if store is None:
+            plan.collection_creates.append((coll, members))
+            continue
+        wanted.add(store["id"])
+        if normalize("body_html", store.get("body_html")) != normalize("body_html", coll["body_html"]):
+            plan.collection_updates.append((store, {"body_html": coll["body_html"]}))
+
+        current = {}
+        for collect in collects_by_collection.get(store["id"], []):
+            handle = handle_of.get(collect["product_id"])
+            if handle is None:
+                continue  # product is being deleted, which drops its collects too
+            if handle in members and handle not in current:
+                current[handle] = collect
+            else:
+                plan.collects_remove.append((store, collect))
+        plan.collects_add.extend((store, h) for h in members if h not in current)
+
+    plan.collection_deletes = [("custom_collections", c) for c in state["custom_collections"]
+                               if c["id"] not in wanted]
+    plan.collection_deletes += [("smart_collections", c) for c in state["smart_collections"]]
+    return plan
+
+
+def print_plan(plan):
+    print("=== Sync plan ===")
+    for p in plan.creates:
+        print(f"  + product  {p['title']} ({len(p['variants'])} variants)")
+    for store, _, changes in plan.updates:
+        print(f"  ~ product  {store['title']}: {', '.join(sorted(changes))}")
+    for p in plan.deletes:
+        print(f"  - product  {p['title']}")
+    for item_id, location_id, qty, label in plan.inventory:
+        print(f"  ~ stock    {label} @ location {location_id} -> {qty}")
+    for coll, members in plan.collection_creates:
+        print(f"  + collection {coll['title']} ({len(members)} products)")
+    for coll, changes in plan.collection_updates:
+        print(f"  ~ collection {coll['title']}: {', '.join(sorted(changes))}")
+    for _, coll in plan.collection_deletes:
+        print(f"  - collection {coll['title']}")
+    for coll, handle in plan.collects_add:
+        print(f"  + member   {coll['title']} <- {handle}")
+    for coll, collect in plan.collects_remove:
+        print(f"  - member   {coll['title']} -> product {collect['product_id']}")
+    print()
+    print(f"  Products: {len(plan.creates)} create, {len(plan.updates)} update, "
+          f"{len(plan.deletes)} delete, {plan.unchanged} unchanged")
+    print(f"  Estimated API cost: {plan.estimated_requests()} requests")
+    print()
@@ -0,0 +1,121 @@
+"""
+Bounded fan-out and dependency-aware task scheduling over a thread pool for
+the seeding scripts.
+"""
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def bounded_map(fn, items, concurrency):
+    """Run `fn(item)` with at most `concurrency` calls in flight.
+
+    `items` is consumed lazily, so it can be a generator over a huge catalog.
+    Yields (index, item, future) as calls finish; the caller decides whether
+    to call `future.result()` and let errors propagate.
+    """
+    pending = {}
+    items = iter(enumerate(items))
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            for i, item in items:
+                pending[pool.submit(fn, item)] = (i, item)
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                return
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i, item = pending.pop(future)
+                yield i, item, future
+
+
+class TaskGraph:
+    """Runs tasks on a thread pool as soon as the tasks they depend on finish.
+
+    Tasks are added with add(key, fn, deps); a dependency may be added after
+    the tasks that need it. add() blocks while `max_pending` tasks are running,
+    but tasks still waiting on dependencies are held without a limit, so feed
+    a long stream only behind dependencies that are done (see wait_for()).
+    When a task raises, every task that depends on it, directly or not, is
+    skipped. Results end up in `results` and exceptions in `errors`, by key.
+    """
+
+    def __init__(self, concurrency, max_pending=None):
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.max_pending = max_pending or 2 * concurrency
+        self.results = {}
+        self.errors = {}
+        self.tasks = {}  # key -> [fn, unfinished deps] for tasks not yet started
+        self.dependents = {}  # key -> keys waiting on it
+        self.active = 0  # tasks submitted and not yet finished
+        self.cond = threading.Condition()
+
+    def add(self, key, fn, deps=()):
+        with self.cond:
+            while self.active >= self.max_pending:
+                self.cond.wait()
+            failed = next((d for d in deps if d in self.errors), None)
+            if failed is not None:
+                self._fail(key, RuntimeError(f"skipped: {failed} failed"))
+                return
+            waiting = [d for d in deps if d not in self.results]
+            self.tasks[key] = [fn, len(waiting)]
+            for d in waiting:
+                self.dependents.setdefault(d, []).append(key)
+            if not waiting:
+                self._start(key)
+
+    def _start(self, key):
+        fn, _ = self.tasks.pop(key)
+        self.active += 1
+        self.pool.submit(self._run, key, fn)
+
+    def _run(self, key, fn):
+        try:
+            result, error = fn(), None
+        except Exception as e:
+            result, error = None, e
+        with self.cond:
+            self.active -= 1
+            if error is not None:
+                self._fail(key, error)
+            else:
+                self.results[key] = result
+                for dependent in self.dependents.pop(key, ()):
+                    task = self.tasks.get(dependent)
+                    if task is None:
+                        continue
+                    task[1] -= 1
+                    if task[1] == 0:
+                        self._start(dependent)
+            self.cond.notify_all()
+
+    def _fail(self, key, error):
+        self.errors[key] = error
+        self.tasks.pop(key, None)
+        for dependent in self.dependents.pop(key, ()):
+            if dependent in self.tasks:
+                self._fail(dependent, RuntimeError(f"skipped: {key} failed"))
+
+    def wait_for(self, key):
+        """Block until task `key` has finished or failed; True if it succeeded."""
+        with self.cond:
+            while key not in self.results and key not in self.errors:
+                self.cond.wait()
+            return key in self.results
+
+    def wait(self):
+        """Block until every task has finished or been skipped.
+
+        Tasks still waiting on keys that were never added are reported in
+        `errors` as well.
+        """
+        with self.cond:
+            while self.active:
+                self.cond.wait()
+            for key in list(self.tasks):
+                if key in self.tasks:
+                    self._fail(key, RuntimeError("skipped: a dependency was never added"))
+        self.pool.shutdown()
+        return self.results